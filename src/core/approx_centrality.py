@@ -0,0 +1,136 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+# 少于该源点数时不值得启动进程池 (spawn 启动 + 每个进程重建矩阵的开销约数秒)
+_PARALLEL_MIN_SOURCES = 4096
+
+# 工作进程内的图 (由 initializer 构建一次，供该进程处理的所有批次复用)
+_GRAPH = None
+
+
+def sample_size(n: int, epsilon: float = 0.05, delta: float = 0.1) -> int:
+    """
+    源点抽样数 (Brandes-Pich 均匀抽样 + Hoeffding 界 + 对 n 个节点的并集界):
+    k = ln(2n / delta) / (2 epsilon^2)，即以 1 - delta 的概率所有节点的归一化介数误差 < epsilon。
+    不超过 n 时直接取全部节点 (即精确解)。
+    """
+    if n <= 0: return 0
+    k = math.ceil(math.log(2 * n / delta) / (2 * epsilon * epsilon))
+    return min(n, max(1, k))
+
+
+def _init_graph(indptr, indices, n):
+    global _GRAPH
+    A = sp.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(n, n))
+    _GRAPH = (A, A.T.tocsr(), n)
+
+
+def _reachable(AT, sources, n) -> np.ndarray:
+    """批内所有源点可达节点的并集 (含源点本身)"""
+    mask = np.zeros(n, dtype=bool)
+    mask[sources] = True
+    frontier = mask.astype(np.float64)
+    while True:
+        new = ((AT @ frontier) > 0) & ~mask
+        if not new.any(): return np.flatnonzero(mask)
+        mask |= new
+        frontier = new.astype(np.float64)
+
+
+def _brandes_batch(sources):
+    """
+    一批源点的 Brandes 累积 (无权最短路)，按层同步 BFS 在 (m, b) 矩阵上一次处理 b 个源点:
+    前向: sigma_{d+1} = A^T (sigma 限于第 d 层)，只保留未访问节点；
+    反向: delta_v = sigma_v * sum_{w 为 v 的下一层后继} (1 + delta_w) / sigma_w。
+    先求批内源点可达的并集 (m 个节点) 并截取子图，交易网络按收藏品分块，m 远小于 n。
+    返回 (子图节点下标, 介数部分和, 被多少个源点到达, 源点到各节点的距离和)。
+    """
+    A, AT, n = _GRAPH
+    nodes = _reachable(AT, sources, n)
+    A = A[nodes][:, nodes]
+    AT = A.T.tocsr()
+    m, b = len(nodes), len(sources)
+    cols = np.arange(b)
+    local = np.searchsorted(nodes, sources)
+
+    sigma = np.zeros((m, b))
+    dist = np.full((m, b), -1, dtype=np.int32)
+    sigma[local, cols] = 1.0
+    dist[local, cols] = 0
+
+    frontier = sigma.copy()
+    depth = 0
+    while True:
+        reached = AT @ frontier
+        new = (reached > 0) & (dist < 0)
+        if not new.any(): break
+        depth += 1
+        dist[new] = depth
+        sigma[new] = reached[new]
+        frontier = np.where(new, sigma, 0.0)
+
+    delta = np.zeros((m, b))
+    for d in range(depth, 0, -1):
+        coef = np.divide(1.0 + delta, sigma, out=np.zeros_like(sigma), where=dist == d)
+        delta += np.where(dist == d - 1, sigma * (A @ coef), 0.0)
+
+    visited = dist > 0
+    betweenness = np.where(visited, delta, 0.0).sum(axis=1)
+    reach = visited.sum(axis=1).astype(np.float64)
+    dist_sum = np.where(visited, dist, 0).sum(axis=1).astype(np.float64)
+    return nodes, betweenness, reach, dist_sum
+
+
+def approximate_centralities(A, epsilon: float = 0.05, delta: float = 0.1, k: Optional[int] = None,
+                             workers: Optional[int] = None, seed: int = 0, batch_size: int = 64):
+    """
+    基于源点抽样的近似介数中心性与接近中心性 (有向图、忽略边权，语义与 networkx 一致):
+    - 介数: 抽样 k 个源点做 Brandes 累积，按 n / k 放大后除以 (n-1)(n-2) 归一化
+    - 接近: 入向距离 (其它节点到该节点)，Wasserman-Faust 修正:
+      C(u) = (r / (n-1)) * (r / D)，其中可达比例与距离和都用抽样源点的比率估计
+    k 未指定时由 sample_size(n, epsilon, delta) 决定；源点按批分发到进程池并行计算。
+    已在子进程中时 (如对比模式的两组优化进程) 不再嵌套进程池，直接串行。
+    返回 (介数向量, 接近向量, 实际抽样数)。
+    """
+    A = sp.csr_matrix(A)
+    n = A.shape[0]
+    if n == 0: return np.zeros(0), np.zeros(0), 0
+    k = sample_size(n, epsilon, delta) if k is None else max(1, min(int(k), n))
+    rng = np.random.default_rng(seed)
+    sources = np.sort(rng.choice(n, size=k, replace=False)) if k < n else np.arange(n)
+
+    indptr, indices = A.indptr.astype(np.int64), A.indices.astype(np.int64)
+    batches = [sources[i:i + batch_size] for i in range(0, k, batch_size)]
+    workers = workers if workers is not None else min(os.cpu_count() or 1, 8)
+    if multiprocessing.parent_process() is not None: workers = 1
+
+    bc, reach, dist_sum = np.zeros(n), np.zeros(n), np.zeros(n)
+    if workers > 1 and k >= _PARALLEL_MIN_SOURCES and len(batches) > 1:
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches)), mp_context=ctx,
+                                 initializer=_init_graph, initargs=(indptr, indices, n)) as pool:
+            parts = list(pool.map(_brandes_batch, batches))
+    else:
+        global _GRAPH
+        _init_graph(indptr, indices, n)
+        parts = [_brandes_batch(batch) for batch in batches]
+        _GRAPH = None
+    for nodes, part_bc, part_reach, part_dist in parts:
+        bc[nodes] += part_bc
+        reach[nodes] += part_reach
+        dist_sum[nodes] += part_dist
+
+    betweenness = bc * (n / k) / ((n - 1) * (n - 2)) if n > 2 else np.zeros(n)
+
+    # 节点自身被抽中时不计入它的入向样本
+    samples = np.full(n, float(k))
+    samples[sources] -= 1
+    closeness = np.divide(reach * reach, samples * dist_sum, out=np.zeros(n),
+                          where=(dist_sum > 0) & (samples > 0))
+    return betweenness, closeness, k
@@ -0,0 +1,197 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+import requests
+
+import config
+from .price_history_store import (PriceHistoryStore, QUEUE_DONE, QUEUE_FAILED, QUEUE_PENDING, QUEUE_RUNNING)
+from .price_predictor import DataFetcher
+from .http_client import get_client
+
+STANDARD_CONDITIONS = ["Factory New", "Minimal Wear", "Field-Tested", "Well-Worn", "Battle-Scarred"]
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限速器: 每秒补充 rate 个令牌，最多积累 capacity 个。
+    pause() 让所有线程在指定时间内都拿不到令牌 (收到 429 时全局降速)。
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """拿到令牌返回 True；等待期间 stop_event 置位则放弃并返回 False"""
+        while True:
+            if stop_event is not None and stop_event.is_set(): return False
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return True
+                wait = max(self.paused_until - now, (1.0 - self.tokens) / self.rate)
+            if stop_event is not None:
+                stop_event.wait(wait)
+            else:
+                self.sleep(wait)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+class BulkHistoryFetcher:
+    """
+    全市场价格历史的批量回填:
+    - 持久化队列 (与 PriceHistoryStore 同一个 SQLite)，每个条目记录状态 / 尝试次数 / 最后错误，中断后续跑
+    - 有界线程池并发 + 全局令牌桶限速
+    - 429 / 5xx 指数退避 (full jitter，优先遵守 Retry-After)，429 同时暂停令牌桶；
+      每个条目最多请求 max_attempts 次，最后一次失败后不再等待
+    - base_url / session 可注入，便于对接本地模拟服务器
+    本地数据未过期的条目直接标记完成，不发请求。
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, store: Optional[PriceHistoryStore] = None, cookie=None, base_url=None,
+                 workers: int = 4, rate: Optional[float] = None, max_attempts: int = 5,
+                 backoff_base: float = 2.0, backoff_cap: float = 300.0, timeout: float = 15,
+                 session: Optional[requests.Session] = None, sleep=time.sleep):
+        self.store = store or PriceHistoryStore()
+        self.fetcher = DataFetcher(cookie, store=self.store, base_url=base_url)
+        self.workers = max(1, int(workers))
+        # Steam 市场接口的匿名限额约为每分钟 20 次
+        rate = rate if rate is not None else getattr(config, 'STEAM_HISTORY_RATE', 20 / 60)
+        self.bucket = TokenBucket(rate, capacity=max(1.0, rate), sleep=sleep)
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.sleep = sleep
+        self._session = session
+
+    def _get_session(self) -> requests.Session:
+        """默认复用共享客户端的连接池；回填数据直接进入价格历史库，不经过磁盘响应缓存"""
+        return self._session if self._session is not None else get_client().session
+
+    def enqueue(self, names: Iterable[str]) -> int:
+        return self.store.enqueue(names)
+
+    def enqueue_database(self, conditions=None) -> int:
+        """把数据库中所有物品 x 磨损等级的 market_hash_name 加入队列"""
+        conditions = conditions or STANDARD_CONDITIONS
+        names = sorted({f"{name} ({cond})" for name in self.fetcher.translator.cn_to_en_items.values()
+                        for cond in conditions})
+        return self.enqueue(names)
+
+    def _backoff(self, attempt: int, retry_after=None) -> float:
+        if retry_after is not None:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except (TypeError, ValueError):
+                pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def _wait(self, delay: float, stop_event: Optional[threading.Event]) -> bool:
+        """退避等待，返回 True 表示等待期间收到停止信号"""
+        if stop_event is None:
+            self.sleep(delay)
+            return False
+        return stop_event.wait(delay)
+
+    def _interrupted(self, name: str, attempt: int) -> Dict:
+        """中途停止: 条目恢复为待处理，下次 run 重新抓取"""
+        self.store.set_status(name, QUEUE_PENDING, attempt, "已停止")
+        return {'status': QUEUE_PENDING, 'attempts': attempt, 'error': '已停止', 'days': 0}
+
+    def fetch_one(self, name: str, stop_event: Optional[threading.Event] = None) -> Dict:
+        """
+        抓取单个条目并写入本地存储，返回 {'status', 'attempts', 'error', 'days'}。
+        等待令牌或退避期间 stop_event 置位时立即中止，条目状态恢复为待处理。
+        """
+        if not self.store.is_stale(name):
+            self.store.set_status(name, QUEUE_DONE)
+            return {'status': QUEUE_DONE, 'attempts': 0, 'error': '', 'days': 0}
+
+        self.store.set_status(name, QUEUE_RUNNING)
+        url = self.fetcher.history_url(name)
+        headers = self.fetcher.request_headers()
+        error = ""
+        attempt = 0
+        while attempt < self.max_attempts:
+            if not self.bucket.acquire(stop_event): return self._interrupted(name, attempt)
+            attempt += 1
+            try:
+                response = self._get_session().get(url, headers=headers, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code == 200:
+                    try:
+                        prices = response.json().get('prices') or []
+                    except (ValueError, AttributeError):
+                        error = "响应不是有效的 JSON"
+                        break
+                    df_daily, msg = self.fetcher._aggregate_daily(prices) if prices else (None, "无成交数据")
+                    if df_daily is None:
+                        error = msg
+                        break
+                    days = self.store.append(name, df_daily)
+                    self.store.set_status(name, QUEUE_DONE, attempt)
+                    return {'status': QUEUE_DONE, 'attempts': attempt, 'error': '', 'days': days}
+
+                error = f"HTTP {response.status_code}"
+                if response.status_code not in self.RETRY_STATUS: break
+                delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                if response.status_code == 429: self.bucket.pause(delay)
+
+            # 最后一次失败后直接标记失败，不再空等
+            if attempt >= self.max_attempts: break
+            if self._wait(delay, stop_event): return self._interrupted(name, attempt)
+
+        self.store.set_status(name, QUEUE_FAILED, attempt, error)
+        return {'status': QUEUE_FAILED, 'attempts': attempt, 'error': error, 'days': 0}
+
+    def run(self, retry_failed: bool = False, limit: Optional[int] = None,
+            progress_callback: Optional[Callable[[int, int, str, Dict], None]] = None,
+            stop_event: Optional[threading.Event] = None) -> Dict[str, int]:
+        """
+        处理队列中的待抓取条目，返回本次运行的状态统计。
+        stop_event 置位后不再开始新的条目，正在等待令牌 / 退避的条目也立即中止；
+        这些条目保持待处理，下次 run 继续。
+        """
+        self.store.reset_queue(retry_failed)
+        names = self.store.pending(limit)
+        total = len(names)
+        counts = {QUEUE_DONE: 0, QUEUE_FAILED: 0}
+        lock = threading.Lock()
+        print(f"📦 批量回填价格历史: {total} 个待处理条目，{self.workers} 线程，限速 {self.bucket.rate:.2f} 次/秒")
+
+        def work(name):
+            if stop_event is not None and stop_event.is_set(): return
+            result = self.fetch_one(name, stop_event)
+            if result['status'] not in counts: return
+            with lock:
+                counts[result['status']] += 1
+                finished = counts[QUEUE_DONE] + counts[QUEUE_FAILED]
+            if progress_callback: progress_callback(finished, total, name, result)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(work, names))
+
+        print(f"✅ 批量回填结束: 成功 {counts[QUEUE_DONE]}，失败 {counts[QUEUE_FAILED]}，"
+              f"未处理 {total - counts[QUEUE_DONE] - counts[QUEUE_FAILED]}")
+        return counts
@@ -0,0 +1,208 @@
+import random
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import config
+from .core_engine import CS2ConditionMapper
+
+
+@dataclass
+class CandidateInfo:
+    collection: str
+    data: dict
+    avg_price: float
+    max_output: float
+    hub_score: float
+    min_price: float = 0.0
+    efficiency: float = 0.0
+    # 分段价格曲线: [(float_lo, float_hi, base_price, condition), ...]，按磨损升序
+    price_curve: List[Tuple[float, float, float, str]] = field(default_factory=list)
+    # 与 price_curve 对齐的前缀最低价: 磨损不高于该段上界时能买到的最便宜价格
+    cheapest_curve: List[float] = field(default_factory=list)
+
+
+class AliasTable:
+    """
+    Walker/Vose 别名表。
+    O(n) 构建，之后每次加权抽样只需一次均匀随机数 + 一次比较。
+    同时保留 numpy 版本的表，用于一次性批量抽样。
+    """
+
+    def __init__(self, weights: List[float]):
+        n = len(weights)
+        self.n = n
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        self._prob_arr = np.ones(n, dtype=np.float64)
+        self._alias_arr = np.arange(n, dtype=np.int64)
+        if n == 0: return
+
+        safe = [w if w > 0 else 0.0 for w in weights]
+        total = sum(safe)
+        if total <= 0:
+            # 权重全为 0 时退化为均匀分布
+            return
+
+        scaled = [w * n / total for w in safe]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+        # 浮点误差残留项概率置 1
+        for i in large + small:
+            self.prob[i] = 1.0
+
+        self._prob_arr = np.asarray(self.prob, dtype=np.float64)
+        self._alias_arr = np.asarray(self.alias, dtype=np.int64)
+
+    def sample_index(self, rng=random) -> int:
+        u = rng.random() * self.n
+        i = int(u)
+        if i >= self.n: i = self.n - 1
+        return i if (u - i) < self.prob[i] else self.alias[i]
+
+    def sample_indices(self, k: int, rng=None) -> np.ndarray:
+        """向量化批量抽样，返回 k 个下标"""
+        if self.n == 0 or k <= 0: return np.empty(0, dtype=np.int64)
+        rng = rng if rng is not None else np.random
+        u = rng.random(k) * self.n
+        idx = np.minimum(u.astype(np.int64), self.n - 1)
+        accept = (u - idx) < self._prob_arr[idx]
+        return np.where(accept, idx, self._alias_arr[idx])
+
+
+class CandidatePool(list):
+    """带预计算别名表的候选池，按 hub_score 加权，O(1) 抽样。"""
+
+    def __init__(self, cands=()):
+        super().__init__(cands)
+        self.alias_table = AliasTable([c.hub_score for c in self])
+
+    def sample(self, rng=random) -> Optional[CandidateInfo]:
+        if not self: return None
+        return self[self.alias_table.sample_index(rng)]
+
+    def sample_batch(self, k: int, rng=None) -> List[CandidateInfo]:
+        """一次抽取 k 个候选 (有放回)，用于种群批量初始化"""
+        if not self: return []
+        return [self[i] for i in self.alias_table.sample_indices(k, rng)]
+
+
+class CandidateIndex:
+    """
+    按稀有度构建的物品级候选索引。
+    每个可用输入物品都是一个候选（而不是每个收藏品只取一个代表），
+    并预计算其磨损-价格曲线、性价比排序和价格段分桶。
+    """
+
+    def __init__(self, raw_db: dict, rarity: int, scores: Dict[str, float]):
+        self.rarity = rarity
+        self.mapper = CS2ConditionMapper()
+        self.candidates: List[CandidateInfo] = []
+        self.by_collection: Dict[str, List[CandidateInfo]] = {}
+        self.by_key: Dict[Tuple[str, str], CandidateInfo] = {}
+
+        for col, tiers in raw_db.items():
+            if rarity not in tiers or (rarity + 1) not in tiers: continue
+            items = [i for i in tiers[rarity] if i.get('price_dict')]
+            outputs = tiers[rarity + 1]
+            if not items or not outputs: continue
+            out_max = max([o.get('price_dict', {}).get('Factory New', 0) for o in outputs])
+
+            for item in items:
+                cand = self._build_candidate(col, item, out_max, scores.get(item['name'], 1.0))
+                if cand is None: continue
+                self.candidates.append(cand)
+                self.by_collection.setdefault(col, []).append(cand)
+                self.by_key[(col, item['name'])] = cand
+
+        self.candidates.sort(key=lambda x: x.efficiency, reverse=True)
+        for lst in self.by_collection.values():
+            lst.sort(key=lambda x: x.min_price)
+
+        self.pools = self._build_pools()
+
+    def _build_candidate(self, col, item, out_max, score) -> Optional[CandidateInfo]:
+        prices = [p for p in item['price_dict'].values() if p > 0]
+        if not prices: return None
+        curve = self._build_price_curve(item)
+        if not curve: return None
+
+        cheapest = []
+        running = float('inf')
+        for _, _, price, _ in curve:
+            running = min(running, price)
+            cheapest.append(running)
+
+        min_price = cheapest[-1]
+        return CandidateInfo(
+            collection=col, data=item, avg_price=sum(prices) / len(prices), max_output=out_max,
+            hub_score=score, min_price=min_price, efficiency=out_max / min_price,
+            price_curve=curve, cheapest_curve=cheapest
+        )
+
+    @classmethod
+    def has_candidates(cls, raw_db: dict, rarity: int) -> bool:
+        """不建索引的存在性检查，与 CandidateIndex(raw_db, rarity, ...).pools['all'] 非空等价"""
+        mapper = CS2ConditionMapper()
+        for tiers in raw_db.values():
+            if not tiers.get(rarity + 1): continue
+            for item in tiers.get(rarity, ()):
+                if item.get('price_dict') and cls._price_curve(item, mapper): return True
+        return False
+
+    def _build_price_curve(self, item) -> List[Tuple[float, float, float, str]]:
+        return self._price_curve(item, self.mapper)
+
+    @staticmethod
+    def _price_curve(item, mapper) -> List[Tuple[float, float, float, str]]:
+        """将物品的磨损范围切分为各磨损等级段，每段价格为常数"""
+        f_min, f_max = item['min_float'], item['max_float']
+        lowers = [0.0] + mapper.upper_bounds
+        uppers = mapper.upper_bounds + [1.0]
+        curve = []
+        for lo, hi, cond in zip(lowers, uppers, mapper.conditions):
+            seg_lo, seg_hi = max(lo, f_min), min(hi, f_max)
+            if seg_lo >= seg_hi: continue
+            price = item['price_dict'].get(cond.value, 0)
+            if price and price > 0:
+                curve.append((seg_lo, seg_hi, price, cond.value))
+        return curve
+
+    def _build_pools(self) -> Dict[str, CandidatePool]:
+        lim_micro = config.TIER_MICRO_USD * config.EXCHANGE_RATE
+        lim_low = config.TIER_LOW_USD * config.EXCHANGE_RATE
+        lim_mid = config.TIER_MID_USD * config.EXCHANGE_RATE
+        filler_size = getattr(config, 'FILLER_POOL_SIZE', 40)
+
+        cands = self.candidates
+        return {
+            "all": CandidatePool(cands),
+            "micro": CandidatePool([c for c in cands if c.avg_price < lim_micro]),
+            "low": CandidatePool([c for c in cands if lim_micro <= c.avg_price < lim_low]),
+            "mid": CandidatePool([c for c in cands if lim_low <= c.avg_price < lim_mid]),
+            "high": CandidatePool([c for c in cands if c.avg_price >= lim_mid]),
+            "fillers": CandidatePool(sorted(cands, key=lambda x: x.avg_price)[:filler_size])
+        }
+
+    def get(self, collection: str, name: str) -> Optional[CandidateInfo]:
+        return self.by_key.get((collection, name))
+
+    def cheapest_upto(self, cand: CandidateInfo, float_ceiling: float) -> float:
+        """磨损不高于 float_ceiling 时该物品的最低基准价，不可达返回 inf"""
+        best = float('inf')
+        for (lo, _, _, _), cheapest in zip(cand.price_curve, cand.cheapest_curve):
+            if lo > float_ceiling: break
+            best = cheapest
+        return best
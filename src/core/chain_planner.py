@@ -0,0 +1,134 @@
+import bisect
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import config
+from .core_engine import CS2ConditionMapper
+from .mix_solver import CollectionMixSolver
+from .float_solver import output_thresholds
+from .simulator import TradeInputItem
+
+
+@dataclass
+class ChainStage:
+    """链上的一级: 该稀有度产物的出售价值与继续汰换的价值 (均为每件期望)"""
+    rarity: int
+    sell_value: float
+    hold_value: float
+    continue_items: List[str] = field(default_factory=list)  # 应继续汰换 (而非出售) 的产物
+
+
+@dataclass
+class ChainPlan:
+    collection: str
+    start_rarity: int
+    recipe: List[TradeInputItem]
+    total_cost: float
+    avg_percentage: float
+    expected_value: float  # 每次起始汰换的期望价值 (按最优继续/出售策略)
+    roi: float
+    depth: int  # 最深会汰换到的稀有度层数
+    stages: List[ChainStage]
+
+
+class ChainPlanner:
+    """
+    同一收藏品内的多步汰换链规划 (稀有度 DAG 上的动态规划)。
+    关键性质: 产物磨损 = out_min + span * 平均百分比，故产物的磨损百分比恰好等于输入的平均百分比，
+    10 个同收藏品产物再次汰换时平均百分比不变 —— 整条链共享同一个百分比 p。
+    W(C, s, p) = 收藏品 C 稀有度 s 的一件产物在最优策略下的期望价值
+               = mean_i max(出售价_i(p), W(C, s+1, p) / 10)
+    产物价格是 p 的分段常数函数，按所有层级的磨损断点划分区间后记忆化，
+    每层的产物期望直接复用模拟器的 collection_outcomes。
+    """
+
+    def __init__(self, optimizer, start_rarity: int, max_depth: int = 3):
+        self.opt = optimizer
+        self.sim = optimizer.sim
+        self.start_rarity = start_rarity
+        self.max_depth = max_depth
+        self.price_modifier = config.BUFF_RATIO
+        self.mapper = CS2ConditionMapper()
+        self.solver = CollectionMixSolver(optimizer, start_rarity)
+        self._memo: Dict[Tuple[str, int, int], Tuple[float, ChainStage]] = {}
+        self._breakpoints: Dict[str, List[float]] = {}
+
+    def _collection_breakpoints(self, col) -> List[float]:
+        """该收藏品链上所有层级产物的磨损等级断点 (百分比空间)，用于划分记忆化区间"""
+        if col not in self._breakpoints:
+            points = set()
+            tiers = self.sim.raw_db.get(col, {})
+            for s in range(self.start_rarity + 1, self.start_rarity + self.max_depth + 1):
+                for out in tiers.get(s, []):
+                    span = out['max_float'] - out['min_float']
+                    if span <= 1e-9: continue
+                    for b in self.mapper.upper_bounds:
+                        if out['min_float'] < b <= out['max_float']:
+                            points.add((b - out['min_float']) / span)
+            self._breakpoints[col] = sorted(points)
+        return self._breakpoints[col]
+
+    def _value(self, col, rarity, p) -> Tuple[float, ChainStage]:
+        """W(C, rarity, p) 及该层的决策；rarity 为产物稀有度"""
+        key = (col, rarity, bisect.bisect_right(self._collection_breakpoints(col), p))
+        if key in self._memo: return self._memo[key]
+
+        outs = self.sim.collection_outcomes(col, rarity - 1, p)
+        if not outs:
+            result = (0.0, ChainStage(rarity, 0.0, 0.0))
+            self._memo[key] = result
+            return result
+
+        prices = [o[2] * self.price_modifier for o in outs]
+        sell = sum(prices) / len(prices)
+        cont = -1.0
+        if rarity + 1 <= self.start_rarity + self.max_depth and self.sim.raw_db.get(col, {}).get(rarity + 1):
+            cont = self._value(col, rarity + 1, p)[0] / 10.0
+
+        hold = sum(max(price, cont) for price in prices) / len(prices)
+        keep = [o[0]['name'] for o, price in zip(outs, prices) if cont > price]
+        result = (hold, ChainStage(rarity, sell, hold, keep))
+        self._memo[key] = result
+        return result
+
+    def _stages(self, col, p) -> List[ChainStage]:
+        stages = []
+        rarity = self.start_rarity + 1
+        while True:
+            stage = self._value(col, rarity, p)[1]
+            stages.append(stage)
+            if not stage.continue_items: break
+            rarity += 1
+        return stages
+
+    def plan(self, top_k: int = 10) -> List[ChainPlan]:
+        """对每个收藏品、每个起始磨损区间求最便宜的起始配方并计算整条链的期望，返回 ROI 前 top_k"""
+        plans = []
+        for col, profile in self.solver.profiles.items():
+            front = self.solver._power(profile, 10)
+            thresholds = output_thresholds(self.sim.raw_db, [col], self.start_rarity)
+            # 链上更深层级的断点同样决定价值，一并作为起始平均百分比上限
+            thresholds = sorted(set(thresholds) | {max(0.0, b - 1e-7) for b in self._collection_breakpoints(col)})
+
+            seen = set()
+            for t in thresholds:
+                entry = None
+                for e in front:
+                    if e[0] > t * 10 + 1e-12: break
+                    entry = e
+                if entry is None or entry[2] in seen: continue
+                seen.add(entry[2])
+
+                cost = entry[1] * self.price_modifier
+                if cost <= 0 or not self.opt._in_budget_cost(cost): continue
+                p = entry[0] / 10.0
+                ev, _ = self._value(col, self.start_rarity + 1, p)
+                recipe = [self.opt._create_item(profile.option_cands[j], profile.options[j].float_value)
+                          for j in entry[2]]
+                stages = self._stages(col, p)
+                plans.append(ChainPlan(col, self.start_rarity, recipe, cost, p, ev, (ev - cost) / cost,
+                                       len(stages), stages))
+
+        plans.sort(key=lambda x: x.roi, reverse=True)
+        print(f"⛓️ 汰换链规划完成: {len(self.solver.profiles)} 个收藏品，{len(plans)} 条候选链，记忆化状态 {len(self._memo)}")
+        return plans[:top_k]
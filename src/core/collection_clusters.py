@@ -0,0 +1,130 @@
+import numpy as np
+import scipy.sparse as sp
+from typing import Dict, List, Tuple
+
+
+def _tier_values(tiers) -> Dict[int, float]:
+    """收藏品各稀有度产物的平均价值 (各物品 price_dict 均值再取平均)"""
+    values = {}
+    for k, items in tiers.items():
+        try:
+            r = int(k)
+        except (TypeError, ValueError):
+            continue
+        prices = []
+        for item in items:
+            vals = [v for v in item.get('price_dict', {}).values() if v and v > 0]
+            if vals: prices.append(sum(vals) / len(vals))
+        if prices: values[r] = sum(prices) / len(prices)
+    return values
+
+
+def value_profiles(raw_db: dict, rarities=(3, 4, 5, 6)) -> Tuple[List[str], np.ndarray]:
+    """
+    每个收藏品的产出价值结构: 各稀有度产物均价的 log2，缺失的稀有度为 nan。
+    返回 (收藏品列表, (n, len(rarities)) 数组)。
+    """
+    collections, rows = [], []
+    for col, tiers in raw_db.items():
+        values = _tier_values(tiers)
+        row = [np.log2(values[r]) if r in values else np.nan for r in rarities]
+        if all(np.isnan(row)): continue
+        collections.append(col)
+        rows.append(row)
+    return collections, np.asarray(rows, dtype=np.float64).reshape(len(rows), len(rarities))
+
+
+def knn_graph(profiles: np.ndarray, k: int = 8, block: int = 512) -> sp.csr_matrix:
+    """
+    价值结构相似度的对称 kNN 稀疏图: 距离为共有稀有度上 log2 均价差的均方根
+    (没有共有稀有度的两个收藏品不相连)，边权 exp(-距离)。按块计算，内存 O(block * n)。
+    """
+    n = len(profiles)
+    k = min(k, n - 1)
+    if k <= 0: return sp.csr_matrix((n, n))
+    present = ~np.isnan(profiles)
+    vals = np.nan_to_num(profiles)
+
+    rows, cols, data = [], [], []
+    for start in range(0, n, block):
+        stop = min(n, start + block)
+        both = present[start:stop, None, :] & present[None, :, :]
+        diff = np.where(both, vals[start:stop, None, :] - vals[None, :, :], 0.0)
+        shared = both.sum(axis=2)
+        dist = np.sqrt((diff ** 2).sum(axis=2) / np.maximum(shared, 1))
+        dist[shared == 0] = np.inf
+        dist[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        d = np.take_along_axis(dist, nearest, axis=1)
+        ok = np.isfinite(d)
+        rows.append(np.repeat(np.arange(start, stop), k)[ok.ravel()])
+        cols.append(nearest.ravel()[ok.ravel()])
+        data.append(np.exp(-d[ok]))
+
+    W = sp.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))), shape=(n, n))
+    return W.maximum(W.T).tocsr()
+
+
+def label_propagation(W, max_iter: int = 100, seed: int = 0) -> np.ndarray:
+    """
+    加权标签传播 (半同步): 每轮计算每个节点邻居中权重和最大的标签，
+    随机一半节点在该标签严格优于当前标签时更新 (避免同步更新在二分结构上振荡)，
+    所有节点的当前标签都已是最大权重标签时停止。
+    返回按簇大小降序重新编号的标签 (0 为最大簇)。
+    """
+    W = sp.coo_matrix(W)
+    n = W.shape[0]
+    if n == 0: return np.zeros(0, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    labels = np.arange(n)
+    rows, cols, data = W.row.astype(np.int64), W.col.astype(np.int64), W.data
+
+    for _ in range(max_iter):
+        key = rows * n + labels[cols]
+        uniq, inverse = np.unique(key, return_inverse=True)
+        sums = np.bincount(inverse, weights=data)
+        r, lab = uniq // n, uniq % n
+
+        # 每个节点的最大权重标签 (随机打破平局) 与当前标签的权重
+        noise = rng.random(len(uniq)) * 1e-12
+        order = np.lexsort((-(sums + noise), r))
+        first = order[np.r_[True, r[order][1:] != r[order][:-1]]]
+        best_label = labels.copy()
+        best_weight = np.zeros(n)
+        best_label[r[first]] = lab[first]
+        best_weight[r[first]] = sums[first]
+        current = np.zeros(n)
+        own = lab == labels[r]
+        current[r[own]] = sums[own]
+
+        better = best_weight > current * (1 + 1e-9) + 1e-15
+        if not better.any(): break
+        move = better & (rng.random(n) < 0.5)
+        labels[move] = best_label[move]
+
+    _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(counts), dtype=np.int64)
+    rank[np.argsort(-counts, kind='stable')] = np.arange(len(counts))
+    return rank[inverse]
+
+
+def collection_clusters(raw_db: dict, k: int = 8, seed: int = 0) -> Dict[str, int]:
+    """收藏品 -> 簇编号: 在价值结构 kNN 图上做标签传播"""
+    collections, profiles = value_profiles(raw_db)
+    if not collections: return {}
+    labels = label_propagation(knn_graph(profiles, k), seed=seed)
+    return dict(zip(collections, labels.tolist()))
+
+
+def cluster_affinity(raw_db: dict, clusters: Dict[str, int], k: int = 8) -> Dict[Tuple[int, int], float]:
+    """簇间连接强度 (kNN 图上跨簇边权之和)，用于挑选相邻簇做跨簇混合"""
+    collections, profiles = value_profiles(raw_db)
+    if not collections: return {}
+    W = sp.triu(knn_graph(profiles, k), k=1).tocoo()
+    labels = np.array([clusters.get(c, -1) for c in collections])
+    a, b = labels[W.row], labels[W.col]
+    cross = (a != b) & (a >= 0) & (b >= 0)
+    affinity = {}
+    for x, y, w in zip(np.minimum(a, b)[cross].tolist(), np.maximum(a, b)[cross].tolist(), W.data[cross].tolist()):
+        affinity[(x, y)] = affinity.get((x, y), 0.0) + w
+    return affinity
@@ -0,0 +1,158 @@
+import numpy as np
+import scipy.sparse as sp
+from typing import Dict, List
+
+from .core_engine import CS2ConditionMapper
+from .network_graph import pagerank_power
+
+
+class ConditionGraph:
+    """
+    按磨损等级展开的交易网络层: 每个 (物品, 磨损等级) 一个节点。
+    输入节点 (物品 A, 等级 c) -> 产出节点 (物品 B, 等级 d) 的边只在 d 可达时存在:
+    10 个输入都处于等级 c 时平均磨损百分比落在 [p_lo, p_hi]，
+    产物磨损 = out_min + (out_max - out_min) * 百分比，与等级 d 的区间有交集即可达。
+    可达比例 share = 百分比区间映射到 d 的长度占比，即产物落在等级 d 的概率 (输入百分比均匀分布时)。
+    边权 = 产出该等级价格 / 输入该等级价格 x share；边 ROI = (价格比 - 1) x share，
+    同一输入节点到同一产物各等级的边 ROI 之和即为该产物的期望 ROI。
+    全部以数组 + CSR 存储，节点数约为物品级网络的 5 倍。
+
+    作用范围: 仅作为分析接口 (NetworkAnalyzer.condition_layer)，按需构建；
+    优化器权重与图谱导出仍使用物品级网络。
+    """
+
+    def __init__(self, raw_db: dict):
+        self.mapper = CS2ConditionMapper()
+        self.lowers = np.array([0.0] + self.mapper.upper_bounds)
+        self.uppers = np.array(self.mapper.upper_bounds + [1.0])
+        self.cond_names = [c.value for c in self.mapper.conditions]
+
+        self.node_ids: List[str] = []
+        self.node_index: Dict[str, int] = {}
+        self.node_items: List[str] = []  # 所属物品的 ID "Name (Collection)"
+        self.node_conditions: List[str] = []
+        self.metrics = {}
+        self.pagerank_vec = None
+        self._prices = []
+        self._groups = []
+        self._build(raw_db)
+
+    def _condition_nodes(self, item, col_name, group):
+        """物品各磨损等级的节点: 返回 [(节点下标, 等级序号, 磨损下界, 磨损上界)]"""
+        f_min, f_max = item['min_float'], item['max_float']
+        prices = item.get('price_dict', {})
+        item_id = f"{item['name']} ({col_name})"
+        nodes = []
+        for c, (cond, c_lo, c_hi) in enumerate(self._bands):
+            lo = c_lo if c_lo > f_min else f_min
+            hi = c_hi if c_hi < f_max else f_max
+            price = prices.get(cond, 0)
+            if lo >= hi or not price or price <= 0: continue
+            node_id = f"{item_id} | {cond}"
+            idx = self.node_index.get(node_id)
+            if idx is None:
+                idx = len(self.node_ids)
+                self.node_index[node_id] = idx
+                self.node_ids.append(node_id)
+                self.node_items.append(item_id)
+                self.node_conditions.append(cond)
+                self._prices.append(float(price))
+                self._groups.append(int(group))
+            nodes.append((idx, c, lo, hi))
+        return nodes
+
+    def _build(self, raw_db):
+        self._bands = list(zip(self.cond_names, self.lowers.tolist(), self.uppers.tolist()))
+        # 1. 节点 + 每个等级节点的端点信息，按块记录在扁平数组中
+        in_rows, out_rows, blocks = [], [], []
+        for col_name, tiers in raw_db.items():
+            tiers_int = {}
+            for k, v in tiers.items():
+                try:
+                    tiers_int[int(k)] = v
+                except (TypeError, ValueError):
+                    pass
+
+            for r in [2, 3, 4, 5]:
+                inputs = tiers_int.get(r, [])
+                outputs = tiers_int.get(r + 1, [])
+                if not inputs or not outputs: continue
+                in_start, out_start = len(in_rows), len(out_rows)
+                for item in inputs:
+                    f_min = item['min_float']
+                    span = item['max_float'] - f_min
+                    for idx, _, lo, hi in self._condition_nodes(item, col_name, r):
+                        if span <= 1e-9:
+                            in_rows.append((idx, 0.0, 0.0))
+                        else:
+                            in_rows.append((idx, (lo - f_min) / span, (hi - f_min) / span))
+                for item in outputs:
+                    f_min = item['min_float']
+                    span = item['max_float'] - f_min
+                    for idx, c, _, _ in self._condition_nodes(item, col_name, r + 1):
+                        out_rows.append((idx, f_min, span, c))
+                blocks.append((in_start, len(in_rows), out_start, len(out_rows)))
+
+        self.node_prices = np.asarray(self._prices, dtype=np.float64)
+        self.node_groups = np.asarray(self._groups, dtype=np.int64)
+        del self._prices, self._groups, self._bands
+
+        # 2. 每块内 输入等级节点 x 产出等级节点 全组合，一次性展开后向量化计算可达比例
+        pairs = [(np.repeat(np.arange(i0, i1), o1 - o0), np.tile(np.arange(o0, o1), i1 - i0))
+                 for i0, i1, o0, o1 in blocks if i1 > i0 and o1 > o0]
+        n = len(self.node_ids)
+        if pairs:
+            pi = np.concatenate([p[0] for p in pairs])
+            po = np.concatenate([p[1] for p in pairs])
+            ins = np.asarray(in_rows, dtype=np.float64)
+            outs = np.asarray(out_rows, dtype=np.float64)
+            in_node, pct_lo, pct_hi = ins[pi, 0].astype(np.int64), ins[pi, 1], ins[pi, 2]
+            out_node, out_min, out_span = outs[po, 0].astype(np.int64), outs[po, 1], outs[po, 2]
+            cond = outs[po, 3].astype(np.int64)
+            c_lo, c_hi = self.lowers[cond], self.uppers[cond]
+
+            # 输入百分比区间映射到产物磨损区间，与产物等级区间求交
+            f_lo = out_min + out_span * pct_lo
+            f_hi = out_min + out_span * pct_hi
+            length = f_hi - f_lo
+            overlap = np.minimum(f_hi, c_hi) - np.maximum(f_lo, c_lo)
+            point = (length <= 1e-12) & (f_lo >= c_lo) & (f_lo < c_hi)
+            share = np.where(length > 1e-12, np.clip(overlap, 0, None) / np.maximum(length, 1e-12), point * 1.0)
+
+            keep = share > 1e-9
+            src, dst, share = in_node[keep], out_node[keep], share[keep]
+            ratio = self.node_prices[dst] / np.maximum(self.node_prices[src], 0.1)
+            weight, roi = ratio * share, (ratio - 1.0) * share
+        else:
+            src = dst = np.zeros(0, dtype=np.int64)
+            weight = roi = share = np.zeros(0)
+
+        # 去重 (同名物品重复出现) 并按 (src, dst) 排序，与物品级网络一致
+        key = src * max(n, 1) + dst
+        _, first = np.unique(key, return_index=True)
+        self.edge_src, self.edge_dst = src[first], dst[first]
+        self.edge_weight, self.edge_roi, self.edge_share = weight[first], roi[first], share[first]
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(self.edge_src, minlength=n))]).astype(np.int64)
+        self.A = sp.csr_matrix((self.edge_weight, self.edge_dst, indptr), shape=(n, n))
+        print(f"✅ 磨损分层网络构建完成: {n} 节点 / {len(self.edge_src)} 条边")
+
+    def calculate_centrality(self):
+        n = len(self.node_ids)
+        if not n: return {}
+        deg = np.bincount(self.edge_src, minlength=n) + np.bincount(self.edge_dst, minlength=n)
+        hubs_vec = deg / (n - 1) if n > 1 else np.ones(n)
+        pr_vec, _ = pagerank_power(self.A)
+        if pr_vec is None: pr_vec = hubs_vec
+
+        self.pagerank_vec = pr_vec
+        self.metrics = {'pagerank': dict(zip(self.node_ids, pr_vec.tolist())),
+                        'hubs': dict(zip(self.node_ids, hubs_vec.tolist()))}
+        return self.metrics
+
+    def item_pagerank(self) -> Dict[str, float]:
+        """各磨损等级节点的 PageRank 按物品汇总，键与物品级网络的节点 ID 一致"""
+        if self.pagerank_vec is None: self.calculate_centrality()
+        if not self.node_ids: return {}
+        items, inverse = np.unique(np.array(self.node_items, dtype=object), return_inverse=True)
+        totals = np.bincount(inverse, weights=self.pagerank_vec, minlength=len(items))
+        return dict(zip(items.tolist(), totals.tolist()))
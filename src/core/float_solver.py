@@ -0,0 +1,177 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, List, Sequence, Tuple
+
+from .core_engine import CS2ConditionMapper
+from .simulator import TradeInputItem
+
+# utils.estimate_price_at_float 中溢价分档的阈值 (相对于磨损等级下界的偏移)
+_PREMIUM_STEPS = [0.005, 0.01, 0.015, 0.03, 0.035, 0.05]
+_EPS = 1e-6
+
+
+@dataclass
+class FloatOption:
+    """单个输入位的一个候选磨损: 占用的磨损百分比与对应价格"""
+    percentage: float
+    price: float
+    float_value: float
+
+
+@dataclass
+class FloatPlan:
+    """在平均磨损百分比不超过 threshold 的前提下，成本最低的磨损分配"""
+    threshold: float
+    avg_percentage: float
+    total_cost: float
+    floats: List[float]
+
+
+def _percentage(float_value: float, min_float: float, max_float: float) -> float:
+    span = max_float - min_float
+    if span <= 1e-9: return 0.0
+    return max(0.0, min(1.0, (float_value - min_float) / span))
+
+
+def build_float_options(min_float: float, max_float: float,
+                        price_at: Callable[[float], TradeInputItem]) -> List[FloatOption]:
+    """
+    枚举价格曲线的全部断点 (磨损等级边界 + 溢价分档边界)，
+    每个断点处价格为分段常数的左端点，因此只需在断点上求值。
+    返回按百分比升序、价格严格递减的非支配选项。
+    """
+    mapper = CS2ConditionMapper()
+    breakpoints = {min_float}
+    for lower in [0.0] + mapper.upper_bounds:
+        breakpoints.add(lower)
+        for step in _PREMIUM_STEPS:
+            breakpoints.add(lower + step + _EPS)
+
+    options = []
+    for f in sorted(breakpoints):
+        if not (min_float <= f <= max_float): continue
+        item = price_at(f)
+        if item.price == float('inf'): continue
+        options.append(FloatOption(_percentage(item.float_value, min_float, max_float), item.price, item.float_value))
+
+    options.sort(key=lambda o: (o.percentage, o.price))
+    frontier = []
+    for opt in options:
+        if not frontier or opt.price < frontier[-1].price - 1e-12:
+            frontier.append(opt)
+    return frontier
+
+
+Frontier = List[Tuple[float, float, Tuple[int, ...]]]
+
+
+def options_frontier(options: List[FloatOption]) -> Frontier:
+    """单个输入位的选项转为 (百分比和, 成本, 选择下标) 前沿"""
+    return [(o.percentage, o.price, (j,)) for j, o in enumerate(options)]
+
+
+def combine_frontiers(a: Frontier, b: Frontier) -> Frontier:
+    """合并两组输入位的前沿，只保留百分比和更小或成本更低的非支配点"""
+    merged = [(pa + pb, ca + cb, xa + xb) for pa, ca, xa in a for pb, cb, xb in b]
+    merged.sort(key=lambda x: (x[0], x[1]))
+    frontier = []
+    for entry in merged:
+        if not frontier or entry[1] < frontier[-1][1] - 1e-9:
+            frontier.append(entry)
+    return frontier
+
+
+def cheapest_pair_batch(a: Frontier, b: Frontier, limits: Sequence[float]) -> list:
+    """
+    不显式合并两个前沿，直接求百分比和不超过各上限的最低成本组合 (不可行为 None)。
+    对 a 的每个点在 b 上二分 (b 按百分比升序、成本递减，最后一个可行点最便宜)，
+    全部上限一次向量化完成。
+    """
+    if not a or not b: return [None] * len(limits)
+    a_pct = np.fromiter((e[0] for e in a), dtype=np.float64, count=len(a))
+    a_cost = np.fromiter((e[1] for e in a), dtype=np.float64, count=len(a))
+    b_pct = np.fromiter((e[0] for e in b), dtype=np.float64, count=len(b))
+    b_cost = np.fromiter((e[1] for e in b), dtype=np.float64, count=len(b))
+
+    lim = np.asarray(limits, dtype=np.float64)[:, None] + 1e-12
+    j = np.searchsorted(b_pct, lim - a_pct[None, :], side='right') - 1
+    feasible = (j >= 0) & (a_pct[None, :] <= lim)
+    total = np.where(feasible, a_cost[None, :] + b_cost[np.maximum(j, 0)], np.inf)
+    best_i = np.argmin(total, axis=1)
+
+    results = []
+    for row, i in enumerate(best_i):
+        if not np.isfinite(total[row, i]):
+            results.append(None)
+            continue
+        jb = j[row, i]
+        results.append((a[i][0] + b[jb][0], a[i][1] + b[jb][1], a[i][2] + b[jb][2]))
+    return results
+
+
+class FloatAllocator:
+    """
+    固定 10 个输入物品后的精确磨损分配求解器。
+    每个输入位的价格是磨损的分段常数函数，约束是平均百分比 (线性) 的上限，
+    因此逐位合并 (百分比和, 成本) 的帕累托前沿即可得到每个上限下的精确最优解。
+    """
+
+    def __init__(self, unit_options: Sequence[List[FloatOption]]):
+        self.unit_options = list(unit_options)
+        self.frontier = self._build_frontier()
+
+    def _build_frontier(self) -> Frontier:
+        if not self.unit_options or any(not opts for opts in self.unit_options): return []
+        frontier = [(0.0, 0.0, ())]
+        for opts in self.unit_options:
+            frontier = combine_frontiers(frontier, options_frontier(opts))
+        return frontier
+
+    def cheapest_under(self, avg_ceiling: float):
+        """平均百分比不超过 avg_ceiling 时的最低成本解，不可行返回 None"""
+        limit = avg_ceiling * len(self.unit_options) + 1e-12
+        best = None
+        # 前沿按百分比升序、成本严格递减，最后一个可行点即最优
+        for entry in self.frontier:
+            if entry[0] > limit: break
+            best = entry
+        return best
+
+    def plans(self, thresholds: Sequence[float]) -> List[FloatPlan]:
+        n = len(self.unit_options)
+        plans = []
+        seen = set()
+        for t in sorted(set(thresholds)):
+            entry = self.cheapest_under(t)
+            if entry is None or entry[2] in seen: continue
+            seen.add(entry[2])
+            floats = [self.unit_options[i][j].float_value for i, j in enumerate(entry[2])]
+            plans.append(FloatPlan(t, entry[0] / n, entry[1], floats))
+        return plans
+
+
+def output_thresholds(raw_db: dict, collections, target_rarity: int) -> List[float]:
+    """
+    产物磨损 = out_min + (out_max - out_min) * 平均百分比，
+    因此每个产物的每条磨损等级边界都对应一个平均百分比断点。
+    返回略低于断点的上限 (产物恰好落在更好的等级内)，以及无约束的 1.0。
+    """
+    mapper = CS2ConditionMapper()
+    thresholds = {1.0}
+    for col in set(collections):
+        for out in raw_db.get(col, {}).get(target_rarity + 1, []):
+            out_min, out_max = out['min_float'], out['max_float']
+            span = out_max - out_min
+            if span <= 1e-9: continue
+            for b in mapper.upper_bounds:
+                if out_min < b <= out_max:
+                    thresholds.add(max(0.0, (b - out_min) / span - 1e-7))
+    return sorted(thresholds)
+
+
+def solve_recipe_floats(recipe: List[TradeInputItem], raw_db: dict, target_rarity: int,
+                        options_for: Callable[[TradeInputItem], List[FloatOption]]) -> List[FloatPlan]:
+    """对固定的输入物品，返回每个可达产物磨损断点下成本最低的磨损分配"""
+    allocator = FloatAllocator([options_for(item) for item in recipe])
+    if not allocator.frontier: return []
+    return allocator.plans(output_thresholds(raw_db, [i.collection for i in recipe], target_rarity))
@@ -0,0 +1,171 @@
+import numpy as np
+
+_MIN_LEVELS = 2
+_MAX_LEVELS = 10
+
+
+def _grid_levels(n: int) -> int:
+    """最细一层网格约每格 1 个节点"""
+    levels = int(np.ceil(np.log2(max(2.0, np.sqrt(n)))))
+    return max(_MIN_LEVELS, min(_MAX_LEVELS, levels))
+
+
+# 父格 3x3 邻域对应的 6x6 子格偏移 (相对于左下角子格)
+_OFF_X, _OFF_Y = [a.ravel() for a in np.meshgrid(np.arange(6), np.arange(6), indexing='ij')]
+
+
+def _repulsion(pos: np.ndarray, k: float) -> np.ndarray:
+    """
+    多层网格 Barnes-Hut 斥力 (Fruchterman-Reingold: k^2 / d)。
+    四叉树的每一层是 2^l x 2^l 的均匀网格；对每个节点，
+    第 l 层的交互表 = 父格 3x3 邻域的子格 (6x6) 中除去自身 3x3 邻域的格子，用格子质心近似；
+    最细一层的 3x3 邻域 (含自身格，扣除自身) 同样按质心计算，格子足够细时近似于精确解。
+    每层每个节点最多 36 个格子，全部向量化完成。
+    """
+    n = len(pos)
+    x, y = pos[:, 0], pos[:, 1]
+    lo = pos.min(axis=0)
+    span = max(float((pos.max(axis=0) - lo).max()), 1e-9)
+    ux = (x - lo[0]) / span * (1 - 1e-9)
+    uy = (y - lo[1]) / span * (1 - 1e-9)
+    levels = _grid_levels(n)
+    k2 = k * k
+
+    fx = np.zeros(n)
+    fy = np.zeros(n)
+    for level in range(1, levels + 1):
+        size = 2 ** level
+        cx = (ux * size).astype(np.int64)
+        cy = (uy * size).astype(np.int64)
+        flat = cy * size + cx
+        mass = np.bincount(flat, minlength=size * size).astype(np.float64)
+        sum_x = np.bincount(flat, weights=x, minlength=size * size)
+        sum_y = np.bincount(flat, weights=y, minlength=size * size)
+
+        gx = ((cx // 2 - 1) * 2)[:, None] + _OFF_X[None, :]
+        gy = ((cy // 2 - 1) * 2)[:, None] + _OFF_Y[None, :]
+        valid = (gx >= 0) & (gx < size) & (gy >= 0) & (gy < size)
+        cell = np.where(valid, gy * size + gx, 0)
+        m = np.where(valid, mass[cell], 0.0)
+        mx = sum_x[cell]
+        my = sum_y[cell]
+
+        if level < levels:
+            near = (np.abs(gx - cx[:, None]) <= 1) & (np.abs(gy - cy[:, None]) <= 1)
+            m[near] = 0.0
+        else:
+            # 最细层: 自身格扣除节点自己
+            own = (gx == cx[:, None]) & (gy == cy[:, None])
+            m = m - own
+            mx = mx - own * x[:, None]
+            my = my - own * y[:, None]
+
+        occupied = m > 0.5
+        safe_m = np.where(occupied, m, 1.0)
+        dx = x[:, None] - mx / safe_m
+        dy = y[:, None] - my / safe_m
+        dist2 = np.maximum(dx * dx + dy * dy, 1e-9)
+        coef = np.where(occupied, m * k2 / dist2, 0.0)
+        fx += (dx * coef).sum(axis=1)
+        fy += (dy * coef).sum(axis=1)
+    return np.stack([fx, fy], axis=1)
+
+
+def _fr_iterations(pos, src, dst, iterations, temperature, gravity):
+    """Fruchterman-Reingold 迭代 (原地更新 pos)，温度线性冷却"""
+    n = len(pos)
+    k = np.sqrt(1.0 / n)
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        disp = _repulsion(pos, k)
+
+        # 引力: d^2 / k，沿边作用于两端
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-9)
+            force = delta * (dist / k)[:, None]
+            for d in range(2):
+                disp[:, d] += np.bincount(dst, weights=force[:, d], minlength=n)
+                disp[:, d] -= np.bincount(src, weights=force[:, d], minlength=n)
+
+        # 弱中心引力，防止不连通的分量飘散
+        disp -= (pos - pos.mean(axis=0)) * gravity * n * k
+
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-9)
+        pos += disp / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature -= cooling
+    return pos
+
+
+def _coarsen(n, src, dst, rng):
+    """
+    一轮并行匹配粗化: 每个节点选出随机优先级最高的邻边，双方互选即合并，
+    未匹配的节点再并入其首选邻居所在的组。
+    返回 (细节点 -> 粗节点映射, 粗节点数, 粗图的边)。
+    """
+    a = np.concatenate([src, dst])
+    b = np.concatenate([dst, src])
+    prio = rng.random(len(src))
+    prio = np.concatenate([prio, prio])
+    order = np.lexsort((-prio, a))
+    a, b = a[order], b[order]
+    first = np.flatnonzero(np.r_[True, a[1:] != a[:-1]])
+    best = np.full(n, -1, dtype=np.int64)
+    best[a[first]] = b[first]
+
+    idx = np.arange(n)
+    matched = (best >= 0) & (best[np.maximum(best, 0)] == idx)
+    leader = np.minimum(idx, np.where(matched, best, idx))
+    # 未匹配的节点并入其首选邻居所在的已匹配对 (星形结构的叶子可一次收缩)
+    absorb = ~matched & (best >= 0)
+    absorb[absorb] = matched[best[absorb]]
+    leader[absorb] = leader[best[absorb]]
+    _, mapping = np.unique(leader, return_inverse=True)
+    n_coarse = int(mapping.max()) + 1
+
+    cs, cd = mapping[src], mapping[dst]
+    keep = cs != cd
+    key = np.unique(np.minimum(cs, cd)[keep] * n_coarse + np.maximum(cs, cd)[keep])
+    return mapping, n_coarse, key // n_coarse, key % n_coarse
+
+
+def _normalize(pos):
+    pos = pos - pos.min(axis=0)
+    extent = pos.max()
+    return pos / extent if extent > 0 else pos
+
+
+def force_layout(n: int, src: np.ndarray, dst: np.ndarray, iterations: int = 150,
+                 seed: int = 0, gravity: float = 0.05, scale: float = 1000.0) -> np.ndarray:
+    """
+    多层级向量化力导向布局，用于服务端预计算坐标:
+    1. 反复匹配粗化直到图足够小 (或无法继续收缩)
+    2. 最粗层随机初始化并完整迭代 iterations 次
+    3. 逐层插值回细层 (子节点继承父节点坐标 + 微小扰动)，每层只需少量迭代精修
+    斥力使用多层网格 Barnes-Hut 近似。返回 (n, 2) 坐标，缩放到 [-scale, scale]。
+    """
+    if n == 0: return np.zeros((0, 2))
+    if n == 1: return np.zeros((1, 2))
+    rng = np.random.default_rng(seed)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+
+    levels = [(n, src, dst, None)]
+    while levels[-1][0] > 64 and len(levels[-1][1]):
+        cur_n, cur_src, cur_dst, _ = levels[-1]
+        mapping, n_coarse, c_src, c_dst = _coarsen(cur_n, cur_src, cur_dst, rng)
+        if n_coarse > cur_n * 0.8: break
+        levels[-1] = (cur_n, cur_src, cur_dst, mapping)
+        levels.append((n_coarse, c_src, c_dst, None))
+
+    coarse_n, coarse_src, coarse_dst, _ = levels[-1]
+    pos = _fr_iterations(rng.random((coarse_n, 2)), coarse_src, coarse_dst, iterations, 0.1, gravity)
+    refine = max(20, iterations // 5)
+    for fine_n, fine_src, fine_dst, mapping in reversed(levels[:-1]):
+        k = np.sqrt(1.0 / fine_n)
+        pos = _normalize(pos)[mapping] + rng.normal(scale=k * 0.1, size=(fine_n, 2))
+        pos = _fr_iterations(pos, fine_src, fine_dst, refine, 3 * k, gravity)
+
+    pos -= pos.mean(axis=0)
+    extent = np.abs(pos).max()
+    return pos / extent * scale if extent > 0 else pos
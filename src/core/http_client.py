@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import config
+from src.utils.path_manager import PathManager
+
+# 各接口的缓存有效期 (秒)，按 URL 前缀匹配，最长前缀优先；0 表示每次都向服务器确认
+DEFAULT_CACHE_TTLS = {
+    "https://api.skinport.com/": 300,  # Skinport 服务端本身按 5 分钟缓存
+    "https://steamcommunity.com/market/pricehistory/": 3600,
+    "https://news.google.com/rss/": 1800,
+    "https://www.reddit.com/": 1800,
+}
+
+
+class CachedResponse:
+    """统一的响应对象 (网络响应或磁盘缓存)，提供调用方用到的 requests.Response 接口子集"""
+
+    def __init__(self, status_code: int, content: bytes, headers: Dict[str, str], url: str, from_cache: str = ""):
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers)
+        self.url = url
+        self.from_cache = from_cache  # "" 网络 / "fresh" 缓存未过期 / "revalidated" 服务器 304
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class HttpClient:
+    """
+    所有外部请求共用的 HTTP 客户端:
+    - 一个 requests.Session + 连接池 (keep-alive，复用 TLS 连接)；Accept-Encoding 保持 requests 默认值
+      (安装 brotli 时包含 br，Skinport 的接口要求 br)
+    - 磁盘响应缓存 (data/http_cache)，按接口前缀设置有效期；按年龄 / 总大小定期清理
+    - 缓存过期后带 If-None-Match / If-Modified-Since 做条件请求，304 时直接复用缓存正文
+    缓存键包含 Cookie，不同账号的响应互不混用。
+    """
+
+    # 每写入这么多次缓存做一次清理 (进程内第一次创建共享客户端时也清理一次)
+    PRUNE_EVERY = 500
+
+    def __init__(self, cache_dir=None, ttls: Optional[Dict[str, float]] = None, pool_size: int = 16):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.cache_dir = str(cache_dir or PathManager.get_data_dir() / "http_cache")
+        self.ttls = dict(ttls if ttls is not None else getattr(config, 'HTTP_CACHE_TTLS', DEFAULT_CACHE_TTLS))
+        self.max_age = getattr(config, 'HTTP_CACHE_MAX_AGE_DAYS', 7) * 86400
+        self.max_bytes = getattr(config, 'HTTP_CACHE_MAX_MB', 200) * 1024 * 1024
+        self._writes = 0
+        self._prune_lock = threading.Lock()
+
+    def ttl_for(self, url: str) -> Optional[float]:
+        """匹配不到任何前缀的接口不缓存"""
+        matches = [p for p in self.ttls if url.startswith(p)]
+        return self.ttls[max(matches, key=len)] if matches else None
+
+    def _cache_paths(self, url, headers):
+        key = hashlib.sha256(f"{url}|{(headers or {}).get('Cookie', '')}".encode()).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key[2:26])
+        return base + ".json", base + ".body"
+
+    def _read_cache(self, url, headers):
+        meta_path, body_path = self._cache_paths(url, headers)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def _write_cache(self, url, headers, meta, body=None):
+        meta_path, body_path = self._cache_paths(url, headers)
+        tag = f"{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            if body is not None:
+                with open(f"{body_path}.{tag}", 'wb') as f:
+                    f.write(body)
+                os.replace(f"{body_path}.{tag}", body_path)
+            with open(f"{meta_path}.{tag}", 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(f"{meta_path}.{tag}", meta_path)
+        except OSError as e:
+            print(f"⚠️ HTTP 缓存写入失败: {e}")
+            return
+        with self._prune_lock:
+            self._writes += 1
+            due = self._writes % self.PRUNE_EVERY == 0
+        if due: self.prune()
+
+    def prune(self, max_age: Optional[float] = None, max_bytes: Optional[int] = None) -> int:
+        """
+        删除超过 max_age 秒未更新的缓存条目，再按更新时间从旧到新删除，直到总大小不超过 max_bytes。
+        缺省取 config.HTTP_CACHE_MAX_AGE_DAYS / HTTP_CACHE_MAX_MB。返回删除的条目数。
+        """
+        max_age = self.max_age if max_age is None else max_age
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = []  # (更新时间, 大小, 元数据路径, 正文路径)
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"): continue
+                meta_path = os.path.join(root, name)
+                body_path = meta_path[:-5] + ".body"
+                try:
+                    size = os.path.getsize(meta_path) + (os.path.getsize(body_path) if os.path.exists(body_path) else 0)
+                    entries.append((os.path.getmtime(meta_path), size, meta_path, body_path))
+                except OSError:
+                    continue
+        entries.sort(reverse=True)
+
+        now, total, removed = time.time(), 0, 0
+        for mtime, size, meta_path, body_path in entries:
+            total += size
+            if now - mtime <= max_age and total <= max_bytes: continue
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            removed += 1
+        if removed: print(f"🧹 HTTP 缓存清理: 删除 {removed} 个条目")
+        return removed
+
+    def get(self, url, params=None, headers=None, timeout=15, ttl=None,
+            cache_if: Optional[Callable[[CachedResponse], bool]] = None) -> CachedResponse:
+        """
+        GET 请求；ttl 为 None 时按接口前缀取默认有效期。
+        有效期内直接返回缓存；过期后做条件请求；非 200 响应不缓存。
+        cache_if 给出时只缓存它判定为有效的 200 响应 (如 Steam 以 200 返回的 [] / {"success": false})。
+        网络异常 (超时等) 原样抛出，由调用方处理。
+        """
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        ttl = self.ttl_for(full_url) if ttl is None else ttl
+        meta, body = self._read_cache(full_url, headers) if ttl is not None else (None, None)
+        if meta is not None and time.time() - meta['stored_at'] < ttl:
+            return CachedResponse(200, body, meta.get('headers', {}), full_url, "fresh")
+
+        req_headers = dict(headers or {})
+        if meta is not None:
+            if meta.get('etag'): req_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'): req_headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self.session.get(full_url, headers=req_headers, timeout=timeout)
+        if response.status_code == 304 and meta is not None:
+            meta['stored_at'] = time.time()
+            self._write_cache(full_url, headers, meta)
+            return CachedResponse(200, body, meta.get('headers', {}), full_url, "revalidated")
+
+        result = CachedResponse(response.status_code, response.content, dict(response.headers), full_url)
+        if response.status_code == 200 and ttl is not None and (cache_if is None or cache_if(result)):
+            kept = {k: v for k, v in response.headers.items() if k.lower() in ('content-type', 'etag', 'last-modified')}
+            self._write_cache(full_url, headers, {
+                'url': full_url, 'stored_at': time.time(), 'headers': kept,
+                'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified'),
+            }, response.content)
+        return result
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """进程内共享的客户端 (连接池在所有调用方之间复用)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+            _client.prune()
+        return _client
@@ -0,0 +1,163 @@
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .core_engine import SkinCondition, CS2ConditionMapper
+from .float_solver import cheapest_pair_batch
+from .mix_solver import CollectionMixSolver, CollectionProfile
+from .simulator import SimulationResult, TradeInputItem
+
+
+@dataclass
+class TargetRecipe:
+    result: SimulationResult
+    recipe: List[TradeInputItem]
+    probability: float  # 产出目标物品的概率
+    output_float: float
+    output_condition: str
+
+
+class TargetRecipeFinder:
+    """
+    反向查询: 给定目标产物 + 磨损要求 + 最低概率，直接求出最便宜的可行配方。
+    1. 反向索引 产物 -> (收藏品, 输入稀有度)
+    2. 由 simulate 中的磨损映射公式反推平均百分比上限
+    3. 目标收藏品至少 k 个名额 (满足概率)，其余名额用其他收藏品填充，
+       用精确磨损分配前沿求每种组合的最低成本。填充名额既枚举单一收藏品，
+       也用全部其他收藏品的并集前沿 (可混用多个收藏品，不影响目标概率)
+    """
+
+    MIXED_FILLER = "*"
+
+    def __init__(self, optimizer):
+        self.opt = optimizer
+        self.sim = optimizer.sim
+        self.mapper = CS2ConditionMapper()
+        self._solvers: Dict[int, CollectionMixSolver] = {}
+        self._fillers: Dict[Tuple[int, str], Optional[CollectionProfile]] = {}
+        self.reverse_index: Dict[str, List[Tuple[str, int, dict]]] = {}
+        self._build_reverse_index()
+
+    def _build_reverse_index(self):
+        for col, tiers in self.sim.raw_db.items():
+            for rarity, items in tiers.items():
+                if (rarity - 1) not in tiers: continue
+                for item in items:
+                    self.reverse_index.setdefault(item['name'], []).append((col, rarity - 1, item))
+
+    def _solver(self, input_rarity) -> CollectionMixSolver:
+        if input_rarity not in self._solvers:
+            self._solvers[input_rarity] = CollectionMixSolver(self.opt, input_rarity)
+        return self._solvers[input_rarity]
+
+    def _mixed_filler(self, solver: CollectionMixSolver, target_col: str) -> Optional[CollectionProfile]:
+        """除目标收藏品外全部收藏品在百分比空间的并集前沿，每个名额可来自不同收藏品"""
+        key = (solver.rarity, target_col)
+        if key not in self._fillers:
+            tagged = sorted(((o, c) for col, p in solver.profiles.items() if col != target_col
+                             for o, c in zip(p.options, p.option_cands)),
+                            key=lambda x: (x[0].percentage, x[0].price))
+            options, option_cands = [], []
+            for opt, cand in tagged:
+                if not options or opt.price < options[-1].price - 1e-12:
+                    options.append(opt)
+                    option_cands.append(cand)
+            self._fillers[key] = CollectionProfile(
+                collection=self.MIXED_FILLER, options=options, option_cands=option_cands, ev_upper=0.0,
+                unit_min_cost=options[-1].price, unit_max_cost=options[0].price
+            ) if options else None
+        return self._fillers[key]
+
+    def _float_ceiling(self, condition: Optional[str], max_float: Optional[float]) -> Tuple[float, bool]:
+        """返回 (磨损上限, 是否严格小于)；磨损等级取该等级的上边界"""
+        ceiling, strict = 1.0, False
+        if condition:
+            conds = [c.value for c in self.mapper.conditions]
+            names = {c.name: c.value for c in SkinCondition}
+            cond = names.get(condition, condition)
+            if cond not in conds: raise ValueError(f"未知磨损等级: {condition}")
+            idx = conds.index(cond)
+            if idx < len(self.mapper.upper_bounds):
+                ceiling, strict = self.mapper.upper_bounds[idx], True
+        if max_float is not None and max_float < ceiling:
+            ceiling, strict = max_float, False
+        return ceiling, strict
+
+    @staticmethod
+    def _avg_ceiling(out_item, ceiling, strict) -> Optional[float]:
+        """产物磨损 = out_min + span * avg，反推平均百分比上限，不可达返回 None"""
+        out_min, out_max = out_item['min_float'], out_item['max_float']
+        span = out_max - out_min
+        if span <= 1e-9:
+            ok = out_min < ceiling if strict else out_min <= ceiling
+            return 1.0 if ok else None
+        t = (ceiling - out_min) / span
+        if strict: t -= 1e-7
+        if t < 0: return None
+        return min(1.0, t)
+
+    def find(self, name: str, collection: Optional[str] = None, condition: Optional[str] = None,
+             max_float: Optional[float] = None, min_probability: float = 0.1, limit: int = 10) -> List[TargetRecipe]:
+        ceiling, strict = self._float_ceiling(condition, max_float)
+        candidates = []
+
+        for col, input_rarity, out_item in self.reverse_index.get(name, []):
+            if collection and col != collection: continue
+            avg_t = self._avg_ceiling(out_item, ceiling, strict)
+            if avg_t is None: continue
+
+            solver = self._solver(input_rarity)
+            target = solver.profiles.get(col)
+            if target is None: continue
+
+            n_outputs = len(self.sim.raw_db[col][input_rarity + 1])
+            k_min = max(1, math.ceil(min_probability * 10 * n_outputs - 1e-9))
+            if k_min > 10: continue
+
+            limit_sum = avg_t * 10
+            for k in range(k_min, 11):
+                front_a = solver._power(target, k)
+                if k == 10:
+                    entry = None
+                    for e in front_a:
+                        if e[0] > limit_sum + 1e-12: break
+                        entry = e
+                    if entry: candidates.append((entry[1], col, input_rarity, ((col, 10),), (target,), entry))
+                    continue
+                fillers = [p for c, p in solver.profiles.items() if c != col]
+                mixed = self._mixed_filler(solver, col)
+                if mixed and len(fillers) > 1: fillers.append(mixed)
+                for filler in fillers:
+                    entry = cheapest_pair_batch(front_a, solver._power(filler, 10 - k), [limit_sum])[0]
+                    if entry:
+                        candidates.append((entry[1], col, input_rarity, ((col, k), (filler.collection, 10 - k)),
+                                           (target, filler), entry))
+
+        candidates.sort(key=lambda x: x[0])
+        results = []
+        seen = set()
+        for _, col, input_rarity, mix, profiles, entry in candidates:
+            if len(results) >= limit: break
+            recipe = []
+            pos = 0
+            for profile, (_, k) in zip(profiles, mix):
+                for j in entry[2][pos:pos + k]:
+                    recipe.append(self.opt._create_item(profile.option_cands[j], profile.options[j].float_value))
+                pos += k
+            # 混合填充的最优解可能恰好只用一个收藏品，与单一填充的结果重复
+            key = tuple(sorted((i.collection, i.name, round(i.float_value, 9)) for i in recipe))
+            if key in seen: continue
+            seen.add(key)
+
+            res = self.sim.simulate(recipe, input_rarity, self._solver(input_rarity).price_modifier)
+
+            hits = [o for o in res.outcomes if o.name == name and o.collection == col]
+            if not hits: continue
+            hit = hits[0]
+            prob = sum(o.probability for o in hits)
+            if prob + 1e-9 < min_probability: continue
+            if (hit.float_value >= ceiling) if strict else (hit.float_value > ceiling + 1e-9): continue
+            results.append(TargetRecipe(res, recipe, prob, hit.float_value, hit.condition))
+
+        print(f"🎯 反向查询 [{name}]: 候选组合 {len(candidates)}，返回 {len(results)} 个配方")
+        return results
@@ -0,0 +1,185 @@
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import config
+from .candidate_index import CandidateInfo
+from .float_solver import (FloatOption, build_float_options, cheapest_pair_batch, combine_frontiers,
+                           options_frontier, output_thresholds)
+
+
+@dataclass
+class CollectionProfile:
+    """单个收藏品在某稀有度下的汇总: 每个输入位的非支配选项 + 价值/成本界"""
+    collection: str
+    options: List[FloatOption]
+    option_cands: List[CandidateInfo]
+    ev_upper: float  # 每个名额贡献的期望价值上界 (已乘 1/10)
+    unit_min_cost: float
+    unit_max_cost: float
+    # powers[k] = k 个该收藏品输入位的前沿
+    powers: Dict[int, list] = field(default_factory=dict)
+
+
+class CollectionMixSolver:
+    """
+    1~2 个收藏品配方的确定性求解器 (穷举 + 分支定界)。
+    枚举 (A)、(A, B, k/10-k) 全部组合，按 ROI 上界从高到低处理；
+    若某组合在其可能落入的所有价格段内都不可能进入前 top_k，则直接剪枝。
+    未剪枝的组合用精确磨损分配求解器求出每个产物磨损断点下的最低成本配方。
+
+    精确性: 每个断点只评估最低成本的一种配方。产物价格随磨损等级单调不增时 (真实市场基本如此)，
+    同一断点内最便宜的配方期望价值不低于其它配方，因此全局最高 ROI 是精确的 (仅有 max_cost 时亦然)；
+    各价格段的前 top_k 只是已评估配方中的最优，不保证全局前 top_k；设置 min_cost 时最便宜配方
+    可能被下限排除，结果同样退化为启发式。
+    """
+
+    def __init__(self, optimizer, target_rarity: int, top_k: int = 3):
+        self.opt = optimizer
+        self.sim = optimizer.sim
+        self.rarity = target_rarity
+        self.top_k = top_k
+        self.price_modifier = config.BUFF_RATIO
+        optimizer._load_candidates_for_rarity(target_rarity)
+        self.index = optimizer._indexes[target_rarity]
+        self.profiles = self._build_profiles()
+
+    def _build_profiles(self) -> Dict[str, CollectionProfile]:
+        profiles = {}
+        for col, cands in self.index.by_collection.items():
+            tagged = []
+            for cand in cands:
+                opts = build_float_options(cand.data['min_float'], cand.data['max_float'],
+                                           lambda f, c=cand: self.opt._create_item(c, f))
+                tagged.extend((o, cand) for o in opts)
+            if not tagged: continue
+
+            # 同一收藏品的任意物品产出相同，因此在百分比空间内取并集前沿
+            tagged.sort(key=lambda x: (x[0].percentage, x[0].price))
+            options, option_cands = [], []
+            for opt, cand in tagged:
+                if not options or opt.price < options[-1].price - 1e-12:
+                    options.append(opt)
+                    option_cands.append(cand)
+
+            outputs = self.sim.raw_db.get(col, {}).get(self.rarity + 1, [])
+            if not outputs: continue
+            # 产物期望是平均百分比的分段常数函数，在每个断点区间取值后取最大即为上界
+            region_ev = []
+            for t in output_thresholds(self.sim.raw_db, [col], self.rarity):
+                outs = self.sim.collection_outcomes(col, self.rarity, t)
+                region_ev.append(sum(o[2] for o in outs) / len(outs))
+            ev_upper = max(region_ev) / 10.0 * self.price_modifier
+
+            profiles[col] = CollectionProfile(
+                collection=col, options=options, option_cands=option_cands, ev_upper=ev_upper,
+                unit_min_cost=options[-1].price * self.price_modifier,
+                unit_max_cost=options[0].price * self.price_modifier
+            )
+        return profiles
+
+    def _power(self, profile: CollectionProfile, k: int):
+        """k 个同收藏品输入位的前沿，递推缓存"""
+        if k not in profile.powers:
+            base = options_frontier(profile.options)
+            profile.powers[1] = base
+            for i in range(2, k + 1):
+                if i not in profile.powers:
+                    profile.powers[i] = combine_frontiers(profile.powers[i - 1], base)
+        return profile.powers[k]
+
+    def _enumerate_mixes(self) -> List[Tuple[float, float, float, Tuple[Tuple[str, int], ...], float]]:
+        """列出全部组合及其 (ROI 上界, 成本下界, 成本上界, 组合, 期望上界)"""
+        mixes = []
+        cols = list(self.profiles.keys())
+        for a in cols:
+            mixes.append(self._bounds(((a, 10),)))
+        for a, b in itertools.combinations(cols, 2):
+            for k in range(1, 10):
+                mixes.append(self._bounds(((a, k), (b, 10 - k))))
+        mixes.sort(key=lambda x: x[0], reverse=True)
+        return mixes
+
+    def _bounds(self, mix):
+        ev_ub = sum(self.profiles[c].ev_upper * k for c, k in mix)
+        cost_lb = sum(self.profiles[c].unit_min_cost * k for c, k in mix)
+        cost_ub = sum(self.profiles[c].unit_max_cost * k for c, k in mix)
+        roi_ub = (ev_ub - cost_lb) / cost_lb if cost_lb > 0 else float('inf')
+        return roi_ub, cost_lb, cost_ub, mix, ev_ub
+
+    def _can_improve(self, roi_ub, cost_lb, cost_ub, tier_best) -> bool:
+        tiers = ['Micro', 'Low', 'Mid', 'High']
+        lo = tiers.index(self.opt._tier_of(cost_lb))
+        hi = tiers.index(self.opt._tier_of(cost_ub))
+        for tier in tiers[lo:hi + 1]:
+            kept = tier_best[tier]
+            if len(kept) < self.top_k or roi_ub > kept[-1]:
+                return True
+        return False
+
+    def _solve_mix(self, mix, ev_ub, tier_best) -> List[Tuple[object, list]]:
+        """
+        对一个组合求出每个产物磨损断点下的最低成本配方并模拟。
+        配方成本在模拟前已精确可知，据此再做一次按价格段的剪枝。
+        """
+        thresholds = output_thresholds(self.sim.raw_db, [c for c, _ in mix], self.rarity)
+        profiles = [self.profiles[c] for c, _ in mix]
+        fronts = [self._power(p, k) for p, (_, k) in zip(profiles, mix)]
+
+        limits = [t * 10 for t in thresholds]
+        if len(fronts) == 1:
+            entries = []
+            for limit in limits:
+                entry = None
+                for e in fronts[0]:
+                    if e[0] > limit + 1e-12: break
+                    entry = e
+                entries.append(entry)
+        else:
+            entries = cheapest_pair_batch(fronts[0], fronts[1], limits)
+
+        results = []
+        seen = set()
+        for entry in entries:
+            if entry is None or entry[2] in seen: continue
+            seen.add(entry[2])
+            cost = entry[1] * self.price_modifier
+            if not self.opt._in_budget_cost(cost): continue
+            if cost > 0 and not self._can_improve((ev_ub - cost) / cost, cost, cost, tier_best): continue
+
+            recipe = []
+            pos = 0
+            for profile, (_, k) in zip(profiles, mix):
+                for j in entry[2][pos:pos + k]:
+                    recipe.append(self.opt._create_item(profile.option_cands[j], profile.options[j].float_value))
+                pos += k
+            res = self.sim.simulate(recipe, self.rarity, self.price_modifier)
+            if res.total_cost != float('inf'):
+                results.append((res, recipe))
+        return results
+
+    def solve(self, progress_callback=None) -> List[Tuple[object, list]]:
+        """返回全部被评估的 (res, recipe)；全局最高 ROI 的精确性条件见类文档"""
+        tier_best: Dict[str, List[float]] = {'Micro': [], 'Low': [], 'Mid': [], 'High': []}
+        evaluated = []
+        mixes = self._enumerate_mixes()
+        pruned = 0
+
+        for n, (roi_ub, cost_lb, cost_ub, mix, ev_ub) in enumerate(mixes):
+            if progress_callback and n % 200 == 0:
+                progress_callback(int(n / max(1, len(mixes)) * 100), f"分支定界: {n}/{len(mixes)} (剪枝 {pruned})")
+            out_of_budget = ((self.opt.max_cost is not None and cost_lb > self.opt.max_cost) or
+                             (self.opt.min_cost is not None and cost_ub < self.opt.min_cost))
+            if out_of_budget or not self._can_improve(roi_ub, cost_lb, cost_ub, tier_best):
+                pruned += 1
+                continue
+
+            for res, recipe in self._solve_mix(mix, ev_ub, tier_best):
+                if res.roi > -0.2: evaluated.append((res, recipe))
+                kept = tier_best[self.opt._tier_of(res.total_cost)]
+                kept.append(res.roi)
+                kept.sort(reverse=True)
+                del kept[self.top_k:]
+
+        print(f"✅ 分支定界完成: {len(mixes)} 个组合，剪枝 {pruned}，评估配方 {len(evaluated)}")
+        return evaluated
@@ -1,9 +1,248 @@
 import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+import hashlib
 import json
 import os
+import threading
+from pathlib import Path
 import matplotlib.colors as mcolors
 from pyvis.network import Network
 import config
+from src.utils.path_manager import PathManager
+from .graph_layout import force_layout
+from .approx_centrality import approximate_centralities
+from .collection_clusters import collection_clusters
+
+# 缓存格式版本，算法或存储结构变化时递增
+CENTRALITY_CACHE_VERSION = 2
+LAYOUT_CACHE_VERSION = 1
+HTML_CACHE_VERSION = 1
+
+# 最近一次构建的分析器，切换筛选/主题时复用，不再重新加载数据库；
+# 只保留一个 (数据库路径 -> 分析器)，切换数据库或数据库变化时替换
+_analyzer_lock = threading.Lock()
+_analyzers = {}
+
+
+def db_fingerprint(db_path) -> str:
+    """数据库文件内容的 SHA-256 (价格也存在数据库中，内容变化即指纹变化)"""
+    h = hashlib.sha256()
+    with open(db_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_path(prefix, *parts):
+    key = hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+    return PathManager.get_data_dir() / "cache" / f"{prefix}_{key[:24]}.json"
+
+
+def _centrality_cache_path(fingerprint, price_version=""):
+    return _cache_path("centrality", fingerprint, price_version, CENTRALITY_CACHE_VERSION)
+
+
+def _read_json_cache(path):
+    if not path.is_file(): return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    # 命中即刷新修改时间，淘汰时按最近使用排序
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return data
+
+
+def _cache_max_entries():
+    return int(getattr(config, 'CACHE_MAX_ENTRIES', 16))
+
+
+def _prune_files(directory, pattern, keep):
+    """按修改时间只保留最近使用的 keep 个文件 (价格版本 / 筛选条件不断变化，旧条目不会再被命中)"""
+    try:
+        files = sorted(Path(directory).glob(pattern), key=lambda p: p.stat().st_mtime, reverse=True)
+        for p in files[keep:]: p.unlink()
+    except OSError:
+        pass
+
+
+def _atomic_write_text(path, text):
+    """先写临时文件 (按进程 + 线程区分) 再替换，避免并发读到半截文件或互相覆盖"""
+    path = str(path)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _write_json_cache(path, payload):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write_text(path, json.dumps(payload))
+    except Exception as e:
+        print(f"⚠️ 缓存写入失败 ({path.name}): {e}")
+        return
+    # 每种前缀 (centrality / layout / network_html) 各自限量
+    _prune_files(path.parent, f"{path.name.rsplit('_', 1)[0]}_*.json", _cache_max_entries())
+
+
+def _read_centrality_cache(fingerprint, price_version=""):
+    return _read_json_cache(_centrality_cache_path(fingerprint, price_version))
+
+
+def _write_centrality_cache(fingerprint, price_version, payload):
+    _write_json_cache(_centrality_cache_path(fingerprint, price_version), payload)
+
+
+def _weights_from_pagerank(pagerank):
+    """node_id 是 "Name (Collection)"，拆分出 Name 给优化器匹配"""
+    return {node_id.split(' (')[0]: float(score * 100) for node_id, score in pagerank.items()}
+
+
+def _hub_weights(pagerank, betweenness, closeness):
+    """
+    枢纽加权: PageRank x (1 + 介数 / 最大介数 + 接近 / 最大接近)，
+    处于多条汰换路径中间、或从多处可达的物品额外提升，最多为纯 PageRank 权重的 3 倍。
+    """
+    max_bc = max(betweenness.values(), default=0) or 1.0
+    max_cl = max(closeness.values(), default=0) or 1.0
+    hub = {node_id: score * (1 + betweenness.get(node_id, 0) / max_bc + closeness.get(node_id, 0) / max_cl)
+           for node_id, score in pagerank.items()}
+    return _weights_from_pagerank(hub)
+
+
+def _centrality_epsilon():
+    return float(getattr(config, 'NETWORK_CENTRALITY_EPSILON', 0.05))
+
+
+def _cached_epsilon(cached):
+    return cached.get('meta', {}).get('approx_epsilon')
+
+
+def load_optimization_weights(db_path, price_version=None, hub_centrality=False):
+    """
+    供 SmartOptimizer 使用的网络权重。
+    指纹 (数据库内容 + 价格版本) 命中缓存时直接读取，不再构建网络、计算 PageRank。
+    price_version 缺省时取本进程共享分析器的当前价格版本 (增量改价后即为新版本)，
+    没有共享分析器时为数据库原始价格 ("")。
+    hub_centrality: 额外计入近似介数 / 接近中心性 (见 _hub_weights)。
+    """
+    fingerprint = db_fingerprint(db_path)
+    analyzer = _analyzers.get(db_path)
+    if analyzer is not None and analyzer.fingerprint != fingerprint: analyzer = None
+    if price_version is None: price_version = analyzer.price_version if analyzer else ""
+    cached = _read_centrality_cache(fingerprint, price_version)
+    key = 'hub_weights' if hub_centrality else 'weights'
+    if cached and key in cached and (not hub_centrality or _cached_epsilon(cached) == _centrality_epsilon()):
+        print(f"⚡ 命中中心性缓存 ({fingerprint[:8]})")
+        return cached[key]
+    with _analyzer_lock:
+        if analyzer is None or analyzer.price_version != price_version:
+            # 链式价格版本无法从磁盘数据库还原，其他版本一律按原始价格重新构建
+            analyzer = NetworkAnalyzer(db_path)
+        return analyzer.get_optimization_weights(hub_centrality=hub_centrality)
+
+
+def _shared_analyzer(db_path, fingerprint):
+    analyzer = _analyzers.get(db_path)
+    if analyzer is None or analyzer.fingerprint != fingerprint:
+        analyzer = NetworkAnalyzer(db_path)
+        _analyzers.clear()
+        _analyzers[db_path] = analyzer
+    return analyzer
+
+
+def apply_price_updates(db_path, item_prices):
+    """
+    把模拟器的定向改价 (CS2TradeUpSimulator.refresh_realtime_prices 的返回值) 转交共享分析器做增量更新。
+    之后的图谱 HTML 与 load_optimization_weights 按新的价格版本存取缓存。返回 PageRank 迭代次数。
+    """
+    if not item_prices: return 0
+    with _analyzer_lock:
+        return _shared_analyzer(db_path, db_fingerprint(db_path)).update_prices(item_prices)
+
+
+def shared_price_version(db_path):
+    """
+    本进程共享分析器的当前价格版本。子进程中没有共享分析器，
+    需由父进程取得后显式传给 load_optimization_weights，才能读到同步后价格的中心性缓存。
+    """
+    return _current_price_version(db_path, db_fingerprint(db_path))
+
+
+def _current_price_version(db_path, fingerprint):
+    """共享分析器经增量改价后的价格版本；没有共享分析器时为数据库原始价格 ("")"""
+    analyzer = _analyzers.get(db_path)
+    return analyzer.price_version if analyzer is not None and analyzer.fingerprint == fingerprint else ""
+
+
+def cached_network_html(db_path, output_dir, rarity_filter=None, top_n=100, theme_colors=None, fixed_layout=False):
+    """
+    网络图谱 HTML 的磁盘缓存，键为 (稀有度筛选, top_n, 背景色, 布局模式, 数据库指纹, 价格版本)。
+    主题只影响背景色 (字体颜色由其推导)，故只以背景色入键，配色相同的主题共享同一份文件。
+    文件名由缓存键决定，不同请求互不覆盖；命中时不加载数据库、不构建网络。
+    返回 (HTML 路径, 摘要 {'node_count': 全网节点数, 'top_node': PageRank 最高的节点})。
+    """
+    fingerprint = db_fingerprint(db_path)
+    bg_color = theme_colors.get('bg_main', '#121212') if theme_colors else '#121212'
+    filt = sorted(rarity_filter) if rarity_filter else "all"
+    price_version = _current_price_version(db_path, fingerprint)
+    meta_path = _cache_path("network_html", fingerprint, price_version, filt, top_n, bg_color, bool(fixed_layout),
+                            HTML_CACHE_VERSION)
+    html_path = os.path.join(output_dir, f"{meta_path.stem}.html")
+
+    def cached():
+        meta = _read_json_cache(meta_path)
+        if meta and os.path.isfile(html_path):
+            print(f"⚡ 命中图谱缓存 ({os.path.basename(html_path)})")
+            return html_path, meta
+        return None
+
+    hit = cached()
+    if hit: return hit
+
+    # 未命中时串行生成 (拿到锁后再查一次，同一请求并发时只生成一份)；
+    # 共享的分析器只构建一次，中心性 / 布局也各自走缓存
+    with _analyzer_lock:
+        hit = cached()
+        if hit: return hit
+        analyzer = _shared_analyzer(db_path, fingerprint)
+        pagerank = (analyzer.metrics or analyzer.calculate_centrality()).get('pagerank', {})
+        analyzer.generate_interactive_html(html_path, rarity_filter, top_n, theme_colors, fixed_layout=fixed_layout)
+        meta = {'node_count': len(pagerank), 'top_node': max(pagerank, key=pagerank.get) if pagerank else None}
+        if pagerank: _write_json_cache(meta_path, meta)
+        _prune_files(output_dir, "network_html_*.html", _cache_max_entries())
+    return html_path, meta
+
+
+def pagerank_power(A, alpha=0.85, max_iter=100, tol=1.0e-6, x0=None):
+    """
+    稀疏矩阵上的 PageRank 幂迭代，语义与 nx.pagerank(weight='weight') 一致:
+    按加权出度行归一化，悬挂节点的质量均匀分配，收敛判据为 L1 误差 < N * tol。
+    x0 可传入上一次的结果做热启动。返回 (pagerank 向量, 迭代次数)；不收敛时返回 (None, max_iter)。
+    """
+    n = A.shape[0]
+    if n == 0: return np.zeros(0), 0
+    out_w = np.asarray(A.sum(axis=1)).ravel()
+    dangling = out_w == 0
+    inv = np.divide(1.0, out_w, out=np.zeros(n), where=~dangling)
+    # 转置后左乘: x_new = W^T x
+    WT = (sp.diags(inv) @ A).T.tocsr()
+
+    x = np.full(n, 1.0 / n) if x0 is None else np.asarray(x0, dtype=np.float64)
+    x = x / x.sum()
+    p = np.full(n, 1.0 / n)
+    for it in range(1, max_iter + 1):
+        xlast = x
+        x = alpha * (WT @ xlast + xlast[dangling].sum() * p) + (1 - alpha) * p
+        if np.abs(x - xlast).sum() < n * tol:
+            return x, it
+    return None, max_iter
 
 
 class NetworkAnalyzer:
@@ -11,15 +250,67 @@ class NetworkAnalyzer:
     负责构建 CS2 饰品交易网络。
     【架构关键】内部 ID 使用 "英文名 (系列)" 以确保唯一性和算法匹配。
     显示时使用 "中文名" 作为 Label。
+    图以 CSR 稀疏邻接矩阵 (权重 = 产出均价 / 输入均价) 保存，中心性直接在矩阵上计算；
+    networkx 图 (self.G) 只在导出可视化时按需构建。
     """
 
-    def __init__(self, db_path):
+    def __init__(self, db_path, price_version=""):
         self.db_path = db_path
-        self.G = nx.DiGraph()
+        self.price_version = price_version
+        self.fingerprint = None
         self.raw_db = {}
         self.metrics = {}
+        # 指标的计算参数 (如近似中心性的 epsilon)，与指标本身分开存放
+        self.metrics_meta = {}
+        # 节点表
+        self.node_ids = []
+        self.node_index = {}
+        self.node_labels = []
+        self.node_items = []  # 指向 raw_db 中的物品字典，改价时同步更新
+        self.node_groups = np.zeros(0, dtype=np.int64)
+        self.node_values = np.zeros(0, dtype=np.float64)
+        # 边表 (与 CSR 的非零元一一对应)
+        self.edge_src = np.zeros(0, dtype=np.int64)
+        self.edge_dst = np.zeros(0, dtype=np.int64)
+        self.edge_weight = np.zeros(0, dtype=np.float64)
+        self.edge_roi = np.zeros(0, dtype=np.float64)
+        self.A = sp.csr_matrix((0, 0))
+        self.pagerank_vec = None
+        self._G = None
+        self._condition_graph = None
         self._load_and_build()
 
+    @property
+    def G(self) -> nx.DiGraph:
+        """导出用的 networkx 图，首次访问时由数组构建"""
+        if self._G is None: self._G = self._to_networkx()
+        return self._G
+
+    def condition_layer(self):
+        """按磨损等级展开的网络层 (每个 物品 x 磨损等级 一个节点)，首次访问时构建"""
+        if self._condition_graph is None:
+            from .condition_graph import ConditionGraph
+            self._condition_graph = ConditionGraph(self.raw_db)
+        return self._condition_graph
+
+    def collection_clusters(self, k=8, seed=0):
+        """收藏品 -> 簇编号: 按各稀有度产出均价结构建 kNN 稀疏图后做标签传播"""
+        return collection_clusters(self.raw_db, k=k, seed=seed)
+
+    def _add_node(self, item, col_name, group):
+        node_id = f"{item['name']} ({col_name})"
+        idx = self.node_index.get(node_id)
+        if idx is None:
+            idx = len(self.node_ids)
+            self.node_index[node_id] = idx
+            self.node_ids.append(node_id)
+            self.node_labels.append(item.get('name_cn', item['name']))
+            self.node_items.append(item)
+            price_vals = list(item.get('price_dict', {}).values())
+            self._values.append(float(sum(price_vals) / len(price_vals)) if price_vals else 0.0)
+            self._groups.append(int(group))
+        return idx
+
     def _load_and_build(self):
         print(f"🕸️ [NetworkAnalyzer] 开始加载数据库...")
 
@@ -28,15 +319,17 @@ class NetworkAnalyzer:
             return
 
         try:
-            with open(self.db_path, "r", encoding="utf-8") as f:
-                self.raw_db = json.load(f)
+            with open(self.db_path, "rb") as f:
+                content = f.read()
+            self.fingerprint = hashlib.sha256(content).hexdigest()
+            self.raw_db = json.loads(content.decode("utf-8"))
         except Exception as e:
             print(f"❌ 读取 JSON 失败: {e}")
             return
 
-        node_count = 0
-
-        # 构建图
+        # 1. 节点: 每个物品的均价只计算一次
+        self._values, self._groups = [], []
+        blocks = []
         for col_name, tiers in self.raw_db.items():
             tiers_int = {}
             for k, v in tiers.items():
@@ -49,76 +342,183 @@ class NetworkAnalyzer:
                 inputs = tiers_int.get(r, [])
                 outputs = tiers_int.get(r + 1, [])
                 if not inputs or not outputs: continue
-
-                for i_item in inputs:
-                    # ✅ 核心修正：ID 使用英文唯一标识，Label 使用中文
-                    u_id = f"{i_item['name']} ({col_name})"
-                    u_label = i_item.get('name_cn', i_item['name'])
-
-                    price_vals = list(i_item.get('price_dict', {}).values())
-                    avg_price = float(sum(price_vals) / len(price_vals)) if price_vals else 0.0
-
-                    if u_id not in self.G:
-                        self.G.add_node(u_id, label=u_label, title=f"均价: ¥{avg_price:.2f}", group=int(r),
-                                        value=avg_price)
-                        node_count += 1
-
-                    for o_item in outputs:
-                        v_id = f"{o_item['name']} ({col_name})"
-                        v_label = o_item.get('name_cn', o_item['name'])
-
-                        oprice_vals = list(o_item.get('price_dict', {}).values())
-                        avg_oprice = float(sum(oprice_vals) / len(oprice_vals)) if oprice_vals else 0.0
-
-                        if v_id not in self.G:
-                            self.G.add_node(v_id, label=v_label, title=f"均价: ¥{avg_oprice:.2f}", group=int(r + 1),
-                                            value=avg_oprice)
-                            node_count += 1
-
-                        safe_price = avg_price if avg_price > 0.1 else 0.1
-                        roi = (avg_oprice - safe_price) / safe_price
-                        weight = avg_oprice / safe_price
-
-                        self.G.add_edge(u_id, v_id, weight=weight, roi=roi, title=f"ROI: {roi * 100:.1f}%")
-
-        print(f"✅ 网络构建完成: {node_count} 节点 (内部英文ID)")
-
-    def calculate_centrality(self):
-        if not self.G.nodes: return {}
-        try:
-            pagerank = nx.pagerank(self.G, weight='weight')
-        except:
-            pagerank = nx.degree_centrality(self.G)
-
-        hubs = nx.degree_centrality(self.G)
-        self.metrics = {'pagerank': pagerank, 'hubs': hubs}
+                u_idx = [self._add_node(i_item, col_name, r) for i_item in inputs]
+                v_idx = [self._add_node(o_item, col_name, r + 1) for o_item in outputs]
+                blocks.append((u_idx, v_idx))
+
+        self.node_values = np.asarray(self._values, dtype=np.float64)
+        self.node_groups = np.asarray(self._groups, dtype=np.int64)
+        del self._values, self._groups
+
+        # 2. 边: 每个 (收藏品, 稀有度) 块是输入 x 产出的完全二分图，一次性展开
+        if blocks:
+            src = np.concatenate([np.repeat(np.asarray(u, dtype=np.int64), len(v)) for u, v in blocks])
+            dst = np.concatenate([np.tile(np.asarray(v, dtype=np.int64), len(u)) for u, v in blocks])
+        else:
+            src = dst = np.zeros(0, dtype=np.int64)
+
+        n = len(self.node_ids)
+        # 重复边 (同名物品重复出现) 只保留一条，与 DiGraph.add_edge 的覆盖语义一致；
+        # np.unique 返回按 (src, dst) 排序的结果，正好是 CSR 的存储顺序
+        key = src * max(n, 1) + dst
+        _, first = np.unique(key, return_index=True)
+        self.edge_src, self.edge_dst = src[first], dst[first]
+        self._reweight_edges()
+
+        print(f"✅ 网络构建完成: {n} 节点 / {len(self.edge_src)} 条边 (内部英文ID)")
+
+    def _edge_weights(self, mask=None):
+        src, dst = (self.edge_src, self.edge_dst) if mask is None else (self.edge_src[mask], self.edge_dst[mask])
+        safe_price = np.maximum(self.node_values[src], 0.1)
+        out_price = self.node_values[dst]
+        return out_price / safe_price, (out_price - safe_price) / safe_price
+
+    def _reweight_edges(self):
+        """由节点均价重算全部边的 weight / roi 并重建 CSR 矩阵"""
+        self.edge_weight, self.edge_roi = self._edge_weights()
+        n = len(self.node_ids)
+        # 边已按 (src, dst) 排序，直接构造 CSR，使 A.data 与边表逐项对齐 (便于原地改权)
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(self.edge_src, minlength=n))]).astype(np.int64)
+        self.A = sp.csr_matrix((self.edge_weight.copy(), self.edge_dst.copy(), indptr), shape=(n, n))
+        self._G = None
+
+    def update_prices(self, price_changes, max_iter=100):
+        """
+        价格变化后的增量更新: 图拓扑不变，只原地重写受影响边的 weight / roi，
+        并以上一次的 PageRank 向量热启动迭代。
+        price_changes: { "Name (Collection)": 新的 price_dict 或均价 }
+        返回 PageRank 迭代次数 (没有有效变化时为 0)。
+        """
+        changed = []
+        for node_id, price in price_changes.items():
+            idx = self.node_index.get(node_id)
+            if idx is None: continue
+            if isinstance(price, dict):
+                self.node_items[idx]['price_dict'] = dict(price)
+                vals = list(price.values())
+                value = float(sum(vals) / len(vals)) if vals else 0.0
+            else:
+                value = float(price)
+            if value != self.node_values[idx]:
+                self.node_values[idx] = value
+                changed.append(idx)
+        if not changed: return 0
+
+        changed = np.asarray(changed, dtype=np.int64)
+        mask = np.isin(self.edge_src, changed) | np.isin(self.edge_dst, changed)
+        weight, roi = self._edge_weights(mask)
+        self.edge_weight[mask] = weight
+        self.edge_roi[mask] = roi
+        self.A.data[mask] = weight
+        self._G = None
+        self._condition_graph = None
+
+        # 价格版本随变化链式更新，中心性缓存按新版本存取
+        digest = hashlib.sha256(f"{self.price_version}|".encode())
+        for idx in changed.tolist():
+            digest.update(f"{self.node_ids[idx]}={self.node_values[idx]!r};".encode())
+        self.price_version = digest.hexdigest()[:16]
+
+        x0 = self.pagerank_vec if self.pagerank_vec is not None and len(self.pagerank_vec) == len(self.node_ids) else None
+        pr_vec, iters = pagerank_power(self.A, max_iter=max_iter, x0=x0)
+        if pr_vec is None: pr_vec = self.degree_centrality()
+        self.pagerank_vec = pr_vec
+        hubs = self.metrics.get('hubs') or dict(zip(self.node_ids, self.degree_centrality().tolist()))
+        # 介数 / 接近中心性只依赖拓扑 (不计边权)，改价后原样保留
+        self.metrics = {**self.metrics, 'pagerank': dict(zip(self.node_ids, pr_vec.tolist())), 'hubs': hubs}
+        self._write_cache()
+        print(f"♻️ 增量更新: {len(changed)} 个物品改价，{int(mask.sum())} 条边重新加权，PageRank {iters} 次迭代收敛")
+        return iters
+
+    def _to_networkx(self) -> nx.DiGraph:
+        G = nx.DiGraph()
+        for node_id, label, group, value in zip(self.node_ids, self.node_labels,
+                                                self.node_groups.tolist(), self.node_values.tolist()):
+            G.add_node(node_id, label=label, title=f"均价: ¥{value:.2f}", group=int(group), value=value)
+        ids = self.node_ids
+        G.add_edges_from(
+            (ids[u], ids[v], {'weight': w, 'roi': roi, 'title': f"ROI: {roi * 100:.1f}%"})
+            for u, v, w, roi in zip(self.edge_src.tolist(), self.edge_dst.tolist(),
+                                    self.edge_weight.tolist(), self.edge_roi.tolist())
+        )
+        return G
+
+    def degree_centrality(self) -> np.ndarray:
+        """有向图度中心性: (入度 + 出度) / (N - 1)"""
+        n = len(self.node_ids)
+        if n <= 1: return np.ones(n)
+        deg = np.bincount(self.edge_src, minlength=n) + np.bincount(self.edge_dst, minlength=n)
+        return deg / (n - 1)
+
+    def calculate_centrality(self, use_cache=True, hub_centrality=False):
+        """
+        PageRank + 度中心性；hub_centrality 时再计算基于源点抽样的近似介数 / 接近中心性
+        (误差由 config.NETWORK_CENTRALITY_EPSILON 控制，源点分批在进程池中并行)。
+        """
+        if not self.node_ids: return {}
+        if use_cache and self._load_cached_centrality():
+            if not hub_centrality or 'betweenness' in self.metrics: return self.metrics
+        else:
+            hubs_vec = self.degree_centrality()
+            pr_vec, _ = pagerank_power(self.A)
+            if pr_vec is None: pr_vec = hubs_vec
+
+            self.pagerank_vec = pr_vec
+            self.metrics = {'pagerank': dict(zip(self.node_ids, pr_vec.tolist())),
+                            'hubs': dict(zip(self.node_ids, hubs_vec.tolist()))}
+
+        if hub_centrality:
+            epsilon = _centrality_epsilon()
+            bc_vec, cl_vec, k = approximate_centralities(
+                self.A, epsilon=epsilon, workers=getattr(config, 'NETWORK_CENTRALITY_WORKERS', None))
+            self.metrics['betweenness'] = dict(zip(self.node_ids, bc_vec.tolist()))
+            self.metrics['closeness'] = dict(zip(self.node_ids, cl_vec.tolist()))
+            self.metrics_meta['approx_epsilon'] = epsilon
+            print(f"📐 近似介数 / 接近中心性完成: 抽样 {k} / {len(self.node_ids)} 个源点 (epsilon={epsilon})")
+        if use_cache: self._write_cache()
         return self.metrics
 
-    def get_optimization_weights(self):
+    def _write_cache(self):
+        if not self.fingerprint: return
+        payload = {'pagerank': self.metrics['pagerank'], 'hubs': self.metrics['hubs'],
+                   'weights': _weights_from_pagerank(self.metrics['pagerank'])}
+        if 'betweenness' in self.metrics:
+            payload.update({k: self.metrics[k] for k in ('betweenness', 'closeness')})
+            payload['meta'] = dict(self.metrics_meta)
+            payload['hub_weights'] = _hub_weights(self.metrics['pagerank'], self.metrics['betweenness'],
+                                                  self.metrics['closeness'])
+        _write_centrality_cache(self.fingerprint, self.price_version, payload)
+
+    def _load_cached_centrality(self) -> bool:
+        if not self.fingerprint: return False
+        cached = _read_centrality_cache(self.fingerprint, self.price_version)
+        if not cached or set(cached.get('pagerank', {})) != set(self.node_index): return False
+        self.metrics = {'pagerank': cached['pagerank'], 'hubs': cached['hubs']}
+        if 'betweenness' in cached and _cached_epsilon(cached) == _centrality_epsilon():
+            self.metrics.update({k: cached[k] for k in ('betweenness', 'closeness')})
+            self.metrics_meta = dict(cached['meta'])
+        self.pagerank_vec = np.array([cached['pagerank'][n] for n in self.node_ids], dtype=np.float64)
+        print(f"⚡ 命中中心性缓存 ({self.fingerprint[:8]})")
+        return True
+
+    def get_optimization_weights(self, hub_centrality=False):
         """
         供 SmartOptimizer 使用。
         返回 { "AK-47 | Slate": score, ... }
         """
-        if not self.metrics: self.calculate_centrality()
-        weights = {}
-        pr = self.metrics.get('pagerank', {})
-        for node_id, score in pr.items():
-            # node_id 是 "Name (Collection)"
-            # 我们需要拆分出 Name 给优化器匹配
-            clean_name = node_id.split(' (')[0]
-            weights[clean_name] = float(score * 100)
-        return weights
-
-    def _darken_color(self, hex_color, factor):
-        try:
-            rgb = mcolors.hex2color(hex_color)
-            new_rgb = [max(0, c * factor) for c in rgb]
-            return mcolors.to_hex(new_rgb)
-        except:
-            return hex_color
-
-    def generate_interactive_html(self, output_path, rarity_filter=None, top_n=100, theme_colors=None):
-        if not self.G.nodes:
+        if not self.metrics or (hub_centrality and 'betweenness' not in self.metrics):
+            self.calculate_centrality(hub_centrality=hub_centrality)
+        if hub_centrality:
+            return _hub_weights(self.metrics['pagerank'], self.metrics['betweenness'], self.metrics['closeness'])
+        return _weights_from_pagerank(self.metrics.get('pagerank', {}))
+
+    def generate_interactive_html(self, output_path, rarity_filter=None, top_n=100, theme_colors=None,
+                                  fixed_layout=False):
+        """
+        fixed_layout=True 时在 Python 端预计算节点坐标 (按筛选条件 + 数据库版本缓存)，
+        输出的 HTML 关闭物理引擎，大图也能立即打开。
+        """
+        if not self.node_ids:
             self._write_empty(output_path, "No Data")
             return output_path
 
@@ -130,76 +530,26 @@ class NetworkAnalyzer:
             if (r + g + b) / 3 > 128: is_dark = False
         font_color = '#ffffff' if is_dark else '#222222'
 
-        # 2. 筛选
-        sub_G = self.G.copy()
-        if rarity_filter:
-            nodes_to_keep = [n for n, attr in sub_G.nodes(data=True) if attr.get('group') in rarity_filter]
-            sub_G = sub_G.subgraph(nodes_to_keep)
-
-        if sub_G.number_of_nodes() > top_n:
-            try:
-                pr = nx.pagerank(sub_G)
-                top_nodes = sorted(pr, key=pr.get, reverse=True)[:top_n]
-                sub_G = sub_G.subgraph(top_nodes)
-            except:
-                deg = nx.degree_centrality(sub_G)
-                top_nodes = sorted(deg, key=deg.get, reverse=True)[:top_n]
-                sub_G = sub_G.subgraph(top_nodes)
+        # 2. 筛选 (直接在节点/边数组上取掩码，不复制图)
+        selected = self._select_nodes(rarity_filter, top_n)
 
         # 3. 初始化 PyVis
-        net = Network(height="800px", width="100%", bgcolor=bg_color, font_color=font_color, select_menu=True,
-                      cdn_resources='remote')
-        net.from_nx(sub_G)
-
-        # 4. 视觉增强
-        base_colors = {1: '#dbeafe', 2: '#93c5fd', 3: '#60a5fa', 4: '#c084fc', 5: '#f472b6', 6: '#f87171'}
-
-        all_prices = [float(n.get('value', 0)) for n in net.nodes]
-        max_price = max(all_prices) if all_prices else 1.0
-        min_price = min(all_prices) if all_prices else 0.0
-
-        for node in net.nodes:
-            group = node.get('group', 1)
-            price = float(node.get('value', 0))
-
-            # 颜色加深
-            norm_price = (price - min_price) / (max_price - min_price + 0.1)
-            darken = 1.0 - (norm_price * 0.5)
-            base_c = base_colors.get(group, '#cccccc')
-            final_color = self._darken_color(base_c, darken)
-
-            node['color'] = {
-                'background': final_color,
-                'border': '#fff' if is_dark else '#333',
-                'highlight': {'background': '#ffd700', 'border': '#fff'},
-                'hover': {'background': '#ffd700', 'border': '#fff'}
-            }
-            node['size'] = 20 + (norm_price * 30)
-
-            # ✅ 关键：显示时使用中文 Label
-            display_label = node.get('label', node.get('id'))
-            node['label'] = str(display_label)
-            node['title'] = f"<b>{display_label}</b><br>均价: ¥{price:.2f}"
-            node['font'] = {'size': 16, 'face': 'Microsoft YaHei'}
-
-        # 边样式
-        all_profits = [float(e.get('profit', 0)) for e in net.edges]
-        max_prof = max(all_profits) if all_profits else 1.0
-
-        for edge in net.edges:
-            profit = float(edge.get('profit', 0))
-            width = 1.0 + (profit / (max_prof + 0.1)) * 7.0 if profit > 0 else 1.0
-            edge['width'] = min(8.0, width)
-
-            if profit < 0:
-                col, op = '#555', 0.2
-            elif profit < max_prof * 0.5:
-                col, op = '#ff9f43', 0.6
-            else:
-                col, op = '#ff4757', 0.9
-
-            edge['color'] = {'color': col, 'opacity': op, 'highlight': '#00d2ff', 'hover': '#00d2ff'}
-            edge['title'] = f"价值变动: ¥{profit:+.2f}"
+        # font_color=False: 字体由每个节点自带 (否则 add_node 会覆盖节点的 font)；
+        # directed=True: 跳过 add_edge 对无向图逐条扫描已有边的去重 (边已去重)，箭头在边上显式关闭
+        net = Network(height="800px", width="100%", bgcolor=bg_color, font_color=False, directed=True,
+                      select_menu=True, cdn_resources='remote')
+
+        # 4. 视觉增强 (向量化计算颜色/尺寸/边样式后逐个加入 PyVis)
+        nodes, edges = self._vis_elements(selected, is_dark, font_color)
+        if fixed_layout:
+            positions = self._layout_positions(selected, rarity_filter, top_n)
+            for node in nodes:
+                node['x'], node['y'] = positions[node['id']]
+        for node in nodes:
+            net.add_node(node.pop('id'), **node)
+        no_arrows = {'to': {'enabled': False}}
+        for edge in edges:
+            net.add_edge(edge.pop('from'), edge.pop('to'), arrows=no_arrows, **edge)
 
         # 5. 物理配置
         options = {
@@ -225,6 +575,9 @@ class NetworkAnalyzer:
                 "stabilization": {"enabled": True, "iterations": 600}
             }
         }
+        if fixed_layout:
+            options["physics"] = {"enabled": False}
+            options["edges"] = {"smooth": False}
         net.set_options(json.dumps(options))
 
         # 6. 保存
@@ -233,12 +586,98 @@ class NetworkAnalyzer:
             html = net.generate_html()
             # 修复 customScalingFunction 被 json.dumps 转为字符串的问题
             html = html.replace('"SCALING_FUNC_PLACEHOLDER"', "function (min,max,total,value) { if (max === min) return 0.5; var scale = 1.0 / (max - min); return Math.max(0,(value - min)*scale); }")
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(html)
+            _atomic_write_text(output_path, html)
         except Exception as e:
             self._write_empty(output_path, str(e))
         return output_path
 
+    def _select_nodes(self, rarity_filter=None, top_n=100) -> np.ndarray:
+        """按稀有度过滤后取 PageRank 前 top_n 的节点下标 (复用已计算的中心性)"""
+        candidates = np.arange(len(self.node_ids))
+        if rarity_filter:
+            candidates = np.flatnonzero(np.isin(self.node_groups, list(rarity_filter)))
+        if len(candidates) <= top_n: return candidates
+
+        if self.pagerank_vec is None: self.calculate_centrality()
+        scores = self.pagerank_vec[candidates]
+        part = np.argpartition(-scores, top_n - 1)[:top_n]
+        return candidates[part[np.argsort(-scores[part], kind='stable')]]
+
+    def _layout_positions(self, selected, rarity_filter, top_n):
+        """所选节点的预计算坐标 {node_id: (x, y)}，按 (筛选条件, 数据库指纹, 价格版本) 缓存"""
+        filt = sorted(rarity_filter) if rarity_filter else "all"
+        path = _cache_path("layout", self.fingerprint, self.price_version, filt, top_n, LAYOUT_CACHE_VERSION)
+        ids = [self.node_ids[i] for i in selected.tolist()]
+        cached = _read_json_cache(path) if self.fingerprint else None
+        if cached and all(i in cached for i in ids):
+            print(f"⚡ 命中布局缓存 ({len(ids)} 节点)")
+            return cached
+
+        # 诱导子图的边，重新编号为 0..k-1
+        local = np.full(len(self.node_ids), -1, dtype=np.int64)
+        local[selected] = np.arange(len(selected))
+        mask = (local[self.edge_src] >= 0) & (local[self.edge_dst] >= 0)
+        pos = force_layout(len(selected), local[self.edge_src[mask]], local[self.edge_dst[mask]],
+                           scale=max(1000.0, np.sqrt(len(selected)) * 80))
+        positions = {node_id: (round(float(x), 1), round(float(y), 1)) for node_id, (x, y) in zip(ids, pos)}
+        if self.fingerprint: _write_json_cache(path, positions)
+        return positions
+
+    def _vis_elements(self, selected, is_dark, font_color):
+        """生成 vis.js 的节点/边字典: 颜色按价格加深，边宽/颜色按价值变动 (产出均价 - 输入均价)"""
+        base_colors = {1: '#dbeafe', 2: '#93c5fd', 3: '#60a5fa', 4: '#c084fc', 5: '#f472b6', 6: '#f87171'}
+        if not len(selected): return [], []
+
+        prices = self.node_values[selected]
+        norm_price = (prices - prices.min()) / (prices.max() - prices.min() + 0.1)
+        groups = self.node_groups[selected]
+        base_rgb = np.array([mcolors.hex2color(base_colors.get(int(g), '#cccccc')) for g in groups.tolist()])
+        rgb = np.round(np.clip(base_rgb * (1.0 - norm_price * 0.5)[:, None], 0, 1) * 255).astype(int)
+        sizes = 20 + norm_price * 30
+
+        border = '#fff' if is_dark else '#333'
+        nodes = []
+        for k, idx in enumerate(selected.tolist()):
+            # ✅ 关键：显示时使用中文 Label
+            label = str(self.node_labels[idx])
+            r, g, b = rgb[k]
+            # 不带 group: 颜色已按稀有度显式给出 (PyVis 的 add_node 在有 group 时会丢弃 color)
+            nodes.append({
+                'id': self.node_ids[idx], 'label': label, 'shape': 'dot',
+                'value': float(prices[k]), 'size': float(sizes[k]),
+                'title': f"<b>{label}</b><br>均价: ¥{prices[k]:.2f}",
+                'color': {
+                    'background': f"#{r:02x}{g:02x}{b:02x}",
+                    'border': border,
+                    'highlight': {'background': '#ffd700', 'border': '#fff'},
+                    'hover': {'background': '#ffd700', 'border': '#fff'}
+                },
+                'font': {'size': 16, 'face': 'Microsoft YaHei', 'color': font_color}
+            })
+
+        # 边: 两端都被选中的边
+        keep = np.zeros(len(self.node_ids), dtype=bool)
+        keep[selected] = True
+        mask = keep[self.edge_src] & keep[self.edge_dst]
+        src, dst = self.edge_src[mask], self.edge_dst[mask]
+        if not len(src): return nodes, []
+
+        profit = self.node_values[dst] - self.node_values[src]
+        max_prof = profit.max()
+        widths = np.minimum(8.0, np.where(profit > 0, 1.0 + profit / (max_prof + 0.1) * 7.0, 1.0))
+        level = np.where(profit < 0, 0, np.where(profit < max_prof * 0.5, 1, 2))
+        styles = [('#555', 0.2), ('#ff9f43', 0.6), ('#ff4757', 0.9)]
+
+        ids = self.node_ids
+        edges = []
+        for u, v, p, w, lv in zip(src.tolist(), dst.tolist(), profit.tolist(), widths.tolist(), level.tolist()):
+            col, op = styles[lv]
+            edges.append({
+                'from': ids[u], 'to': ids[v], 'width': w, 'title': f"价值变动: ¥{p:+.2f}",
+                'color': {'color': col, 'opacity': op, 'highlight': '#00d2ff', 'hover': '#00d2ff'}
+            })
+        return nodes, edges
+
     def _write_empty(self, p, m):
         try:
             with open(p, 'w', encoding='utf-8') as f:
@@ -0,0 +1,75 @@
+import random
+from typing import Dict, List, Optional
+
+
+class OperatorBandit:
+    """
+    变异算子的自适应选择 (概率匹配, Probability Matching)。
+    每代结束时用各算子子代的成功率 (优于较好父代的比例) 指数平滑更新质量 q，
+    选择概率 p_i = p_min + (1 - K * p_min) * q_i / sum(q)，保证每个算子都保留最低探索概率。
+    同时记录各算子的使用次数、成功次数与评估开销 (模拟次数 / 耗时)，用于导出到 history。
+    """
+
+    def __init__(self, operators: List[str], alpha: float = 0.3, p_min: float = 0.05,
+                 initial_probs: Optional[Dict[str, float]] = None):
+        self.operators = list(operators)
+        self.alpha = alpha
+        k = len(self.operators)
+        self.p_min = min(p_min, 1.0 / k) if k else 0.0
+        if initial_probs:
+            total = sum(initial_probs.get(op, 0.0) for op in self.operators) or 1.0
+            self.probs = {op: initial_probs.get(op, 0.0) / total for op in self.operators}
+        else:
+            self.probs = {op: 1.0 / k for op in self.operators}
+        # 初始质量与初始概率一致，避免第一代就大幅跳变
+        self.quality = dict(self.probs)
+        self.totals = {op: self._empty() for op in self.operators}
+        self._gen = {}
+
+    @staticmethod
+    def _empty():
+        return {'uses': 0, 'successes': 0, 'evals': 0, 'eval_time': 0.0}
+
+    def select(self, rng=random) -> str:
+        u = rng.random()
+        acc = 0.0
+        for op in self.operators:
+            acc += self.probs[op]
+            if u < acc: return op
+        return self.operators[-1]
+
+    def record(self, op: str, improved: bool, eval_time: float = 0.0):
+        """记录一个子代的评估结果；op 可以是不参与选择的算子 (如纯交叉)，只做统计"""
+        for stats in (self._gen.setdefault(op, self._empty()), self.totals.setdefault(op, self._empty())):
+            stats['uses'] += 1
+            stats['evals'] += 1
+            stats['successes'] += int(improved)
+            stats['eval_time'] += eval_time
+
+    def end_generation(self, adapt: bool = True) -> Dict[str, dict]:
+        """结束一代: 按本代成功率更新选择概率，返回本代各算子统计 (用于写入 history)"""
+        if adapt and self.operators:
+            for op in self.operators:
+                stats = self._gen.get(op)
+                if not stats or not stats['uses']: continue
+                rate = stats['successes'] / stats['uses']
+                self.quality[op] += self.alpha * (rate - self.quality[op])
+
+            total_q = sum(self.quality.values())
+            k = len(self.operators)
+            for op in self.operators:
+                share = self.quality[op] / total_q if total_q > 0 else 1.0 / k
+                self.probs[op] = self.p_min + (1 - k * self.p_min) * share
+
+        report = {}
+        for op in sorted(set(self.operators) | set(self._gen)):
+            stats = self._gen.get(op, self._empty())
+            report[op] = {
+                'prob': self.probs.get(op),
+                'uses': stats['uses'],
+                'success_rate': stats['successes'] / stats['uses'] if stats['uses'] else 0.0,
+                'evals': stats['evals'],
+                'eval_time': stats['eval_time'],
+            }
+        self._gen = {}
+        return report
@@ -1,28 +1,40 @@
 import random
 import copy
+import time
+import numpy as np
 import networkx as nx
-from dataclasses import dataclass
 from typing import List, Dict, Callable, Optional
 
 import config
 from . import utils
-from .simulator import TradeInputItem, CS2TradeUpSimulator
+from .simulator import TradeInputItem, CS2TradeUpSimulator, SimulationResult
+from .candidate_index import CandidateIndex, CandidatePool
+from .float_solver import build_float_options, solve_recipe_floats
+from .mix_solver import CollectionMixSolver
+from .inverse_search import TargetRecipeFinder
+from .chain_planner import ChainPlanner
+from .pareto import nsga2_select
+from .operator_bandit import OperatorBandit
+from .collection_clusters import collection_clusters, cluster_affinity
 from src.utils import visualization
-from src.core.network_graph import NetworkAnalyzer
+from src.core.network_graph import load_optimization_weights
 
-
-@dataclass
-class CandidateInfo:
-    collection: str
-    data: dict
-    avg_price: float
-    max_output: float
-    hub_score: float
+# 变异算子及其在默认 (非自适应) 模式下的名义概率
+MUTATION_OPERATORS = {'boundary_snap': 0.15, 'float_shift': 0.34, 'swap_filler': 0.15, 'swap_any': 0.15}
 
 
 class SmartOptimizer:
-    def __init__(self, simulator: CS2TradeUpSimulator, use_network_guidance: bool = True):
-        self.sim = simulator
+    """
+    优化器持有模拟器的独立价格副本 (创建时快照并换汇)，之后共享模拟器的改价不会传到这里:
+    一次运行始终基于一致的价格视图。每次挖掘任务都新建优化器，自然使用最新价格；
+    长期持有的优化器 (如反向查询) 通过 apply_price_changes 同步报价变化。
+    network_price_version: 网络权重的价格版本，缺省取本进程共享分析器的版本 (子进程中须显式传入)。
+    """
+
+    def __init__(self, simulator: CS2TradeUpSimulator, use_network_guidance: bool = True,
+                 network_price_version: Optional[str] = None):
+        # 在独立副本上换汇，避免多个优化器重复放大共享数据库的价格
+        self.sim = simulator.snapshot()
         self._convert_db_currency()
         self.use_network_guidance = use_network_guidance
 
@@ -30,8 +42,9 @@ class SmartOptimizer:
         if self.use_network_guidance:
             try:
                 print("🕸️ 正在初始化网络分析权重...")
-                analyzer = NetworkAnalyzer(config.DB_PATH)
-                self.network_weights = analyzer.get_optimization_weights()
+                self.network_weights = load_optimization_weights(
+                    config.DB_PATH, price_version=network_price_version,
+                    hub_centrality=getattr(config, 'NETWORK_HUB_CENTRALITY', False))
                 print(f"✅ 网络权重加载成功，共 {len(self.network_weights)} 个节点数据")
             except Exception as e:
                 print(f"⚠️ 网络分析模块加载失败，将使用默认权重: {e}")
@@ -39,6 +52,20 @@ class SmartOptimizer:
 
         self.scores = self._calculate_network_scores()
         self.premium_scaler = 1.0
+        self._indexes: Dict[int, CandidateIndex] = {}
+        self._float_options = {}
+        self._target_finder = None
+        self._price_version = self.sim.price_version
+        # 成本约束 (总成本，含 BUFF_RATIO)；None 表示不限
+        self.min_cost = None
+        self.max_cost = None
+        self._unit_bounds = (0.0, float('inf'))
+        self.pareto_front = []
+        # 收藏品聚类与按簇划分的候选池 (cluster_mode 关闭时为空)
+        self._clusters = None
+        self._seed_groups = []
+        self._group_pools = {}
+        self._mates = None
 
     def _convert_db_currency(self):
         for col in self.sim.raw_db.values():
@@ -69,36 +96,28 @@ class SmartOptimizer:
 
         return final_scores
 
+    def apply_price_changes(self, changes: Dict[str, float]) -> int:
+        """
+        把美元报价变化按汇率同步到本优化器的价格副本，返回更新的价格数。
+        依赖价格的缓存在下一次 run / 查询开始时失效；不要在 run() 进行中调用。
+        """
+        return self.sim.apply_price_changes(changes, scale=config.EXCHANGE_RATE)
+
+    def _sync_price_version(self):
+        """模拟器改价后丢弃依赖价格的缓存 (候选索引 / 磨损选项 / 反向查询求解器)"""
+        if self._price_version == self.sim.price_version: return
+        self._price_version = self.sim.price_version
+        self._indexes = {}
+        self._float_options = {}
+        self._target_finder = None
+
     def _load_candidates_for_rarity(self, rarity: int):
-        cands = []
-        for col, tiers in self.sim.raw_db.items():
-            if rarity in tiers and (rarity + 1) in tiers:
-                items = [i for i in tiers[rarity] if i.get('price_dict')]
-                outputs = tiers[rarity + 1]
-                if not items or not outputs: continue
-                prices = []
-                for item in items: prices.extend([p for p in item['price_dict'].values() if p > 0])
-                if not prices: continue
-                avg_p = sum(prices) / len(prices)
-                out_max = max([o['price_dict'].get('Factory New', 0) for o in outputs])
-
-                score = self.scores.get(items[0]['name'], 1.0)
-
-                cands.append(CandidateInfo(col, items[0], avg_p, out_max, score))
-
-        cands.sort(key=lambda x: x.max_output, reverse=True)
-        lim_micro = config.TIER_MICRO_USD * config.EXCHANGE_RATE
-        lim_low = config.TIER_LOW_USD * config.EXCHANGE_RATE
-        lim_mid = config.TIER_MID_USD * config.EXCHANGE_RATE
-
-        return {
-            "all": cands,
-            "micro": [c for c in cands if c.avg_price < lim_micro],
-            "low": [c for c in cands if lim_micro <= c.avg_price < lim_low],
-            "mid": [c for c in cands if lim_low <= c.avg_price < lim_mid],
-            "high": [c for c in cands if c.avg_price >= lim_mid],
-            "fillers": sorted(cands, key=lambda x: x.avg_price)[:40]
-        }
+        """返回该稀有度的候选池 (物品级索引，带别名表)，索引按稀有度缓存"""
+        index = self._indexes.get(rarity)
+        if index is None:
+            index = CandidateIndex(self.sim.raw_db, rarity, self.scores)
+            self._indexes[rarity] = index
+        return index.pools
 
     def _create_item(self, candidate, target_float):
         item_data = candidate.data
@@ -117,50 +136,259 @@ class SmartOptimizer:
         return TradeInputItem(candidate.collection, item_data['name'], item_data['min_float'], item_data['max_float'],
                               eff_float, real_price, base_price, condition)
 
+    def load_warm_start(self, target_rarity, n_sessions, limit, exclude=None) -> List[List[TradeInputItem]]:
+        """
+        从最近 n_sessions 个会话的最优配方热启动: 按当前价格重新定价并重新评分，
+        丢弃物品已不存在/无价格/越出成本约束的配方，去重后取当前适应度最高的 limit 个。
+        """
+        index = self._indexes.get(target_rarity)
+        if index is None or limit <= 0: return []
+        stored = visualization.load_recent_recipes(n_sessions, rarity=target_rarity, exclude=exclude)
+
+        scored, seen = [], set()
+        for entry in stored:
+            inputs = entry['inputs']
+            if len(inputs) != 10: continue
+            key = tuple(sorted((i['collection'], i['name'], round(i['float'], 6)) for i in inputs))
+            if key in seen: continue
+            seen.add(key)
+
+            recipe = []
+            for i in inputs:
+                cand = index.get(i['collection'], i['name'])
+                if cand is None: break
+                item = self._create_item(cand, i['float'])
+                if item.price == float('inf'): break
+                recipe.append(item)
+            if len(recipe) != 10 or not self._in_budget(recipe): continue
+            # 保存时的 ROI 基于旧价格，按当前价格重新评分后再排序
+            res = self.sim.simulate(recipe, target_rarity, config.BUFF_RATIO, summary_only=True)
+            scored.append((self._fitness(res), recipe))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return [recipe for _, recipe in scored[:limit]]
+
     def generate_initial_population(self, pools, pop_size) -> List[List[TradeInputItem]]:
         pop = []
-        templates = config.RECIPE_TEMPLATES
-        for _ in range(pop_size):
-            if not pools['all']: break
-            r = random.random()
-            if r < 0.3:
-                pool = pools['micro']
-            elif r < 0.6:
-                pool = pools['low']
-            elif r < 0.8:
-                pool = pools['mid']
-            else:
-                pool = pools['high']
+        if not pools['all'] or pop_size <= 0: return pop
+        # 有成本约束时被拒绝的配方会补抽，最多补抽 5 轮
+        for _ in range(5 if self._has_budget() else 1):
+            pop.extend(self._sample_grouped(pools, pop_size - len(pop)))
+            if len(pop) >= pop_size: break
+        return pop
+
+    def _sample_grouped(self, pools, n) -> List[List[TradeInputItem]]:
+        """按簇划分时，名额按各组候选数成比例分配到各组，每组在自己的候选池内抽样"""
+        if not self._seed_groups: return self._sample_recipes(pools, n)
+        weights = np.array([w for _, w in self._seed_groups], dtype=np.float64)
+        counts = np.bincount(np.random.choice(len(weights), size=n, p=weights / weights.sum()),
+                             minlength=len(weights))
+        pop = []
+        for (group_pools, _), count in zip(self._seed_groups, counts):
+            if count: pop.extend(self._sample_recipes(group_pools, int(count)))
+        return pop
 
-            main = self._weighted_choice(pool) or self._weighted_choice(pools['all'])
-            filler = self._weighted_choice(pools['fillers'])
-            t_main, t_fill = random.choice(templates)
-            f_strat = random.choice([0.005, 0.015, 0.035, 0.0699, 0.0701, 0.1499, 0.1501])
+    def collection_clusters(self) -> Dict[str, int]:
+        """收藏品按产出价值结构聚类 (kNN 图上的标签传播)，按需计算一次"""
+        if self._clusters is None:
+            self._clusters = collection_clusters(self.sim.raw_db)
+            print(f"🧩 收藏品聚类: {len(self._clusters)} 个收藏品 -> {len(set(self._clusters.values()))} 个簇")
+        return self._clusters
+
+    def _cluster_key(self, recipe) -> frozenset:
+        clusters = self._clusters or {}
+        return frozenset(clusters.get(i.collection, -1) for i in recipe)
+
+    def _cluster_groups(self, pools, mode, pairs=None):
+        """
+        按簇划分搜索空间:
+        within — 每个簇一组，主料与填充料都来自同一簇；
+        cross  — 每个簇对 (a, b) 一组，主料来自一簇、填充料来自另一簇 (两个方向各一个抽样组)，
+                 pairs 缺省时每个簇与 kNN 图上连接最强的相邻簇配对。
+        返回 (抽样组 [(候选池, 权重)], {簇集合: 该组变异用的候选池})。
+        """
+        if mode not in ('within', 'cross') or not pools['all']: return [], {}
+        clusters = self.collection_clusters()
+        filler_size = getattr(config, 'FILLER_POOL_SIZE', 40)
+        # 各候选池先按簇分桶一次，之后每组只做拼接
+        buckets = {}
+        for name, pool in pools.items():
+            if name == 'fillers': continue
+            by_cluster = buckets[name] = {}
+            for c in pool: by_cluster.setdefault(clusters.get(c.collection, -1), []).append(c)
+
+        def restrict(main_ids, filler_ids):
+            pick = lambda name, ids: [c for cid in sorted(ids) for c in buckets[name].get(cid, [])]
+            group = {name: CandidatePool(pick(name, main_ids)) for name in buckets}
+            group['all'] = CandidatePool(pick('all', main_ids | filler_ids))
+            group['fillers'] = CandidatePool(sorted(pick('all', filler_ids), key=lambda x: x.avg_price)[:filler_size])
+            return group
+
+        seed_groups, group_pools = [], {}
+        if mode == 'within':
+            for cid in sorted({clusters.get(c.collection, -1) for c in pools['all']}):
+                group = restrict({cid}, {cid})
+                if not group['fillers']: continue
+                seed_groups.append((group, len(group['all'])))
+                group_pools[frozenset([cid])] = group
+        else:
+            if pairs is None:
+                best = {}
+                for (a, b), w in cluster_affinity(self.sim.raw_db, clusters).items():
+                    for x, y in ((a, b), (b, a)):
+                        if w > best.get(x, (None, 0.0))[1]: best[x] = (y, w)
+                pairs = {(min(a, b), max(a, b)) for a, (b, _) in best.items()}
+            for a, b in sorted(set(tuple(p) for p in pairs)):
+                for main_id, filler_id in ((a, b), (b, a)):
+                    group = restrict({main_id}, {filler_id})
+                    if group['all'] and group['fillers'] and any(group[t] for t in ('micro', 'low', 'mid', 'high')):
+                        seed_groups.append((group, len(group['all'])))
+                group_pools[frozenset([a, b])] = restrict({a, b}, {a, b})
+                # 交叉后只剩单簇的子代仍在该簇对的候选池内变异，可以重新混入另一簇
+                group_pools.setdefault(frozenset([a]), group_pools[frozenset([a, b])])
+                group_pools.setdefault(frozenset([b]), group_pools[frozenset([a, b])])
+        return seed_groups, group_pools
+
+    def _pick_mate(self, p1, parents, pick=None):
+        """交叉对象限定为与 p1 属于同一簇集合的父代，找不到时与自身交叉"""
+        key = self._cluster_key(p1[0])
+        if pick:
+            for _ in range(5):
+                p2 = pick()
+                if self._cluster_key(p2[0]) == key: return p2
+            return p1
+        # 同一批父代的分组只计算一次
+        if self._mates is None or self._mates[0] is not parents:
+            mates = {}
+            for p in parents: mates.setdefault(self._cluster_key(p[0]), []).append(p)
+            self._mates = (parents, mates)
+        return random.choice(self._mates[1].get(key, [p1]))
+
+    def _sample_recipes(self, pools, n) -> List[List[TradeInputItem]]:
+        pop = []
+        templates = config.RECIPE_TEMPLATES
+        float_strategies = [0.005, 0.015, 0.035, 0.0699, 0.0701, 0.1499, 0.1501]
+
+        # 批量抽样: 一次性决定整个种群的价格段、主料、填充料、模板与磨损策略
+        tier_names = ['micro', 'low', 'mid', 'high']
+        tier_idx = np.searchsorted([0.3, 0.6, 0.8], np.random.random(n), side='right')
+        mains = [None] * n
+        for t, tier in enumerate(tier_names):
+            slots = np.flatnonzero(tier_idx == t)
+            if not len(slots): continue
+            pool = pools[tier] if pools[tier] else pools['all']
+            for slot, cand in zip(slots, pool.sample_batch(len(slots))):
+                mains[slot] = cand
+
+        fillers = (pools['fillers'] if pools['fillers'] else pools['all']).sample_batch(n)
+        template_idx = np.random.randint(len(templates), size=n)
+        strat_idx = np.random.randint(len(float_strategies), size=n)
+
+        for i in range(n):
+            main, filler = mains[i], fillers[i]
+            t_main, t_fill = templates[template_idx[i]]
+            f_strat = float_strategies[strat_idx[i]]
             recipe = []
             for _ in range(t_main): recipe.append(self._create_item(main, f_strat))
+            # 半成品剪枝: 主料已定，剩余名额无论如何填充都越界则直接丢弃 (先尝试换到最便宜磨损)
+            if not self._partial_in_budget(recipe, t_fill):
+                recipe = [self._create_item(main, self._cheapest_float(main)) for _ in range(t_main)]
+                if not self._partial_in_budget(recipe, t_fill): continue
             for _ in range(t_fill): recipe.append(self._create_item(filler, f_strat))
+            if not self._in_budget(recipe):
+                recipe = recipe[:t_main] + [self._create_item(filler, self._cheapest_float(filler))
+                                            for _ in range(t_fill)]
+                if not self._in_budget(recipe): continue
             pop.append(recipe)
         return pop
 
+    @staticmethod
+    def _cheapest_float(cand) -> float:
+        """最便宜磨损段的上端 (避开段首的溢价区)"""
+        lo, hi, _, _ = min(cand.price_curve, key=lambda seg: seg[2])
+        return max(lo, hi - 0.0001)
+
+    def _has_budget(self) -> bool:
+        return self.min_cost is not None or self.max_cost is not None
+
+    def _in_budget(self, recipe) -> bool:
+        if not self._has_budget(): return True
+        return self._in_budget_cost(sum(i.price for i in recipe) * config.BUFF_RATIO)
+
+    def _in_budget_cost(self, total_cost) -> bool:
+        if self.max_cost is not None and total_cost > self.max_cost: return False
+        if self.min_cost is not None and total_cost < self.min_cost: return False
+        return True
+
+    def _partial_in_budget(self, partial, remaining) -> bool:
+        """用单件价格上下界判断半成品配方是否仍可能落在成本区间内"""
+        if not self._has_budget(): return True
+        unit_min, unit_max = self._unit_bounds
+        cost = sum(i.price for i in partial)
+        if self.max_cost is not None and (cost + remaining * unit_min) * config.BUFF_RATIO > self.max_cost:
+            return False
+        if self.min_cost is not None and (cost + remaining * unit_max) * config.BUFF_RATIO < self.min_cost:
+            return False
+        return True
+
+    def _budget_pools(self, pools):
+        """
+        按成本约束收紧候选池: 单件最低价 + 其余 9 件全用全局最低价仍超上限的物品永远不可用。
+        同时计算单件价格上下界供半成品剪枝使用。
+        """
+        if not self._has_budget() or not pools['all']: return pools
+        unit_min = min(c.min_price for c in pools['all'])
+        # 溢价最高为 5 倍 (见 utils.estimate_price_at_float)
+        max_mult = 1.0 + 4.0 * max(self.premium_scaler, 0.0)
+        unit_max = max(max(seg[2] for seg in c.price_curve) for c in pools['all']) * max_mult
+        self._unit_bounds = (unit_min, unit_max)
+        if self.max_cost is None: return pools
+
+        limit = self.max_cost / config.BUFF_RATIO - 9 * unit_min
+        budgeted = {k: CandidatePool([c for c in v if c.min_price <= limit]) for k, v in pools.items()}
+        # 填充池按均价选取，可能整体越界而 all 中仍有可用物品
+        if not budgeted['fillers']: budgeted['fillers'] = budgeted['all']
+        return budgeted
+
     def _weighted_choice(self, cands):
         if not cands: return None
-        return random.choices(cands, weights=[c.hub_score for c in cands], k=1)[0]
-
-    def mutate(self, recipe, pools):
+        return cands.sample()
+
+    def mutate(self, recipe, pools, op=None):
+        """
+        op 为 None 时按固定概率组合算子 (默认行为)；否则只应用指定算子。
+        返回实际应用的算子名列表，用于算子统计。
+        按簇划分时，换料算子只从配方所属簇集合的候选池中抽取。
+        """
+        if self._group_pools: pools = self._group_pools.get(self._cluster_key(recipe), pools)
+        if op is not None:
+            self._apply_operator(op, recipe, pools)
+            return [op]
+        applied = []
         if random.random() < 0.15:
-            boundaries = [0.07, 0.15, 0.38, 0.45]
-            target = random.choice(boundaries);
+            applied.append('boundary_snap')
+        elif random.random() < 0.4:
+            applied.append('float_shift')
+        if random.random() < 0.3:
+            applied.append('swap_filler' if random.random() < 0.5 else 'swap_any')
+        for name in applied: self._apply_operator(name, recipe, pools)
+        return applied
+
+    def _apply_operator(self, op, recipe, pools):
+        if op == 'boundary_snap':
+            # 一半物品推到同一条磨损等级边界之上
+            target = random.choice(self.sim.condition_mapper.upper_bounds)
             eps = 0.0001 + random.random() * 0.001
             for item in recipe:
                 if random.random() < 0.5: self._update_item_float(item, target + eps)
-        elif random.random() < 0.4:
+        elif op == 'float_shift':
             shift = random.choice([-0.01, 0.01, 0.005, -0.005])
             for i in recipe: self._update_item_float(i, i.float_value + shift)
-        if random.random() < 0.3:
+        elif op in ('swap_filler', 'swap_any'):
             idx = random.randint(0, 9)
-            pool = pools['fillers'] if random.random() < 0.5 else pools['all']
-            cand = self._weighted_choice(pool)
+            cand = self._weighted_choice(pools['fillers'] if op == 'swap_filler' else pools['all'])
             if cand: recipe[idx] = self._create_item(cand, recipe[idx].float_value)
+        else:
+            raise ValueError(f"未知变异算子: {op}")
 
     def _update_item_float(self, item, new_f):
         new_f = max(item.min_float, min(item.max_float, new_f))
@@ -175,6 +403,127 @@ class SmartOptimizer:
             item.condition = cond
             item.price = utils.estimate_price_at_float(base, new_f, cond, self.premium_scaler)
 
+    def _fitness(self, res) -> float:
+        if res.total_cost == float('inf'):
+            score = -999999
+        else:
+            score = res.roi * 100 + (res.break_even_prob * 50)
+        if res.std_dev > res.total_cost * 2: score -= 20
+        return score
+
+    def _options_for(self, rarity, item):
+        """某个输入物品的非支配磨损选项 (按物品缓存)"""
+        key = (item.collection, item.name)
+        opts = self._float_options.get(key)
+        if opts is None:
+            cand = self._indexes[rarity].get(item.collection, item.name)
+            if cand is None: return []
+            opts = build_float_options(item.min_float, item.max_float, lambda f: self._create_item(cand, f))
+            self._float_options[key] = opts
+        return opts
+
+    def polish_recipe(self, recipe, target_rarity, score=None):
+        """
+        输入物品固定，用精确求解器为每个产物磨损断点求最低成本磨损分配，
+        返回其中适应度最高的 (recipe, score, res)；没有改进时返回 None。
+        """
+        if score is None: score = self._fitness(self.sim.simulate(recipe, target_rarity, config.BUFF_RATIO))
+        self._load_candidates_for_rarity(target_rarity)
+        plans = solve_recipe_floats(recipe, self.sim.raw_db, target_rarity,
+                                    lambda item: self._options_for(target_rarity, item))
+        best = None
+        for plan in plans:
+            new_rec = []
+            for item, f in zip(recipe, plan.floats):
+                cand = self._indexes[target_rarity].get(item.collection, item.name)
+                new_rec.append(self._create_item(cand, f))
+            if not self._in_budget(new_rec): continue
+            res = self.sim.simulate(new_rec, target_rarity, config.BUFF_RATIO)
+            new_score = self._fitness(res)
+            if new_score > score and (best is None or new_score > best[1]):
+                best = (new_rec, new_score, res)
+        return best
+
+    def _neighbor_moves(self, recipe, target_rarity):
+        """
+        局部搜索邻域 (打乱顺序后逐个产出):
+        1. 同收藏品内换成更便宜的物品
+        2. 在配方已有的收藏品之间移动一个名额
+        3. 将某个磨损推到最近的磨损等级边界附近
+        """
+        index = self._indexes[target_rarity]
+        moves = []
+
+        for i, item in enumerate(recipe):
+            swaps = 0
+            for cand in index.by_collection.get(item.collection, []):
+                if swaps >= 3 or cand.min_price >= item.price: break
+                if cand.data['name'] == item.name: continue
+                moves.append((i, cand, item.float_value))
+                swaps += 1
+
+        by_col = {}
+        for i, item in enumerate(recipe):
+            by_col.setdefault(item.collection, []).append(i)
+        for col_a, slots_a in by_col.items():
+            for col_b, slots_b in by_col.items():
+                if col_a == col_b: continue
+                donor = recipe[slots_b[0]]
+                cand = index.get(donor.collection, donor.name)
+                if cand: moves.append((slots_a[-1], cand, donor.float_value))
+
+        bounds = [0.0] + self.sim.condition_mapper.upper_bounds + [1.0]
+        for i, item in enumerate(recipe):
+            cand = index.get(item.collection, item.name)
+            if not cand: continue
+            for b in bounds:
+                if abs(b - item.float_value) > 0.08: continue
+                for f in (b - 0.0001, b + 0.0001):
+                    if item.min_float <= f <= item.max_float and abs(f - item.float_value) > 1e-6:
+                        moves.append((i, cand, f))
+
+        random.shuffle(moves)
+        for i, cand, f in moves:
+            new_rec = list(recipe)
+            new_rec[i] = self._create_item(cand, f)
+            yield new_rec
+
+    def local_search(self, recipe, target_rarity, score=None, max_steps=20):
+        """
+        首次改进爬山: 每一步接受第一个适应度更高的邻居，
+        评估使用模拟器的 summary_only 快速路径。
+        返回 (recipe, score, res)；没有改进时返回 None。
+        """
+        self._load_candidates_for_rarity(target_rarity)
+        if score is None:
+            score = self._fitness(self.sim.simulate(recipe, target_rarity, config.BUFF_RATIO, summary_only=True))
+        start_score = score
+        current = recipe
+        for _ in range(max_steps):
+            improved = False
+            for neighbor in self._neighbor_moves(current, target_rarity):
+                if not self._in_budget(neighbor): continue
+                n_score = self._fitness(self.sim.simulate(neighbor, target_rarity, config.BUFF_RATIO,
+                                                          summary_only=True))
+                if n_score > score + 1e-9:
+                    current, score, improved = neighbor, n_score, True
+                    break
+            if not improved: break
+
+        if score <= start_score: return None
+        res = self.sim.simulate(current, target_rarity, config.BUFF_RATIO)
+        return current, self._fitness(res), res
+
+    def _refine_top(self, scored, target_rarity, top_n, max_steps, all_results_flat):
+        """对当前排序后的前 top_n 个配方做局部搜索，原地替换并重新排序"""
+        for i in range(min(len(scored), top_n)):
+            if scored[i][1] <= -90000: break
+            refined = self.local_search(scored[i][0], target_rarity, scored[i][1], max_steps)
+            if refined:
+                scored[i] = refined
+                if refined[2].roi > -0.2: all_results_flat.append((refined[2], refined[0]))
+        scored.sort(key=lambda x: x[1], reverse=True)
+
     def run(self, target_rarity_list=None, params=None, progress_callback=None):
         if target_rarity_list is None: target_rarity_list = config.RARITIES_TO_SCAN
         pop_size = params.get('pop_size', config.POPULATION_SIZE)
@@ -182,8 +531,24 @@ class SmartOptimizer:
         mutation_rate = params.get('mutation_rate', config.MUTATION_RATE)
         save_png = params.get('save_png', True)
         self.premium_scaler = params.get('wear_premium_factor', 1.0)
-
-        session_folder = visualization.init_session_folder()
+        exact_polish = params.get('exact_float_polish', False)
+        ls_top_n = params.get('local_search_top_n', 0)
+        ls_steps = params.get('local_search_steps', 20)
+        ls_each_gen = params.get('local_search_each_gen', False)
+        use_nsga = params.get('selection', 'scalar') == 'nsga2'
+        adaptive_ops = params.get('adaptive_operators', False)
+        warm_sessions = params.get('warm_start_sessions', 0)
+        cluster_mode = params.get('cluster_mode', 'off')
+        self.pareto_front = []
+        self._set_budget(params)
+        self._float_options = {}
+        self._sync_price_version()
+
+        if params.get('seed') is not None:
+            random.seed(params['seed'])
+            np.random.seed(params['seed'])
+
+        session_folder = visualization.init_session_folder(params.get('session_suffix', ''))
         all_results_flat = []
         history = []
         total_steps = len(target_rarity_list) * generations;
@@ -192,48 +557,231 @@ class SmartOptimizer:
         for target_rarity in target_rarity_list:
             if progress_callback: progress_callback(int(current_step / total_steps * 100),
                                                     f"正在扫描 [{_get_rarity_name(target_rarity)}]...")
-            pools = self._load_candidates_for_rarity(target_rarity)
+            pools = self._budget_pools(self._load_candidates_for_rarity(target_rarity))
             if not pools['all']: current_step += generations; continue
-
-            pop = self.generate_initial_population(pools, pop_size)
+            self._seed_groups, self._group_pools = self._cluster_groups(pools, cluster_mode,
+                                                                        params.get('cluster_pairs'))
+            if self._group_pools:
+                print(f"🧩 搜索空间按簇划分 ({cluster_mode}): {len(self._seed_groups)} 个抽样组")
+
+            # 热启动配方最多占半个种群，其余随机生成以保持多样性
+            warm = self.load_warm_start(target_rarity, warm_sessions, pop_size // 2, exclude=session_folder)
+            if warm: print(f"♻️ 热启动: 载入 {len(warm)} 个历史配方 (最近 {warm_sessions} 个会话)")
+            pop = warm + self.generate_initial_population(pools, pop_size - len(warm))
+            if not pop: current_step += generations; continue
+            # origins[i]: 子代来源 {'ops': [...], 'parent_score': ...}，初始种群与精英为 None
+            origins = [None] * len(pop)
+            bandit = OperatorBandit(list(MUTATION_OPERATORS), initial_probs=MUTATION_OPERATORS)
+            archive, ranks, crowd = [], [], []
             for gen in range(generations):
                 current_step += 1
                 if progress_callback: progress_callback(int(current_step / total_steps * 100),
                                                         f"[{_get_rarity_name(target_rarity)}] 进化: {gen + 1}/{generations}")
 
                 scored = []
-                for rec in pop:
+                for rec, origin in zip(pop, origins):
+                    # 越界配方不进入模拟
+                    if not self._in_budget(rec):
+                        scored.append((rec, -999999, SimulationResult(float('inf'), 0, -1.0, 0, 0, [], 0,
+                                                                      target_rarity, rec)))
+                        continue
+                    t0 = time.perf_counter()
                     res = self.sim.simulate(rec, target_rarity, config.BUFF_RATIO)
-                    if res.total_cost == float('inf'):
-                        score = -999999
-                    else:
-                        score = res.roi * 100 + (res.break_even_prob * 50)
-                    if res.std_dev > res.total_cost * 2: score -= 20
+                    score = self._fitness(res)
+                    if origin is not None:
+                        # 子代优于较好的父代即记为该算子的一次成功
+                        elapsed = time.perf_counter() - t0
+                        for op in origin['ops']:
+                            bandit.record(op, score > origin['parent_score'], elapsed)
                     scored.append((rec, score, res))
                     if res.roi > -0.2 and res.total_cost != float('inf'): all_results_flat.append((res, rec))
 
                 scored.sort(key=lambda x: x[1], reverse=True)
+
+                # 精英精确打磨: 固定输入物品，直接求解最优磨损分配
+                if exact_polish:
+                    for i in range(min(len(scored), config.ELITISM_COUNT)):
+                        if scored[i][1] <= -90000: break
+                        polished = self.polish_recipe(scored[i][0], target_rarity, scored[i][1])
+                        if polished:
+                            scored[i] = polished
+                            if polished[2].roi > -0.2: all_results_flat.append((polished[2], polished[0]))
+                    scored.sort(key=lambda x: x[1], reverse=True)
+
+                # 模因局部搜索: 每代对精英爬山 (或只在最后一代)
+                if ls_top_n > 0 and (ls_each_gen or gen == generations - 1):
+                    self._refine_top(scored, target_rarity, ls_top_n, ls_steps, all_results_flat)
+
+                if use_nsga:
+                    # NSGA-II: 父代存档 + 子代合并后按 (非支配层级, 拥挤距离) 截断
+                    archive, ranks, crowd = self._nsga_survivors(archive + scored, pop_size)
+                    scored = sorted(archive, key=lambda x: x[1], reverse=True)
+
                 valid = [x for x in scored if x[1] > -90000]
                 best_roi = valid[0][2].roi if valid else -1
                 avg_roi = sum(x[2].roi for x in valid) / len(valid) if valid else -1
 
-                history.append({'gen': gen, 'max_roi': best_roi, 'avg_roi': avg_roi})
+                entry = {'gen': gen, 'max_roi': best_roi, 'avg_roi': avg_roi}
+                if use_nsga: entry['front_size'] = ranks.count(0)
+                entry['operators'] = bandit.end_generation(adapt=adaptive_ops)
+                history.append(entry)
+
+                select_op = (lambda: bandit.select()) if adaptive_ops else None
+                if use_nsga:
+                    pick = lambda: self._tournament(archive, ranks, crowd)
+                    pop, origins = self._breed(archive, pools, pop_size, mutation_rate, pick=pick, select_op=select_op)
+                    continue
+
+                elites = [copy.deepcopy(scored[i][0]) for i in range(min(len(scored), config.ELITISM_COUNT))]
+                children, child_origins = self._breed(scored[:40], pools, pop_size - len(elites), mutation_rate,
+                                                      select_op=select_op)
+                pop, origins = elites + children, [None] * len(elites) + child_origins
 
-                new_pop = [copy.deepcopy(scored[i][0]) for i in range(min(len(scored), config.ELITISM_COUNT))]
-                while len(new_pop) < pop_size:
-                    p1, p2 = random.choices(scored[:40], k=2)
-                    split = random.randint(1, 9)
-                    child = copy.deepcopy(p1[0][:split]) + copy.deepcopy(p2[0][split:])
-                    if random.random() < mutation_rate: self.mutate(child, pools)
-                    new_pop.append(child)
-                pop = new_pop
+            if use_nsga:
+                self.pareto_front.extend((x[2], x[0]) for x, r in zip(archive, ranks) if r == 0 and x[1] > -90000)
+
+        self._seed_groups, self._group_pools, self._mates = [], {}, None
+        tier_top = self._finalize_session(all_results_flat, history, session_folder, save_png, progress_callback,
+                                          pareto_front=self.pareto_front if use_nsga else None)
+        return session_folder, tier_top, history
+
+    @staticmethod
+    def _objectives(res):
+        """NSGA-II 目标 (均为最小化): -ROI, 标准差, 总成本；无效配方放到最差"""
+        if res.total_cost == float('inf'): return (1e9, 1e18, 1e18)
+        return (-res.roi, res.std_dev, res.total_cost)
+
+    def _nsga_survivors(self, candidates, size):
+        objs = np.array([self._objectives(x[2]) for x in candidates], dtype=np.float64)
+        chosen, ranks, crowd = nsga2_select(objs, size)
+        return [candidates[i] for i in chosen], ranks, crowd
+
+    @staticmethod
+    def _tournament(archive, ranks, crowd):
+        """二元锦标赛: 层级低者胜，同层拥挤距离大者胜"""
+        i, j = random.randrange(len(archive)), random.randrange(len(archive))
+        if ranks[i] != ranks[j]: return archive[i] if ranks[i] < ranks[j] else archive[j]
+        return archive[i] if crowd[i] >= crowd[j] else archive[j]
+
+    def _breed(self, parents, pools, n, mutation_rate, pick=None, select_op=None):
+        """
+        产生 n 个子代，返回 (子代列表, origins)；未经算子产生的子代 origin 为 None。
+        成本约束下无法产生合法子代的名额用新抽样的合法配方补足 (可能不足 n 个)。
+        """
+        children, origins = [], []
+        for _ in range(n):
+            origin = {}
+            child = self._make_child(parents, pools, mutation_rate, pick=pick, select_op=select_op, origin=origin)
+            if child is None: continue
+            children.append(child)
+            origins.append(origin or None)
+        if len(children) < n:
+            fresh = self._sample_recipes(pools, n - len(children))
+            children.extend(fresh)
+            origins.extend([None] * len(fresh))
+        return children, origins
+
+    def _make_child(self, parents, pools, mutation_rate, attempts=5, pick=None, select_op=None, origin=None):
+        """
+        交叉 + 变异；有成本约束时越界的子代会重试，最终退回较好的合法父代副本，
+        父代都越界时返回 None。
+        select_op 给出时由其选择单个变异算子 (自适应模式)，否则使用默认的固定概率组合。
+        origin (dict) 会被填入实际应用的算子与较好父代的适应度，退回父代副本时保持为空。
+        """
+        for _ in range(attempts):
+            if self._group_pools:
+                p1 = pick() if pick else random.choice(parents)
+                p2 = self._pick_mate(p1, parents, pick)
+            else:
+                p1, p2 = (pick(), pick()) if pick else random.choices(parents, k=2)
+            split = random.randint(1, 9)
+            child = copy.deepcopy(p1[0][:split]) + copy.deepcopy(p2[0][split:])
+            ops = []
+            if random.random() < mutation_rate:
+                backup = copy.deepcopy(child) if self._has_budget() else None
+                ops = self.mutate(child, pools, op=select_op() if select_op else None)
+                if backup is not None and not self._in_budget(child): child, ops = backup, []
+            if self._in_budget(child):
+                if origin is not None:
+                    origin['ops'] = ops or ['crossover']
+                    origin['parent_score'] = max(p1[1], p2[1])
+                return child
+        for p in sorted((p1, p2), key=lambda x: x[1], reverse=True):
+            if self._in_budget(p[0]): return copy.deepcopy(p[0])
+        return None
+
+    def _set_budget(self, params):
+        """params 中 min_cost / max_cost 为配方总成本上下限，0 或缺省表示不限"""
+        self.min_cost = params.get('min_cost') or None
+        self.max_cost = params.get('max_cost') or None
+        self._unit_bounds = (0.0, float('inf'))
+
+    def run_exhaustive(self, target_rarity_list=None, params=None, progress_callback=None):
+        """
+        确定性求解模式: 穷举 1~2 个收藏品的全部配比并分支定界剪枝，
+        产物价格随磨损单调不增时全局最高 ROI 精确，各价格段的排名为已评估配方中的最优
+        (见 CollectionMixSolver)。返回值与 run() 相同 (history 为空)。
+        """
+        if target_rarity_list is None: target_rarity_list = config.RARITIES_TO_SCAN
+        params = params or {}
+        save_png = params.get('save_png', True)
+        self.premium_scaler = params.get('wear_premium_factor', 1.0)
+        self._set_budget(params)
+        self._float_options = {}
+        self._sync_price_version()
 
+        session_folder = visualization.init_session_folder(params.get('session_suffix', ''))
+        all_results_flat = []
+        n_rarity = len(target_rarity_list)
+
+        for r_idx, target_rarity in enumerate(target_rarity_list):
+            if progress_callback: progress_callback(int(r_idx / n_rarity * 90),
+                                                    f"正在求解 [{_get_rarity_name(target_rarity)}]...")
+
+            def solver_progress(percent, msg, base=r_idx):
+                if progress_callback: progress_callback(int((base + percent / 100) / n_rarity * 90), msg)
+
+            solver = CollectionMixSolver(self, target_rarity)
+            all_results_flat.extend(solver.solve(solver_progress))
+
+        tier_top = self._finalize_session(all_results_flat, [], session_folder, save_png, progress_callback)
+        return session_folder, tier_top, []
+
+    def find_recipes_for_output(self, name, collection=None, condition=None, max_float=None,
+                                min_probability=0.1, limit=10, wear_premium_factor=None):
+        """
+        反向查询: 产出指定物品 (磨损等级/磨损上限 + 最低概率) 的最便宜配方。
+        不需要跑完整的进化流程。返回 TargetRecipe 列表 (按成本升序)。
+        """
+        self._sync_price_version()
+        if wear_premium_factor is not None and wear_premium_factor != self.premium_scaler:
+            self.premium_scaler = wear_premium_factor
+            self._target_finder = None
+        if self._target_finder is None:
+            self._target_finder = TargetRecipeFinder(self)
+        return self._target_finder.find(name, collection, condition, max_float, min_probability, limit)
+
+    def plan_trade_up_chains(self, start_rarity, max_depth=3, top_k=10, wear_premium_factor=None):
+        """
+        多步汰换链: 从 start_rarity 的最便宜输入出发，在同收藏品内逐级汰换，
+        每级按期望价值决定出售或继续。返回按 ROI 排序的 ChainPlan 列表。
+        """
+        if wear_premium_factor is not None: self.premium_scaler = wear_premium_factor
+        self._float_options = {}
+        self._sync_price_version()
+        return ChainPlanner(self, start_rarity, max_depth).plan(top_k)
+
+    def _finalize_session(self, all_results_flat, history, session_folder, save_png, progress_callback=None,
+                          pareto_front=None):
         if progress_callback: progress_callback(95, "正在整理数据...")
 
         tier_top = self._export_results(all_results_flat, session_folder, save_png)
         tier_best_single = {k: v[0] for k, v in tier_top.items() if v}
 
-        visualization.save_raw_data(history, all_results_flat, tier_top, session_folder, self.sim)
+        visualization.save_raw_data(history, all_results_flat, tier_top, session_folder, self.sim,
+                                    pareto_front=pareto_front)
+        if pareto_front and save_png:
+            visualization.plot_pareto_front(pareto_front, all_results_flat, session_folder)
 
         if all_results_flat:
             all_results_flat.sort(key=lambda x: x[0].roi, reverse=True)
@@ -243,22 +791,19 @@ class SmartOptimizer:
         visualization.plot_radar_chart(tier_best_single, session_folder)
 
         if progress_callback: progress_callback(100, "完成")
-        return session_folder, tier_top, history
+        return tier_top
+
+    @staticmethod
+    def _tier_of(total_cost) -> str:
+        if total_cost < config.TIER_MICRO_USD * config.EXCHANGE_RATE: return 'Micro'
+        if total_cost < config.TIER_LOW_USD * config.EXCHANGE_RATE: return 'Low'
+        if total_cost < config.TIER_MID_USD * config.EXCHANGE_RATE: return 'Mid'
+        return 'High'
 
     def _export_results(self, all_results_flat, session_folder, save_png):
         buckets = {'Micro': [], 'Low': [], 'Mid': [], 'High': []}
-        L_MICRO = config.TIER_MICRO_USD * config.EXCHANGE_RATE
-        L_LOW = config.TIER_LOW_USD * config.EXCHANGE_RATE
-        L_MID = config.TIER_MID_USD * config.EXCHANGE_RATE
         for res, rec in all_results_flat:
-            if res.total_cost < L_MICRO:
-                buckets['Micro'].append((res, rec))
-            elif res.total_cost < L_LOW:
-                buckets['Low'].append((res, rec))
-            elif res.total_cost < L_MID:
-                buckets['Mid'].append((res, rec))
-            else:
-                buckets['High'].append((res, rec))
+            buckets[self._tier_of(res.total_cost)].append((res, rec))
 
         tier_top = {}
         for name, lst in buckets.items():
@@ -286,4 +831,22 @@ class SmartOptimizer:
 
 
 def _get_rarity_name(tier_num):
-    return {1: "消费级", 2: "工业级", 3: "军规级", 4: "受限级", 5: "保密级", 6: "隐秘级"}.get(tier_num, str(tier_num))
\ No newline at end of file
+    return {1: "消费级", 2: "工业级", 3: "军规级", 4: "受限级", 5: "保密级", 6: "隐秘级"}.get(tier_num, str(tier_num))
+
+
+def run_optimizer_arm(arm, raw_db, db_path, rarity, params, use_network_guidance, progress_queue=None,
+                      network_price_version=None):
+    """
+    在独立进程中运行一组优化 (对比模式的实验组/对照组)。
+    raw_db 经进程间序列化后即为该进程独享的价格视图；相同 params['seed'] 保证两组起点一致。
+    network_price_version 为父进程共享分析器的价格版本，使网络权重与 raw_db 中的价格一致。
+    进度以 (arm, percent, msg) 写入 progress_queue。
+    """
+    sim = CS2TradeUpSimulator.from_raw_db(raw_db, db_path)
+    opt = SmartOptimizer(sim, use_network_guidance=use_network_guidance, network_price_version=network_price_version)
+
+    def progress_callback(percent, msg):
+        if progress_queue is not None: progress_queue.put((arm, percent, msg))
+
+    run_fn = opt.run_exhaustive if params.get('exhaustive') else opt.run
+    return run_fn(target_rarity_list=[rarity], params=params, progress_callback=progress_callback)
@@ -0,0 +1,72 @@
+import numpy as np
+from typing import List
+
+
+def fast_non_dominated_sort(objectives: np.ndarray) -> List[np.ndarray]:
+    """
+    NSGA-II 快速非支配排序 (所有目标均为最小化)。
+    objectives: (n, m) 数组；返回按层级排列的下标数组列表，第 0 层即帕累托前沿。
+    """
+    n = len(objectives)
+    if n == 0: return []
+    obj = np.asarray(objectives, dtype=np.float64)
+
+    # dominates[i, j]: i 支配 j
+    le = np.all(obj[:, None, :] <= obj[None, :, :], axis=2)
+    lt = np.any(obj[:, None, :] < obj[None, :, :], axis=2)
+    dominates = le & lt
+    dominated_count = dominates.sum(axis=0)
+
+    fronts = []
+    remaining = np.ones(n, dtype=bool)
+    while remaining.any():
+        current = np.flatnonzero(remaining & (dominated_count == 0))
+        if not len(current):
+            # 数值异常 (如 nan) 时把剩余个体放入最后一层
+            fronts.append(np.flatnonzero(remaining))
+            break
+        fronts.append(current)
+        remaining[current] = False
+        dominated_count = dominated_count - dominates[current].sum(axis=0)
+    return fronts
+
+
+def crowding_distance(objectives: np.ndarray, front: np.ndarray) -> np.ndarray:
+    """同一层内的拥挤距离，边界点为 inf"""
+    k = len(front)
+    dist = np.zeros(k, dtype=np.float64)
+    if k <= 2:
+        dist[:] = np.inf
+        return dist
+
+    obj = np.asarray(objectives, dtype=np.float64)[front]
+    for m in range(obj.shape[1]):
+        order = np.argsort(obj[:, m], kind='stable')
+        col = obj[order, m]
+        dist[order[0]] = dist[order[-1]] = np.inf
+        span = col[-1] - col[0]
+        if not np.isfinite(span) or span <= 0: continue
+        dist[order[1:-1]] += (col[2:] - col[:-2]) / span
+    return dist
+
+
+def nsga2_select(objectives: np.ndarray, size: int):
+    """
+    按 (层级, 拥挤距离) 选出 size 个个体。
+    返回 (选中下标, 对应层级, 对应拥挤距离)。
+    """
+    chosen, ranks, crowd = [], [], []
+    for rank, front in enumerate(fast_non_dominated_sort(objectives)):
+        dist = crowding_distance(objectives, front)
+        if len(chosen) + len(front) <= size:
+            chosen.extend(front.tolist())
+            ranks.extend([rank] * len(front))
+            crowd.extend(dist.tolist())
+        else:
+            need = size - len(chosen)
+            order = np.argsort(-dist, kind='stable')[:need]
+            chosen.extend(front[order].tolist())
+            ranks.extend([rank] * need)
+            crowd.extend(dist[order].tolist())
+        if len(chosen) >= size: break
+    return chosen, ranks, crowd
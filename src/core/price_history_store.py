@@ -0,0 +1,190 @@
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+import config
+from src.utils.path_manager import PathManager
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_prices (
+    name   TEXT NOT NULL,
+    day    TEXT NOT NULL,
+    price  REAL NOT NULL,
+    volume INTEGER NOT NULL,
+    PRIMARY KEY (name, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fetch_log (
+    name       TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fetch_queue (
+    name       TEXT PRIMARY KEY,
+    status     TEXT NOT NULL,
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS live_quotes (
+    name  TEXT PRIMARY KEY,
+    price REAL NOT NULL,
+    gen   INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS live_quotes_gen ON live_quotes (gen);
+CREATE TABLE IF NOT EXISTS feed_state (
+    feed       TEXT PRIMARY KEY,
+    etag       TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+# 批量回填队列中的条目状态
+QUEUE_PENDING = "pending"
+QUEUE_RUNNING = "running"
+QUEUE_DONE = "done"
+QUEUE_FAILED = "failed"
+
+
+class PriceHistoryStore:
+    """
+    本地价格时间序列 (SQLite)，按 market_hash_name 存放日均价与日成交量。
+    每次操作使用独立连接，可在多个工作线程中共用同一个实例；WAL 模式下读写互不阻塞。
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = str(db_path or PathManager.get_data_dir() / "price_history.sqlite")
+        # 距上次抓取超过该时长即视为过期: 最新一天即使是今天，当天的数据也在不断累积
+        self.refresh_seconds = getattr(config, 'PRICE_HISTORY_REFRESH_HOURS', 6) * 3600
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def latest_day(self, name) -> Optional[datetime]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT MAX(day) FROM daily_prices WHERE name = ?", (name,)).fetchone()
+        return datetime.strptime(row[0], "%Y-%m-%d") if row and row[0] else None
+
+    def is_stale(self, name, now=None) -> bool:
+        now = now or datetime.now()
+        if self.latest_day(name) is None: return True
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT fetched_at FROM fetch_log WHERE name = ?", (name,)).fetchone()
+        return not row or now.timestamp() - row[0] >= self.refresh_seconds
+
+    def append(self, name, df_daily) -> int:
+        """
+        写入日聚合数据 (列: Date / Price / Volume)，只追加不早于已存最新一天的行:
+        最新一天可能是抓取时尚未结束的部分数据，因此重新覆盖。返回写入的行数。
+        """
+        latest = self.latest_day(name)
+        if latest is not None: df_daily = df_daily[df_daily['Date'] >= latest]
+        rows = [(name, d.strftime("%Y-%m-%d"), float(p), int(v))
+                for d, p, v in zip(df_daily['Date'], df_daily['Price'], df_daily['Volume'])]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO daily_prices (name, day, price, volume) VALUES (?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO fetch_log (name, fetched_at) VALUES (?, ?)", (name, time.time()))
+        return len(rows)
+
+    # --- 持久化的批量抓取队列 (中断后可续跑) ---
+
+    def enqueue(self, names) -> int:
+        """加入队列 (已在队列中的条目保持原状态)，返回新增条数"""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO fetch_queue (name, status, updated_at) VALUES (?, ?, ?)",
+                             [(n, QUEUE_PENDING, now) for n in names])
+            return conn.total_changes - before
+
+    def reset_queue(self, retry_failed=False):
+        """上次中断时仍在处理中的条目重新置为待处理；retry_failed 时失败条目也重试"""
+        statuses = (QUEUE_RUNNING, QUEUE_FAILED) if retry_failed else (QUEUE_RUNNING,)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"UPDATE fetch_queue SET status = ?, attempts = 0 WHERE status IN ({','.join('?' * len(statuses))})",
+                         (QUEUE_PENDING, *statuses))
+
+    def pending(self, limit: Optional[int] = None) -> List[str]:
+        query = "SELECT name FROM fetch_queue WHERE status = ? ORDER BY updated_at, name"
+        args = [QUEUE_PENDING]
+        if limit is not None:
+            query += " LIMIT ?"
+            args.append(int(limit))
+        with closing(self._connect()) as conn:
+            return [r[0] for r in conn.execute(query, args).fetchall()]
+
+    def set_status(self, name, status, attempts=0, error=""):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO fetch_queue (name, status, attempts, last_error, updated_at) "
+                         "VALUES (?, ?, ?, ?, ?)", (name, status, int(attempts), error, time.time()))
+
+    def item_status(self, name) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT status, attempts, last_error, updated_at FROM fetch_queue WHERE name = ?",
+                               (name,)).fetchone()
+        if not row: return None
+        return {'status': row[0], 'attempts': row[1], 'error': row[2], 'updated_at': row[3]}
+
+    def queue_summary(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM fetch_queue GROUP BY status").fetchall())
+
+    # --- 实时报价快照 (按代号增量同步) ---
+
+    def quote_generation(self) -> int:
+        """当前报价代号: 每次同步有价格变化时加 1，0 表示尚无报价"""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COALESCE(MAX(gen), 0) FROM live_quotes").fetchone()[0]
+
+    def merge_quotes(self, feed, quotes: Iterable[Tuple[str, float]], etag=None) -> Tuple[int, int]:
+        """
+        逐条合并报价流 (不在内存中保留整份报价)：只有新出现或价格变化的条目被写入并标记为新代号。
+        数据源中消失的条目保留最后一次报价。整个合并在一个事务中，报价流中途出错时全部回滚。
+        返回 (当前代号, 变化条数)。
+        """
+        with closing(self._connect()) as conn, conn:
+            gen = conn.execute("SELECT COALESCE(MAX(gen), 0) FROM live_quotes").fetchone()[0] + 1
+            before = conn.total_changes
+            conn.executemany("INSERT INTO live_quotes (name, price, gen) VALUES (?, ?, ?) "
+                             "ON CONFLICT (name) DO UPDATE SET price = excluded.price, gen = excluded.gen "
+                             "WHERE live_quotes.price <> excluded.price",
+                             ((name, price, gen) for name, price in quotes))
+            changed = conn.total_changes - before
+            conn.execute("INSERT OR REPLACE INTO feed_state (feed, etag, fetched_at) VALUES (?, ?, ?)",
+                         (str(feed), etag, time.time()))
+        return (gen if changed else gen - 1), changed
+
+    def quotes_since(self, gen: int) -> Tuple[Dict[str, float], int]:
+        """代号大于 gen 的报价 {market_hash_name: 价格} 与当前代号；gen=0 即全部报价"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT name, price, gen FROM live_quotes WHERE gen > ?", (int(gen),)).fetchall()
+        # 当前代号取自同一次查询，与返回的报价一致 (不受并发同步影响)
+        return {name: price for name, price, _ in rows}, max((g for _, _, g in rows), default=int(gen))
+
+    def feed_state(self, feed) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT etag, fetched_at FROM feed_state WHERE feed = ?", (str(feed),)).fetchone()
+        return {'etag': row[0], 'fetched_at': row[1]} if row else None
+
+    def touch_feed(self, feed):
+        """服务器确认报价未变化 (304) 时只刷新抓取时间"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE feed_state SET fetched_at = ? WHERE feed = ?", (time.time(), str(feed)))
+
+    def load(self, name, days: Optional[int] = None) -> pd.DataFrame:
+        """读取日序列 (按日期升序)，days 给出时只取最近 days 天"""
+        query = "SELECT day, price, volume FROM daily_prices WHERE name = ?"
+        args = [name]
+        if days is not None:
+            query += " AND day >= ?"
+            args.append((datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d"))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query + " ORDER BY day", args).fetchall()
+        df = pd.DataFrame(rows, columns=['Date', 'Price', 'Volume'])
+        df['Date'] = pd.to_datetime(df['Date'])
+        return df
@@ -11,6 +11,8 @@ import re
 import json
 import traceback
 import config
+from .price_history_store import PriceHistoryStore
+from .http_client import get_client
 
 # 尝试导入机器学习库
 try:
@@ -116,10 +118,20 @@ class NameTranslator:
 
 
 class DataFetcher:
-    def __init__(self, cookie=None):
+    STEAM_HISTORY_URL = "https://steamcommunity.com/market/pricehistory/"
+
+    def __init__(self, cookie=None, store=None, base_url=None):
         self.cookie = cookie
-        self.base_url = "https://steamcommunity.com/market/pricehistory/"
+        # base_url 可替换为本地模拟服务器，便于离线测试
+        self.base_url = base_url or self.STEAM_HISTORY_URL
         self.translator = NameTranslator()
+        # 本地价格历史: 未过期时直接读取，过期才请求 Steam 并追加新数据
+        if store is None:
+            try:
+                store = PriceHistoryStore()
+            except Exception as e:
+                print(f"⚠️ 本地价格历史不可用，每次都将请求 Steam: {e}")
+        self.store = store
 
         # ✅ 修复核心问题：手动月份映射
         # 即使系统是中文，也能正确解析 Steam 的英文月份
@@ -132,24 +144,21 @@ class DataFetcher:
         market_hash_name = self.translator.translate(user_input_name)
         print(f"🔍 解析饰品名: {market_hash_name}")
 
-        encoded_name = urllib.parse.quote(market_hash_name)
-        # currency=23 是人民币
-        url = f"{self.base_url}?country=CN&currency=23&appid=730&market_hash_name={encoded_name}"
+        if self.store and not self.store.is_stale(market_hash_name):
+            print("💾 本地价格历史未过期，跳过 Steam 请求")
+            return self._recent_window(self.store.load(market_hash_name, days=365))
 
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Referer": "https://steamcommunity.com/market/",
-        }
+        url = self.history_url(market_hash_name)
+        headers = self.request_headers()
 
         if self.cookie:
-            headers["Cookie"] = f"steamLoginSecure={self.cookie}"
             print(f"✅ 使用 Cookie (长度: {len(self.cookie)})")
         else:
             print("⚠️ 未提供 Cookie，尝试匿名获取（可能失败）")
 
         try:
             print(f"📡 请求 Steam API...")
-            response = requests.get(url, headers=headers, timeout=15)
+            response = get_client().get(url, headers=headers, timeout=15, cache_if=self._cacheable_history)
 
             if response.status_code == 200:
                 data = response.json()
@@ -159,24 +168,69 @@ class DataFetcher:
                     print(f"✅ 获取到 {raw_count} 条原始价格数据")
                     if raw_count == 0:
                         return None, "Steam 返回了空数据 (可能物品暂无成交)"
-                    return self._process_raw_data(data['prices'])
+                    if not self.store:
+                        return self._process_raw_data(data['prices'])
+                    df_daily, msg = self._aggregate_daily(data['prices'])
+                    if df_daily is None:
+                        return None, msg
+                    added = self.store.append(market_hash_name, df_daily)
+                    print(f"💾 本地价格历史已追加 {added} 天")
+                    return self._recent_window(self.store.load(market_hash_name, days=365))
                 else:
                     return None, "API 响应格式错误 (未找到 prices 字段)"
 
             elif response.status_code == 429:
-                return None, "请求过于频繁 (HTTP 429)"
+                return self._stored_fallback(market_hash_name, "请求过于频繁 (HTTP 429)")
             elif response.status_code == 403:
-                return None, "无权访问 (HTTP 403) - Cookie 可能已失效或需要登录"
+                return self._stored_fallback(market_hash_name, "无权访问 (HTTP 403) - Cookie 可能已失效或需要登录")
             else:
-                return None, f"请求失败 HTTP {response.status_code}"
+                return self._stored_fallback(market_hash_name, f"请求失败 HTTP {response.status_code}")
 
         except requests.exceptions.Timeout:
-            return None, "请求 Steam 超时，请检查网络代理"
+            return self._stored_fallback(market_hash_name, "请求 Steam 超时，请检查网络代理")
         except Exception as e:
             print(f"❌ 异常: {type(e).__name__}: {str(e)}")
-            return None, f"请求异常: {str(e)}"
+            return self._stored_fallback(market_hash_name, f"请求异常: {str(e)}")
+
+    @staticmethod
+    def _cacheable_history(response) -> bool:
+        """Steam 限流或未登录时也会以 200 返回 [] / {"success": false}，这类响应不缓存"""
+        try:
+            data = response.json()
+        except ValueError:
+            return False
+        return isinstance(data, dict) and data.get('success') is not False and bool(data.get('prices'))
+
+    def history_url(self, market_hash_name):
+        encoded_name = urllib.parse.quote(market_hash_name)
+        # currency=23 是人民币
+        return f"{self.base_url}?country=CN&currency=23&appid=730&market_hash_name={encoded_name}"
+
+    def request_headers(self):
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+            "Referer": "https://steamcommunity.com/market/",
+        }
+        if self.cookie:
+            headers["Cookie"] = f"steamLoginSecure={self.cookie}"
+        return headers
+
+    def _stored_fallback(self, market_hash_name, error_msg):
+        """请求失败时退回本地已有的 (可能过期的) 历史数据"""
+        if self.store:
+            df = self.store.load(market_hash_name, days=365)
+            if not df.empty:
+                print(f"⚠️ {error_msg}，改用本地价格历史 (最新 {df['Date'].iloc[-1].date()})")
+                return self._recent_window(df)
+        return None, error_msg
 
     def _process_raw_data(self, raw_data):
+        df_daily, msg = self._aggregate_daily(raw_data)
+        if df_daily is None:
+            return None, msg
+        return self._recent_window(df_daily)
+
+    def _aggregate_daily(self, raw_data):
         clean = []
         parse_errors = 0
         success_count = 0
@@ -211,8 +265,9 @@ class DataFetcher:
             return None, "数据解析失败 (日期格式不兼容)"
 
         # 按日聚合
-        df_daily = df.groupby('Date').agg({'Price': 'mean', 'Volume': 'sum'}).reset_index()
+        return df.groupby('Date').agg({'Price': 'mean', 'Volume': 'sum'}).reset_index(), "Success"
 
+    def _recent_window(self, df_daily):
         # 过滤最近 365 天
         today = datetime.now()
         one_year_ago = today - timedelta(days=365)
@@ -239,7 +294,10 @@ class SentimentAnalyzer:
         count = 0
         for url in self.sources:
             try:
-                feed = feedparser.parse(url)
+                # 经共享客户端获取 (带缓存与条件请求)，feedparser 只负责解析
+                response = get_client().get(url, headers={"User-Agent": "CS2_Desktop_App/1.0"}, timeout=10)
+                if response.status_code != 200: continue
+                feed = feedparser.parse(response.content)
                 if not feed.entries: continue
                 for entry in feed.entries[:5]:
                     blob = TextBlob(entry.title)
@@ -1,3 +1,4 @@
+import copy
 import json
 import math
 import os
@@ -6,6 +7,7 @@ from typing import List, Dict
 
 import config
 from .core_engine import CS2PriceEngine, CS2ConditionMapper
+from .utils import fetch_price_changes
 
 
 @dataclass
@@ -53,6 +55,31 @@ class CS2TradeUpSimulator:
         self.load_local_db()
         self.price_engine = CS2PriceEngine(self.raw_db)
         self.condition_mapper = CS2ConditionMapper()
+        self._market_index = None
+        # 价格版本: 每次改价递增，依赖价格的缓存 (候选索引、反向查询等) 以此判断是否失效
+        self.price_version = 0
+        # 已应用到本实例的实时报价代号 (见 refresh_realtime_prices)
+        self._quote_gen = 0
+
+    @classmethod
+    def from_raw_db(cls, raw_db: dict, db_path=""):
+        """用已加载的数据库构造模拟器 (不读盘)，raw_db 的稀有度键须为 int"""
+        sim = cls.__new__(cls)
+        sim.db_path = str(db_path)
+        sim.raw_db = raw_db
+        sim.price_engine = CS2PriceEngine(sim.raw_db)
+        sim.condition_mapper = CS2ConditionMapper()
+        sim._market_index = None
+        sim.price_version = 0
+        sim._quote_gen = 0
+        return sim
+
+    def snapshot(self):
+        """独立的价格视图: 深拷贝数据库，之后对副本的改价/换汇不会影响本实例"""
+        sim = self.__class__.from_raw_db(copy.deepcopy(self.raw_db), self.db_path)
+        sim.price_version = self.price_version
+        sim._quote_gen = self._quote_gen
+        return sim
 
     def load_local_db(self):
         try:
@@ -93,8 +120,59 @@ class CS2TradeUpSimulator:
                                 count += 1
 
         self.price_engine = CS2PriceEngine(self.raw_db)
+        self.price_version += 1
         print(f"✅ 价格引擎已重建 (API更新: {count}, 手动: {manual_count})")
 
+    def _build_market_index(self):
+        """market_hash_name -> [(收藏品, 物品, 磨损)]，同名物品可能出现在多个收藏品中"""
+        index = {}
+        for col_name, tiers in self.raw_db.items():
+            for items in tiers.values():
+                for item in items:
+                    for condition in item.get('price_dict', {}):
+                        index.setdefault(f"{item['name']} ({condition})", []).append((col_name, item, condition))
+        return index
+
+    def apply_price_changes(self, changes: Dict[str, float], scale: float = 1.0, touched: Dict = None) -> int:
+        """
+        定向改价: 只更新 changes 中出现的条目 (price_dict 与价格引擎同步修改)，不遍历数据库、不重建引擎。
+        与 update_prices_from_map 相同，手动覆盖价优先，且只更新数据库中已有的磨损等级。返回更新的价格数。
+        changes 为美元价；scale 为本实例价格单位相对美元的倍数 (已换汇的副本传入汇率)。
+        touched 给出时记录被改价的物品 {"Name (Collection)": price_dict} (即网络图谱的节点)。
+        """
+        if self._market_index is None:
+            self._market_index = self._build_market_index()
+        manual = getattr(config, 'MANUAL_PRICE_OVERRIDE', {})
+        count = 0
+        for full_name, price in changes.items():
+            if full_name in manual:
+                price = manual[full_name] / config.EXCHANGE_RATE
+            elif not price or price <= 0:
+                continue
+            price *= scale
+            for col_name, item, condition in self._market_index.get(full_name, ()):
+                item['price_dict'][condition] = price
+                self.price_engine.price_map[(col_name, item['name'], condition)] = price
+                if touched is not None: touched[f"{item['name']} ({col_name})"] = item['price_dict']
+                count += 1
+        if count: self.price_version += 1
+        return count
+
+    def refresh_realtime_prices(self, source=None, store=None) -> Dict[str, dict]:
+        """
+        同步实时报价，把本实例尚未应用的报价 (代号大于上次应用的代号) 定向应用到价格引擎；
+        新建的实例第一次同步即应用全部报价。本实例价格单位须为美元 (未换汇)。
+        返回被改价的物品 {"Name (Collection)": price_dict}，可直接转交 NetworkAnalyzer.update_prices。
+        """
+        result = fetch_price_changes(self._quote_gen, source, store)
+        if result is None: return {}
+        changes, gen = result
+        touched = {}
+        count = self.apply_price_changes(changes, touched=touched) if changes else 0
+        self._quote_gen = gen
+        print(f"✅ 实时报价定向更新: {len(changes)} 条报价，更新 {count} 个价格")
+        return touched
+
     def get_wear_name(self, float_val: float) -> str:
         return self.condition_mapper.get_condition(float_val).value
 
@@ -110,8 +188,39 @@ class CS2TradeUpSimulator:
             total_percentage += percentage
         return total_percentage / 10.0
 
+    def collection_outcomes(self, col_name: str, target_rarity: int, avg_percentage: float):
+        """
+        单个收藏品在给定平均磨损百分比下的全部产物:
+        [(out_data, result_float, raw_price, condition), ...]，raw_price 未乘价格系数。
+        """
+        results = []
+        for out_data in self.raw_db.get(col_name, {}).get(target_rarity + 1, []):
+            out_min = out_data['min_float']
+            out_max = out_data['max_float']
+
+            result_float = (out_max - out_min) * avg_percentage + out_min
+            result_float = round(result_float, 9)
+            result_float = max(out_min, min(out_max, result_float))
+
+            # ✅ 修复：传入 collection (col_name) 进行精确查询
+            raw_price_res = self.price_engine.get_base_price(
+                out_data['name'], result_float, collection=col_name
+            )
+
+            if raw_price_res == float('inf') or isinstance(raw_price_res, float):
+                raw_price = 0.0
+                cond_name = self.get_wear_name(result_float)
+            else:
+                raw_price, cond_name = raw_price_res
+            results.append((out_data, result_float, raw_price, cond_name))
+        return results
+
     def simulate(self, inputs: List[TradeInputItem], target_rarity: int,
-                 price_modifier: float = 1.0) -> SimulationResult:
+                 price_modifier: float = 1.0, summary_only: bool = False) -> SimulationResult:
+        """
+        summary_only=True 时只计算成本/期望/ROI/保本率/标准差，
+        不构造 TradeOutcome 列表，供局部搜索等高频评估使用。
+        """
         if len(inputs) != 10:
             return SimulationResult(0, 0, -1, 0, 0, [], 0, 0)
 
@@ -140,35 +249,19 @@ class CS2TradeUpSimulator:
             if not next_rarity_items: continue
             prob_item = prob_collection / len(next_rarity_items)
 
-            for out_data in next_rarity_items:
-                out_min = out_data['min_float']
-                out_max = out_data['max_float']
-
-                result_float = (out_max - out_min) * avg_percentage + out_min
-                result_float = round(result_float, 9)
-                result_float = max(out_min, min(out_max, result_float))
-
-                # ✅ 修复：传入 collection (col_name) 进行精确查询
-                raw_price_res = self.price_engine.get_base_price(
-                    out_data['name'], result_float, collection=col_name
-                )
-
-                if raw_price_res == float('inf') or isinstance(raw_price_res, float):
-                    raw_price = 0.0
-                    cond_name = self.get_wear_name(result_float)
-                else:
-                    raw_price, cond_name = raw_price_res
-
+            for out_data, result_float, raw_price, cond_name in self.collection_outcomes(
+                    col_name, target_rarity, avg_percentage):
                 real_price = raw_price * price_modifier
-                cn_name = out_data.get('name_cn', out_data['name'])
-
-                outcome = TradeOutcome(
-                    name=out_data['name'], name_cn=cn_name, collection=col_name,
-                    rarity=target_rarity + 1, condition=cond_name,
-                    float_value=result_float, probability=prob_item,
-                    price=real_price, profit=real_price - total_cost
-                )
-                outcomes.append(outcome)
+
+                if not summary_only:
+                    cn_name = out_data.get('name_cn', out_data['name'])
+                    outcome = TradeOutcome(
+                        name=out_data['name'], name_cn=cn_name, collection=col_name,
+                        rarity=target_rarity + 1, condition=cond_name,
+                        float_value=result_float, probability=prob_item,
+                        price=real_price, profit=real_price - total_cost
+                    )
+                    outcomes.append(outcome)
                 expected_value += real_price * prob_item
                 outcome_values.append((prob_item, real_price))
 
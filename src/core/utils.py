@@ -1,8 +1,16 @@
 # src/core/utils.py
-import requests
+import codecs
 import json
 import random
+import time
+from contextlib import contextmanager
 import config
+from .http_client import get_client
+from .price_history_store import PriceHistoryStore
+
+SKINPORT_ITEMS_URL = "https://api.skinport.com/v1/items"
+SKINPORT_PARAMS = {"app_id": 730, "currency": "USD", "tradable": 0}
+SKINPORT_HEADERS = {"User-Agent": "CS2_Desktop_App/1.0"}
 
 # ✅ 修改：增加 premium_scaler 参数，默认 1.0
 def estimate_price_at_float(base_price: float, float_val: float, condition: str, premium_scaler: float = 1.0) -> float:
@@ -61,26 +69,121 @@ def estimate_price_at_float(base_price: float, float_val: float, condition: str,
     return base_price * multiplier
 
 
-def fetch_realtime_prices():
-    """获取 Skinport 实时价格"""
-    print("☁️  正在尝试联网获取实时价格 (Skinport API)...")
-    url = "https://api.skinport.com/v1/items"
-    params = {"app_id": 730, "currency": "USD", "tradable": 0}
-    headers = {"User-Agent": "CS2_Desktop_App/1.0"}
+def iter_json_array(chunks):
+    """
+    增量解析顶层 JSON 数组，逐个产出元素。chunks 为 bytes / str 分块的可迭代对象，
+    缓冲区只保留一个分块加上尚未解析完的元素，内存与数组长度无关。
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buf, pos, started = "", 0, False
+    for chunk in chunks:
+        buf = buf[pos:] + (utf8.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n" + ("," if started else ""):
+                pos += 1
+            if pos >= len(buf): break
+            if not started:
+                if buf[pos] != '[': raise ValueError("报价数据不是 JSON 数组")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']': return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # 元素被分块截断，等待下一块
+            # 元素之后须紧跟 , 或 ]，否则可能是被截断的数字 (如 "7." 解析成 7)，同样等待下一块
+            nxt = end
+            while nxt < len(buf) and buf[nxt] in " \t\r\n":
+                nxt += 1
+            if nxt >= len(buf) or buf[nxt] not in ",]": break
+            yield obj
+            pos = nxt
+    raise ValueError("报价数据不完整 (JSON 数组未结束)")
+
+
+def iter_skinport_quotes(chunks):
+    """从 Skinport /v1/items 响应分块中逐条产出 (market_hash_name, min_price)"""
+    for item in iter_json_array(chunks):
+        name = item.get('market_hash_name')
+        price = item.get('min_price')
+        if name and price is not None:
+            yield name, float(price)
+
 
+@contextmanager
+def _open_price_feed(source=None, etag=None, chunk_size=65536):
+    """
+    打开报价数据源，产出 (分块迭代器, ETag)；服务器返回 304 时分块迭代器为 None。
+    source 为空时请求 Skinport 接口，为 http(s) URL 时请求该地址 (本地模拟服务器)，否则视为本地 JSON 文件。
+    """
+    if source and not str(source).startswith(("http://", "https://")):
+        with open(source, 'rb') as f:
+            yield iter(lambda: f.read(chunk_size), b""), None
+        return
+
+    headers = dict(SKINPORT_HEADERS)
+    if etag: headers['If-None-Match'] = etag
+    # 流式读取，不经过磁盘响应缓存 (报价快照本身即缓存)，但复用共享连接池
+    response = get_client().session.get(source or SKINPORT_ITEMS_URL, params=SKINPORT_PARAMS,
+                                        headers=headers, timeout=10, stream=True)
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            price_map = {}
-            for item in data:
-                name = item.get('market_hash_name')
-                price = item.get('min_price')
-                if name and price is not None:
-                    price_map[name] = float(price)
-            print(f"   ✅ 连接成功！获取到 {len(price_map)} 条实时报价")
-            return price_map
-        return None
+        if response.status_code == 304:
+            yield None, etag
+            return
+        response.raise_for_status()
+        yield response.iter_content(chunk_size), response.headers.get('ETag')
+    finally:
+        response.close()
+
+
+def sync_realtime_prices(source=None, store=None):
+    """
+    流式拉取 Skinport 报价，逐条合并进本地报价快照 (PriceHistoryStore 的 live_quotes 表)，
+    返回合并后的报价代号，失败返回 None。新出现或价格变化的条目标记为新代号，
+    调用方用 quotes_since(上次代号) 取得自己尚未应用的变化。
+    快照未过期 (按 HTTP 缓存有效期) 或服务器 304 时不下载，代号不变。
+    """
+    store = store or PriceHistoryStore()
+    feed = source or SKINPORT_ITEMS_URL
+    state = store.feed_state(feed)
+    is_remote = not source or str(source).startswith(("http://", "https://"))
+    if is_remote and state:
+        ttl = get_client().ttl_for(feed)
+        if ttl and time.time() - state['fetched_at'] < ttl:
+            print("   ⚡ 报价快照未过期，使用本地快照")
+            return store.quote_generation()
+
+    try:
+        with _open_price_feed(source, state['etag'] if state else None) as (chunks, etag):
+            if chunks is None:
+                print("   ⚡ 服务器确认报价未变化 (304)，使用本地快照")
+                store.touch_feed(feed)
+                return store.quote_generation()
+            gen, changed = store.merge_quotes(feed, iter_skinport_quotes(chunks), etag)
     except Exception as e:
         print(f"   ⚠️ 网络连接跳过: {e}")
-        return None
\ No newline at end of file
+        return None
+
+    print(f"   ✅ 实时报价已同步，{changed} 条有变化 (代号 {gen})")
+    return gen
+
+
+def fetch_price_changes(since=0, source=None, store=None):
+    """
+    同步后返回 (代号大于 since 的报价 {market_hash_name: min_price}, 当前代号)，失败返回 None。
+    since=0 即全部报价。
+    """
+    print("☁️  正在检查实时报价变化 (Skinport API)...")
+    store = store or PriceHistoryStore()
+    if sync_realtime_prices(source, store) is None: return None
+    return store.quotes_since(since)
+
+
+def fetch_realtime_prices(source=None, store=None):
+    """获取 Skinport 实时价格 {market_hash_name: min_price}，失败返回 None"""
+    print("☁️  正在尝试联网获取实时价格 (Skinport API)...")
+    result = fetch_price_changes(0, source, store)
+    return result[0] if result is not None else None
@@ -11,7 +11,7 @@ try:
 except ImportError:
     WEB_ENGINE_AVAILABLE = False
 
-from src.core.network_graph import NetworkAnalyzer
+from src.core.network_graph import cached_network_html
 from src.ui.styles import THEMES
 import config
 
@@ -27,21 +27,18 @@ class NetworkWorker(QThread):
 
     def run(self):
         try:
-            analyzer = NetworkAnalyzer(self.db_path)
-            metrics = analyzer.calculate_centrality()
-
             output_dir = os.path.join(os.getcwd(), "CS2_Reports", "network_viz")
             if not os.path.exists(output_dir):
                 os.makedirs(output_dir)
 
-            html_path = os.path.join(output_dir, "network.html")
             rarity_filter = self.filters.get('rarities')
             top_n = self.filters.get('top_n', 100)
 
-            # 传递主题颜色
-            final_path = analyzer.generate_interactive_html(html_path, rarity_filter, top_n, self.theme_colors)
+            # 传递主题颜色；相同 (筛选, 主题, 数据库版本) 直接复用已生成的文件
+            final_path, summary = cached_network_html(self.db_path, output_dir, rarity_filter, top_n, self.theme_colors,
+                                                      fixed_layout=self.filters.get('fixed_layout', False))
 
-            self.finished_signal.emit(final_path, metrics, "")
+            self.finished_signal.emit(final_path, summary, "")
 
         except Exception as e:
             import traceback
@@ -82,10 +79,15 @@ class NetworkWidget(QWidget):
         ctrl_layout.addSpacing(10)
         ctrl_layout.addWidget(QLabel("Top节点:"))
         self.combo_topn = QComboBox()
-        self.combo_topn.addItems(["50", "100", "200", "500"])
+        self.combo_topn.addItems(["50", "100", "200", "500", "1000", "2000"])
         self.combo_topn.setCurrentIndex(1)
         ctrl_layout.addWidget(self.combo_topn)
 
+        ctrl_layout.addSpacing(10)
+        self.check_fixed_layout = QCheckBox("预计算布局")
+        self.check_fixed_layout.setToolTip("在本地预先计算节点坐标并关闭浏览器端物理模拟，适合大图 (结果会缓存)。")
+        ctrl_layout.addWidget(self.check_fixed_layout)
+
         ctrl_layout.addSpacing(20)
         self.btn_analyze = QPushButton("🚀 生成图谱")
         self.btn_analyze.clicked.connect(self.start_analysis)
@@ -172,14 +174,14 @@ class NetworkWidget(QWidget):
             rarities = [4, 5]
 
         top_n = int(self.combo_topn.currentText())
-        filters = {'rarities': rarities, 'top_n': top_n}
+        filters = {'rarities': rarities, 'top_n': top_n, 'fixed_layout': self.check_fixed_layout.isChecked()}
         theme_colors = THEMES.get(self.current_theme, THEMES["商务蓝 (Default)"])
 
         self.worker = NetworkWorker(config.DB_PATH, filters, theme_colors)
         self.worker.finished_signal.connect(self.on_analysis_finished)
         self.worker.start()
 
-    def on_analysis_finished(self, html_path, metrics, error_msg):
+    def on_analysis_finished(self, html_path, summary, error_msg):
         self.btn_analyze.setEnabled(True)
         self.progress.setVisible(False)
 
@@ -205,10 +207,8 @@ class NetworkWidget(QWidget):
                 print(f"🌍 加载 URL: {local_url.toString()}")
                 self.web_view.load(local_url)
 
-            node_count = len(metrics.get('pagerank', {}))
-            top_node = "None"
-            if node_count > 0:
-                top_node = max(metrics['pagerank'], key=metrics['pagerank'].get)
+            node_count = summary.get('node_count', 0)
+            top_node = summary.get('top_node') or "None"
 
             msg = f"✅ 分析完成！全网节点数: {node_count} | 核心节点: {top_node}"
             self.info_label.setText(msg)
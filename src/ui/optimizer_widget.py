@@ -5,8 +5,14 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QPushButton, QProgressBar,
 from PyQt5.QtCore import QThread, pyqtSignal, Qt
 from PyQt5.QtGui import QColor, QBrush
 from src.core.simulator import CS2TradeUpSimulator
-from src.core.optimizer import SmartOptimizer
+from src.core.optimizer import SmartOptimizer, run_optimizer_arm
+from src.core.candidate_index import CandidateIndex
+from src.core import network_graph
 from src.utils import visualization
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty
+import multiprocessing
+import random
 import config
 import time
 
@@ -24,78 +30,33 @@ class MiningWorker(QThread):
         self.do_compare = params.get('do_compare', False)  # 获取对比标志
 
     def run(self):
-        # ==========================================
-        # 阶段 1: 核心挖掘 (Guided / 实验组)
-        # ==========================================
-        self.log_signal.emit(f"🚀 [阶段 1] 启动网络指导挖掘 (Network Guided)...")
-
-        # 初始化带网络指导的优化器
-        opt_guided = SmartOptimizer(self.sim, use_network_guidance=True)
-
-        # 检查池子是否为空
-        pools = opt_guided._load_candidates_for_rarity(self.rarity)
-        if not pools['all']:
+        # 检查池子是否为空 (找到第一个可用候选即返回，不建索引)
+        if not CandidateIndex.has_candidates(self.sim.raw_db, self.rarity):
             self.log_signal.emit("❌ 候选池为空，请检查数据库或筛选条件！")
             self.finished_signal.emit({})
             return
 
-        # 定义进度回调
-        def progress_callback_guided(percent, msg):
-            # 如果要跑两轮，第一轮进度条只走 0-50%
-            factor = 0.5 if self.do_compare else 1.0
-            self.progress_signal.emit(int(percent * factor))
-            if msg: self.log_signal.emit(f"[Guided] {msg}")
-
         try:
-            # 运行 Guided 算法
-            session_folder, tier_top_recipes, history_guided = opt_guided.run(
-                target_rarity_list=[self.rarity],
-                params=self.params,
-                progress_callback=progress_callback_guided
-            )
-
-            # ==========================================
-            # 阶段 2: 对照组挖掘 (Baseline / 控制组) - 可选
-            # ==========================================
-            if self.do_compare:
-                self.log_signal.emit(f"🔬 [阶段 2] 启动基准对照挖掘 (Random Baseline)...")
-
-                # 初始化无指导的优化器 (use_network_guidance=False)
-                opt_baseline = SmartOptimizer(self.sim, use_network_guidance=False)
+            if not self.do_compare:
+                # ==========================================
+                # 单组模式: 网络指导挖掘 (Guided)
+                # ==========================================
+                self.log_signal.emit(f"🚀 启动网络指导挖掘 (Network Guided)...")
+                opt_guided = SmartOptimizer(self.sim, use_network_guidance=True)
 
-                def progress_callback_baseline(percent, msg):
-                    # 第二轮进度条走 50-90%
-                    base = 50
-                    factor = 0.4
-                    self.progress_signal.emit(base + int(percent * factor))
-                    if msg and percent % 20 == 0:  # 减少日志刷屏
-                        self.log_signal.emit(f"[Baseline] {msg}")
+                def progress_callback_guided(percent, msg):
+                    self.progress_signal.emit(int(percent))
+                    if msg: self.log_signal.emit(f"[Guided] {msg}")
 
-                _, _, history_baseline = opt_baseline.run(
+                # 运行 Guided 算法 (或确定性分支定界模式)
+                run_fn = opt_guided.run_exhaustive if self.params.get('exhaustive') else opt_guided.run
+                session_folder, tier_top_recipes, _ = run_fn(
                     target_rarity_list=[self.rarity],
                     params=self.params,
-                    progress_callback=progress_callback_baseline
+                    progress_callback=progress_callback_guided
                 )
-
-                # ==========================================
-                # 阶段 3: 生成对比图表
-                # ==========================================
-                self.log_signal.emit("📊 正在绘制算法效能对比图...")
-                self.progress_signal.emit(95)
-
-                print(f"DEBUG: do_compare = {self.do_compare}")
-                print(f"DEBUG: Guided History Length = {len(history_guided) if history_guided else 0}")
-                print(
-                    f"DEBUG: Baseline History Length = {len(history_baseline) if 'history_baseline' in locals() and history_baseline else 0}")
-                try:
-                    visualization.plot_convergence_comparison(
-                        history_baseline,
-                        history_guided,
-                        session_folder
-                    )
-                    self.log_signal.emit(f"✅ 对比图已生成: convergence_comparison.png")
-                except Exception as e:
-                    self.log_signal.emit(f"⚠️ 对比图生成失败: {e}")
+            else:
+                session_folder, tier_top_recipes = self._run_compare()
 
             self.progress_signal.emit(100)
             self.log_signal.emit(f"✅ 全部任务完成！报告路径: {session_folder}")
@@ -107,6 +68,99 @@ class MiningWorker(QThread):
             self.log_signal.emit(f"❌ 严重错误: {str(e)}")
             self.finished_signal.emit({})
 
+    def _run_compare(self):
+        """
+        对比模式: 实验组 (Guided) 与对照组 (Baseline) 在两个独立进程中并行运行。
+        两组使用同一随机种子，各自持有数据库副本，互不干扰；
+        进度经队列汇总到 GUI 线程。两组都运行 GA (精确求解模式下不提供对比)。
+        """
+        self.log_signal.emit(f"🚀 并行启动网络指导挖掘 (Guided) 与基准对照挖掘 (Random Baseline)...")
+        seed = self.params.get('seed')
+        if seed is None: seed = random.randrange(2 ** 31)
+        self.log_signal.emit(f"🎲 对比随机种子: {seed}")
+
+        guided_params = dict(self.params, seed=seed, exhaustive=False)
+        # 对照组为无网络指导的 GA，结果写入独立的报告目录
+        baseline_params = dict(self.params, seed=seed, exhaustive=False, session_suffix="_baseline")
+
+        # 子进程中没有共享分析器: 传入同步实时价格后的价格版本，并先在本进程写好该版本的权重缓存，
+        # 实验组与单组模式读到相同的网络权重
+        price_version = network_graph.shared_price_version(self.sim.db_path)
+        if price_version:
+            network_graph.load_optimization_weights(
+                self.sim.db_path, hub_centrality=getattr(config, 'NETWORK_HUB_CENTRALITY', False))
+
+        manager = multiprocessing.Manager()
+        queue = manager.Queue()
+        progress = {'guided': 0, 'baseline': 0}
+        last_logged = -1
+        try:
+            with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as pool:
+                f_guided = pool.submit(run_optimizer_arm, 'guided', self.sim.raw_db, self.sim.db_path,
+                                       self.rarity, guided_params, True, queue, price_version)
+                f_baseline = pool.submit(run_optimizer_arm, 'baseline', self.sim.raw_db, self.sim.db_path,
+                                         self.rarity, baseline_params, False, queue)
+
+                while True:
+                    done = f_guided.done() and f_baseline.done()
+                    while True:
+                        try:
+                            arm, percent, msg = queue.get_nowait()
+                        except Empty:
+                            break
+                        progress[arm] = percent
+                        if arm == 'guided':
+                            if msg: self.log_signal.emit(f"[Guided] {msg}")
+                        elif msg and percent // 20 != last_logged:  # 减少日志刷屏
+                            last_logged = percent // 20
+                            self.log_signal.emit(f"[Baseline] {msg}")
+                    # 两组并行，进度条取平均，最后 10% 留给绘图
+                    self.progress_signal.emit(int((progress['guided'] + progress['baseline']) / 2 * 0.9))
+                    if done: break
+                    time.sleep(0.2)
+
+                session_folder, tier_top_recipes, history_guided = f_guided.result()
+                _, _, history_baseline = f_baseline.result()
+        finally:
+            manager.shutdown()
+
+        # ==========================================
+        # 生成对比图表
+        # ==========================================
+        self.log_signal.emit("📊 正在绘制算法效能对比图...")
+        self.progress_signal.emit(95)
+        try:
+            visualization.plot_convergence_comparison(
+                history_baseline,
+                history_guided,
+                session_folder
+            )
+            self.log_signal.emit(f"✅ 对比图已生成: convergence_comparison.png")
+        except Exception as e:
+            self.log_signal.emit(f"⚠️ 对比图生成失败: {e}")
+        return session_folder, tier_top_recipes
+
+
+class PriceSyncWorker(QThread):
+    """同步实时报价: 定向更新共享模拟器的价格，并把改价转交网络图谱做增量更新"""
+    log_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(int)
+
+    def __init__(self, simulator):
+        super().__init__()
+        self.sim = simulator
+
+    def run(self):
+        try:
+            touched = self.sim.refresh_realtime_prices()
+            if touched:
+                network_graph.apply_price_updates(self.sim.db_path, touched)
+            self.log_signal.emit(f"✅ 实时价格已同步，{len(touched)} 个物品改价")
+            self.finished_signal.emit(len(touched))
+        except Exception as e:
+            self.log_signal.emit(f"❌ 实时价格同步失败: {str(e)}")
+            self.finished_signal.emit(0)
+
 
 class OptimizerWidget(QWidget):
     def __init__(self):
@@ -152,6 +206,18 @@ class OptimizerWidget(QWidget):
         self.spin_premium.setValue(1.0)
         form_left.addRow("磨损溢价系数:", self.spin_premium)
 
+        self.spin_warm = QSpinBox()
+        self.spin_warm.setRange(0, 20)
+        self.spin_warm.setValue(0)
+        self.spin_warm.setSpecialValueText("不使用")
+        self.spin_warm.setToolTip("用最近 N 次挖掘会话的最优配方 (按当前价格重新定价) 作为初始种群的一部分。")
+        form_left.addRow("热启动会话数:", self.spin_warm)
+
+        self.combo_cluster = QComboBox()
+        self.combo_cluster.addItems(["不划分", "簇内混合", "相邻簇交叉"])
+        self.combo_cluster.setToolTip("按产出价值结构对收藏品聚类 (标签传播)，初始种群与交叉只在同一簇或相邻簇对内进行。")
+        form_left.addRow("搜索空间划分:", self.combo_cluster)
+
         param_inner.addLayout(form_left)
 
         form_right = QFormLayout()
@@ -166,6 +232,19 @@ class OptimizerWidget(QWidget):
         self.spin_mutation.setValue(config.MUTATION_RATE)
         form_right.addRow("变异概率:", self.spin_mutation)
 
+        # 成本约束 (0 表示不限)
+        self.spin_min_cost = QDoubleSpinBox()
+        self.spin_min_cost.setRange(0.0, 1000000.0)
+        self.spin_min_cost.setPrefix("¥")
+        self.spin_min_cost.setSpecialValueText("不限")
+        form_right.addRow("成本下限:", self.spin_min_cost)
+
+        self.spin_max_cost = QDoubleSpinBox()
+        self.spin_max_cost.setRange(0.0, 1000000.0)
+        self.spin_max_cost.setPrefix("¥")
+        self.spin_max_cost.setSpecialValueText("不限")
+        form_right.addRow("成本上限:", self.spin_max_cost)
+
         param_inner.addLayout(form_right)
         layout.addWidget(param_group)
 
@@ -179,8 +258,23 @@ class OptimizerWidget(QWidget):
         self.check_compare.setToolTip("勾选后将运行两轮算法（有/无网络指导），并生成对比曲线图。")
         self.check_compare.setStyleSheet("QCheckBox { color: #e74c3c; font-weight: bold; }")
 
+        self.check_exhaustive = QCheckBox("精确求解 (1~2 收藏品)")
+        self.check_exhaustive.setToolTip("穷举 1~2 个收藏品的全部配比并分支定界剪枝，结果确定且全局最高 ROI 精确。")
+
+        self.check_pareto = QCheckBox("多目标帕累托搜索 (NSGA-II)")
+        self.check_pareto.setToolTip("同时优化 ROI / 风险 / 成本，一次运行得到完整的帕累托前沿。")
+
+        self.check_adaptive = QCheckBox("自适应变异算子")
+        self.check_adaptive.setToolTip("按各变异算子的子代改进率在线调整其使用概率 (算子统计写入 history)。")
+
+        # 精确求解与网络指导无关，两组结果相同，对比无意义
+        self.check_exhaustive.toggled.connect(self._on_exhaustive_toggled)
+
         opts_layout.addWidget(self.check_save_png)
         opts_layout.addWidget(self.check_compare)
+        opts_layout.addWidget(self.check_exhaustive)
+        opts_layout.addWidget(self.check_pareto)
+        opts_layout.addWidget(self.check_adaptive)
         opts_layout.addStretch()
         layout.addLayout(opts_layout)
 
@@ -188,7 +282,17 @@ class OptimizerWidget(QWidget):
         self.btn_start = QPushButton("开始挖掘任务")
         self.btn_start.setCursor(Qt.PointingHandCursor)
         self.btn_start.clicked.connect(self.start_mining)
-        layout.addWidget(self.btn_start)
+
+        # 挖掘任务启动时对价格取快照，同步只影响之后启动的任务，因此两者互斥
+        self.btn_sync = QPushButton("同步实时价格")
+        self.btn_sync.setCursor(Qt.PointingHandCursor)
+        self.btn_sync.setToolTip("拉取 Skinport 实时报价，只更新有变化的价格 (网络图谱同步增量更新)。")
+        self.btn_sync.clicked.connect(self.sync_prices)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addWidget(self.btn_start, 1)
+        btn_layout.addWidget(self.btn_sync)
+        layout.addLayout(btn_layout)
 
         self.progress = QProgressBar()
         layout.addWidget(self.progress)
@@ -239,6 +343,24 @@ class OptimizerWidget(QWidget):
         self.log_area.setReadOnly(True)
         layout.addWidget(self.log_area)
 
+    def _on_exhaustive_toggled(self, checked):
+        if checked: self.check_compare.setChecked(False)
+        self.check_compare.setEnabled(not checked)
+
+    def sync_prices(self):
+        self.btn_sync.setEnabled(False)
+        self.btn_start.setEnabled(False)
+        self.btn_sync.setText("⏳ 同步中...")
+        self.sync_worker = PriceSyncWorker(self.sim)
+        self.sync_worker.log_signal.connect(self.log_area.append)
+        self.sync_worker.finished_signal.connect(self.on_sync_finished)
+        self.sync_worker.start()
+
+    def on_sync_finished(self, count):
+        self.btn_sync.setEnabled(True)
+        self.btn_start.setEnabled(True)
+        self.btn_sync.setText("同步实时价格")
+
     def start_mining(self):
         idx = self.combo_rarity.currentIndex()
         target_rarity = [3, 4, 5][idx]
@@ -249,10 +371,18 @@ class OptimizerWidget(QWidget):
             'mutation_rate': self.spin_mutation.value(),
             'save_png': self.check_save_png.isChecked(),
             'wear_premium_factor': self.spin_premium.value(),
-            'do_compare': self.check_compare.isChecked()  # ✅ 传递对比参数
+            'do_compare': self.check_compare.isChecked() and not self.check_exhaustive.isChecked(),  # ✅ 传递对比参数
+            'exhaustive': self.check_exhaustive.isChecked(),
+            'min_cost': self.spin_min_cost.value(),
+            'max_cost': self.spin_max_cost.value(),
+            'selection': 'nsga2' if self.check_pareto.isChecked() else 'scalar',
+            'adaptive_operators': self.check_adaptive.isChecked(),
+            'warm_start_sessions': self.spin_warm.value(),
+            'cluster_mode': ['off', 'within', 'cross'][self.combo_cluster.currentIndex()]
         }
 
         self.btn_start.setEnabled(False)
+        self.btn_sync.setEnabled(False)
         self.btn_start.setText("🔥 正在挖掘中...")
         self.log_area.clear()
         self.result_container.setVisible(False)
@@ -266,6 +396,7 @@ class OptimizerWidget(QWidget):
 
     def on_finished(self, results):
         self.btn_start.setEnabled(True)
+        self.btn_sync.setEnabled(True)
         self.btn_start.setText("开始挖掘任务")
 
         if not results: return
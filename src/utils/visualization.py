@@ -24,10 +24,10 @@ plt.rcParams['axes.unicode_minus'] = False
 sns.set_style("whitegrid", {'font.sans-serif': ['Microsoft YaHei', 'SimHei']})
 
 
-def init_session_folder():
+def init_session_folder(suffix=""):
     root_dir = PathManager.get_report_dir()
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    session_path = root_dir / timestamp
+    session_path = root_dir / f"{timestamp}{suffix}"
     session_path.mkdir(parents=True, exist_ok=True)
     return str(session_path)
 
@@ -41,7 +41,7 @@ def save_plot(filename, folder_path):
         print(f"❌ 保存图片失败 {filename}: {e}")
 
 
-def save_raw_data(history_data, all_results, buckets, folder_path, simulator):
+def save_raw_data(history_data, all_results, buckets, folder_path, simulator, pareto_front=None):
     """保存原始数据到 JSON"""
     data_path = os.path.join(folder_path, "session_data.json")
     evolution_data = history_data if history_data else []
@@ -65,7 +65,9 @@ def save_raw_data(history_data, all_results, buckets, folder_path, simulator):
                 "rank": rank + 1,
                 "roi": res.roi,
                 "cost": res.total_cost,
-                "expected": res.expected_value
+                "expected": res.expected_value,
+                "rarity": res.input_rarity,
+                "inputs": _recipe_identity(rec)
             })
         top_recipes[tier] = tier_data
 
@@ -75,6 +77,12 @@ def save_raw_data(history_data, all_results, buckets, folder_path, simulator):
         "roi_list": roi_distribution,
         "top_recipes": top_recipes
     }
+    if pareto_front:
+        payload["pareto_front"] = [
+            {"roi": r.roi, "cost": r.total_cost, "std_dev": r.std_dev, "rarity": r.input_rarity,
+             "inputs": _recipe_identity(rec)}
+            for r, rec in sorted(pareto_front, key=lambda x: x[0].total_cost)
+        ]
 
     try:
         with open(data_path, 'w', encoding='utf-8') as f:
@@ -83,6 +91,45 @@ def save_raw_data(history_data, all_results, buckets, folder_path, simulator):
         pass
 
 
+def _recipe_identity(recipe):
+    """配方的最小身份信息 (收藏品, 名称, 磨损)，价格在读取时按当前价格重新计算"""
+    return [{"collection": i.collection, "name": i.name, "float": i.float_value} for i in recipe]
+
+
+def load_recent_recipes(n_sessions, rarity=None, exclude=None):
+    """
+    读取最近 n_sessions 个会话 session_data.json 中保存的配方身份 (各段位 Top + 帕累托前沿)。
+    返回 [{"rarity", "roi", "inputs": [...]}, ...]；旧版会话没有 inputs 字段，会被跳过。
+    对比模式的对照组会话 (*_baseline) 不计入。roi 为保存时的价格，仅供参考。
+    """
+    if n_sessions <= 0: return []
+    root_dir = PathManager.get_report_dir()
+    if not root_dir.exists(): return []
+    exclude = os.path.abspath(exclude) if exclude else None
+
+    folders = sorted((p for p in root_dir.iterdir()
+                      if not p.name.endswith("_baseline") and (p / "session_data.json").is_file()),
+                     key=lambda p: p.name, reverse=True)
+    recipes = []
+    used = 0
+    for folder in folders:
+        if used >= n_sessions: break
+        if exclude and os.path.abspath(folder) == exclude: continue
+        try:
+            with open(folder / "session_data.json", 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            continue
+        used += 1
+        entries = [r for lst in data.get("top_recipes", {}).values() for r in lst]
+        entries += data.get("pareto_front", [])
+        for r in entries:
+            if not r.get("inputs"): continue
+            if rarity is not None and r.get("rarity") != rarity: continue
+            recipes.append({"rarity": r.get("rarity"), "roi": r.get("roi", 0), "inputs": r["inputs"]})
+    return recipes
+
+
 def save_detailed_report_to_excel(best_recipes, simulator, folder_path):
     pass  # 暂留空
 
@@ -292,6 +339,26 @@ def plot_efficient_frontier(all_results, folder_path):
     save_plot("efficient_frontier.png", folder_path)
 
 
+def plot_pareto_front(pareto_front, all_results, folder_path):
+    """多目标搜索得到的 ROI/风险/成本 帕累托前沿，叠加在全部采样点之上"""
+    if not pareto_front: return
+    front = pd.DataFrame([{'Risk': r.std_dev, 'ROI': r.roi * 100, 'Cost': r.total_cost} for r, _ in pareto_front])
+    plt.figure(figsize=(10, 6))
+    cloud = [{'Risk': r[0].std_dev, 'ROI': r[0].roi * 100} for r in all_results if -0.5 < r[0].roi < 3]
+    if cloud:
+        df = pd.DataFrame(cloud)
+        plt.scatter(df['Risk'], df['ROI'], color='lightgray', alpha=0.4, s=10, label='全部采样')
+    sc = plt.scatter(front['Risk'], front['ROI'], c=front['Cost'], cmap='viridis', s=40, edgecolors='k',
+                     label='帕累托前沿')
+    plt.colorbar(sc, label='成本')
+    plt.title('ROI / 风险 / 成本 帕累托前沿')
+    plt.xlabel('Risk (Std Dev)')
+    plt.ylabel('ROI (%)')
+    plt.axhline(0, color='r', linestyle='--')
+    plt.legend()
+    save_plot("pareto_front.png", folder_path)
+
+
 def plot_ridgeline_chart(all_results, folder_path):
     data = [{'ROI': r[0].roi} for r in all_results if -1 < r[0].roi < 3]
     if not data: return
@@ -0,0 +1,133 @@
+import json
+import random
+import sys
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path: sys.path.insert(0, str(ROOT))
+
+CONDITIONS = ["Factory New", "Minimal Wear", "Field-Tested", "Well-Worn", "Battle-Scarred"]
+
+
+def _test_config():
+    """config.py 是本地配置 (不随仓库提交)，测试使用固定的最小配置，结果不受本地设置影响"""
+    cfg = types.ModuleType("config")
+    cfg.DB_PATH = ""
+    cfg.EXCHANGE_RATE = 7.2
+    cfg.BUFF_RATIO = 1.0
+    cfg.TIER_MICRO_USD = 5
+    cfg.TIER_LOW_USD = 20
+    cfg.TIER_MID_USD = 100
+    cfg.RECIPE_TEMPLATES = [(10, 0), (9, 1), (8, 2), (7, 3), (5, 5)]
+    cfg.RARITIES_TO_SCAN = [3]
+    cfg.POPULATION_SIZE = 40
+    cfg.GENERATIONS = 4
+    cfg.MUTATION_RATE = 0.3
+    cfg.ELITISM_COUNT = 3
+    cfg.MANUAL_PRICE_OVERRIDE = {}
+    return cfg
+
+
+sys.modules["config"] = _test_config()
+
+
+def make_raw_db(n_collections=6, seed=0, items_per_tier=(2, 4), float_ranges=None):
+    """
+    合成数据库 (稀有度键为 int)。各物品价格随磨损等级单调不增 (与真实市场一致)，
+    float_ranges 给出时输入物品的磨损范围从中选取。
+    """
+    rng = random.Random(seed)
+    float_ranges = float_ranges or [(0.0, 1.0), (0.0, 0.8), (0.06, 0.8), (0.0, 0.5)]
+    db = {}
+    for c in range(n_collections):
+        tiers = {}
+        for r in range(2, 7):
+            items = []
+            for i in range(rng.randint(*items_per_tier) if r < 6 else 2):
+                mn, mx = rng.choice(float_ranges)
+                base = (6 ** r) * 0.002 * rng.uniform(0.5, 2.0)
+                price_dict = {cond: round(base * (1.8 - 0.2 * k), 2) for k, cond in enumerate(CONDITIONS)}
+                items.append({"name": f"W{c}_{r}_{i} | Skin", "name_cn": f"皮肤{c}-{r}-{i}",
+                              "min_float": mn, "max_float": mx, "price_dict": price_dict})
+            tiers[r] = items
+        db[f"Col{c}"] = tiers
+    return db
+
+
+@pytest.fixture(autouse=True)
+def isolated_root(tmp_path, monkeypatch):
+    """数据目录 / 报告目录都指向临时目录，测试不会写入项目根目录"""
+    from src.utils.path_manager import PathManager
+    monkeypatch.setattr(PathManager, "get_root_dir", staticmethod(lambda: tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    """写入磁盘的合成数据库 (JSON 中稀有度键为字符串)，并设为 config.DB_PATH"""
+    def write(raw_db=None):
+        raw_db = raw_db if raw_db is not None else make_raw_db()
+        path = tmp_path / "tradeup_db.json"
+        path.write_text(json.dumps({c: {str(r): v for r, v in t.items()} for c, t in raw_db.items()},
+                                   ensure_ascii=False), encoding="utf-8")
+        monkeypatch.setattr(sys.modules["config"], "DB_PATH", str(path))
+        return path
+    return write
+
+
+class StubServer:
+    """
+    本地 HTTP 模拟服务器 (端口自动分配)。handle(path, headers) 返回 (状态码, 响应头, 正文)；
+    收到的请求按顺序记录在 requests [(path, headers)]，返回的状态码记录在 statuses。
+    """
+
+    def __init__(self, handle):
+        self.requests = []
+        self.statuses = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                headers = dict(self.headers)
+                stub.requests.append((self.path, headers))
+                status, extra, body = handle(self.path, headers)
+                stub.statuses.append(status)
+                self.send_response(status)
+                for k, v in extra.items(): self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def etag_response(headers, body, etag):
+    """带 ETag 的 200 响应；请求的 If-None-Match 与之相同时返回 304"""
+    if headers.get("If-None-Match") == etag: return 304, {}, b""
+    return 200, {"ETag": etag, "Content-Type": "application/json"}, body
+
+
+@pytest.fixture
+def stub_server():
+    """stub_server(handle) 启动一个 StubServer，测试结束时关闭"""
+    servers = []
+
+    def start(handle):
+        servers.append(StubServer(handle))
+        return servers[-1]
+    yield start
+    for server in servers: server.close()
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+import urllib.parse
+
+import pytest
+import requests
+
+from src.core.bulk_fetcher import BulkHistoryFetcher
+from src.core.price_history_store import QUEUE_DONE, QUEUE_FAILED, QUEUE_PENDING, PriceHistoryStore
+
+PRICES = {"success": True, "prices": [["Jan 02 2026 01: +0", 1.5, "3"], ["Jan 03 2026 01: +0", 1.7, "5"]]}
+
+
+class StubSteam:
+    """按物品名依次返回预设响应，脚本用完后返回 200 + 历史数据"""
+
+    def __init__(self):
+        self.scripts = {}
+        self.requests = []
+
+    def __call__(self, path, headers):
+        name = urllib.parse.parse_qs(urllib.parse.urlparse(path).query)['market_hash_name'][0]
+        self.requests.append(name)
+        script = self.scripts.get(name)
+        status, extra = script.pop(0) if script else (200, {})
+        return status, extra, json.dumps(PRICES).encode() if status == 200 else b"{}"
+
+    def count(self, name):
+        return self.requests.count(name)
+
+
+@pytest.fixture
+def stub(stub_server):
+    steam = StubSteam()
+    steam.url = stub_server(steam).base_url + "/pricehistory/"
+    return steam
+
+
+@pytest.fixture
+def make_fetcher(tmp_path, stub):
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        time.sleep(min(seconds, 0.05))
+
+    def make(**kwargs):
+        store = PriceHistoryStore(tmp_path / "history.sqlite")
+        options = dict(base_url=stub.url, workers=1, rate=1000, max_attempts=3, backoff_base=0.01,
+                       session=requests.Session(), sleep=sleep)
+        options.update(kwargs)
+        return BulkHistoryFetcher(store, **options)
+    make.sleeps = sleeps
+    return make
+
+
+def test_429_honours_retry_after(stub, make_fetcher):
+    stub.scripts["A (Field-Tested)"] = [(429, {"Retry-After": "0.2"})]
+    fetcher = make_fetcher()
+    result = fetcher.fetch_one("A (Field-Tested)")
+    assert result['status'] == QUEUE_DONE and result['attempts'] == 2 and result['days'] == 2
+    assert 0.2 in make_fetcher.sleeps
+    assert fetcher.bucket.paused_until > 0
+
+
+def test_5xx_backs_off_then_gives_up_without_trailing_sleep(stub, make_fetcher):
+    stub.scripts["B (Field-Tested)"] = [(503, {}), (502, {})]
+    fetcher = make_fetcher()
+    assert fetcher.fetch_one("B (Field-Tested)")['attempts'] == 3
+    assert len(make_fetcher.sleeps) == 2 and all(0 <= s <= 0.08 for s in make_fetcher.sleeps)
+
+    make_fetcher.sleeps.clear()
+    stub.scripts["C (Field-Tested)"] = [(500, {})] * 5
+    result = fetcher.fetch_one("C (Field-Tested)")
+    # max_attempts 为总请求数，最后一次失败后不再退避
+    assert result == {'status': QUEUE_FAILED, 'attempts': 3, 'error': "HTTP 500", 'days': 0}
+    assert stub.count("C (Field-Tested)") == 3 and len(make_fetcher.sleeps) == 2
+
+
+def test_interrupted_run_resumes(stub, make_fetcher):
+    names = ["A (Field-Tested)", "B (Field-Tested)", "C (Field-Tested)"]
+    stub.scripts["A (Field-Tested)"] = [(503, {"Retry-After": "30"})]
+    fetcher = make_fetcher()
+    fetcher.enqueue(names)
+
+    stop = threading.Event()
+    threading.Timer(0.3, stop.set).start()
+    started = time.monotonic()
+    counts = fetcher.run(stop_event=stop)
+    # 退避等待被停止信号打断，不会等满 Retry-After
+    assert time.monotonic() - started < 5
+    assert counts == {QUEUE_DONE: 0, QUEUE_FAILED: 0}
+    assert sorted(fetcher.store.pending()) == names
+    assert fetcher.store.item_status("A (Field-Tested)")['status'] == QUEUE_PENDING
+
+    counts = fetcher.run()
+    assert counts == {QUEUE_DONE: 3, QUEUE_FAILED: 0}
+    assert not fetcher.store.pending()
+    assert all(len(fetcher.store.load(n)) == 2 for n in names)
+    assert [stub.count(n) for n in names] == [2, 1, 1]
@@ -0,0 +1,125 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from src.core import utils
+from src.core.core_engine import CS2PriceEngine
+from src.core.float_solver import (FloatAllocator, FloatOption, build_float_options, cheapest_pair_batch,
+                                   combine_frontiers, options_frontier, output_thresholds, solve_recipe_floats)
+from src.core.simulator import CS2TradeUpSimulator, TradeInputItem
+from conftest import make_raw_db
+
+
+def _random_units(rng, n_units, max_options=5):
+    units = []
+    for _ in range(n_units):
+        pcts = sorted(rng.sample(range(0, 101), rng.randint(1, max_options)))
+        price, opts = 100.0, []
+        for p in pcts:
+            price -= rng.uniform(1, 20)
+            opts.append(FloatOption(p / 100, max(price, 0.5), p / 100))
+        units.append(opts)
+    return units
+
+
+def _brute_cheapest(units, avg_ceiling):
+    best = None
+    for combo in itertools.product(*units):
+        if sum(o.percentage for o in combo) / len(combo) > avg_ceiling + 1e-12: continue
+        cost = sum(o.price for o in combo)
+        if best is None or cost < best: best = cost
+    return best
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_allocator_matches_brute_force(seed):
+    rng = random.Random(seed)
+    units = _random_units(rng, 4)
+    allocator = FloatAllocator(units)
+    for ceiling in (0.0, 0.05, 0.2, 0.37, 0.5, 0.8, 1.0):
+        entry = allocator.cheapest_under(ceiling)
+        expected = _brute_cheapest(units, ceiling)
+        if expected is None:
+            assert entry is None
+        else:
+            assert entry[1] == pytest.approx(expected)
+            assert entry[0] / len(units) <= ceiling + 1e-9
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pair_batch_matches_merged_frontier(seed):
+    rng = random.Random(100 + seed)
+    a, b = FloatAllocator(_random_units(rng, 3)).frontier, FloatAllocator(_random_units(rng, 2)).frontier
+    merged = combine_frontiers(a, b)
+    limits = [0.0, 0.4, 1.3, 2.2, 5.0]
+    for limit, entry in zip(limits, cheapest_pair_batch(a, b, limits)):
+        feasible = [e for e in merged if e[0] <= limit + 1e-12]
+        if not feasible:
+            assert entry is None
+        else:
+            assert entry[1] == pytest.approx(feasible[-1][1])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_combined_option_frontiers_match_brute_force(seed):
+    rng = random.Random(200 + seed)
+    units = _random_units(rng, 3)
+    frontier = options_frontier(units[0])
+    for opts in units[1:]:
+        frontier = combine_frontiers(frontier, options_frontier(opts))
+    for ceiling in (0.0, 0.1, 0.33, 0.6, 1.0):
+        feasible = [e for e in frontier if e[0] <= ceiling * len(units) + 1e-12]
+        expected = _brute_cheapest(units, ceiling)
+        if expected is None:
+            assert not feasible
+            continue
+        pct_sum, cost, picks = feasible[-1]
+        assert cost == pytest.approx(expected)
+        # 选择下标还原出的组合与前沿点一致
+        chosen = [opts[j] for opts, j in zip(units, picks)]
+        assert sum(o.price for o in chosen) == pytest.approx(cost)
+        assert sum(o.percentage for o in chosen) == pytest.approx(pct_sum)
+
+
+def _price_at(engine, col, item):
+    def price_at(f):
+        f = max(item['min_float'], min(item['max_float'], f))
+        base, cond = engine.get_base_price(item['name'], f, col)
+        return TradeInputItem(col, item['name'], item['min_float'], item['max_float'], f,
+                              utils.estimate_price_at_float(base, f, cond), base, cond)
+    return price_at
+
+
+def test_float_options_are_lower_envelope_of_price_curve():
+    raw_db = make_raw_db(4, seed=1)
+    engine = CS2PriceEngine(raw_db)
+    for col, tiers in raw_db.items():
+        for item in tiers[3]:
+            price_at = _price_at(engine, col, item)
+            options = build_float_options(item['min_float'], item['max_float'], price_at)
+            assert [o.percentage for o in options] == sorted(o.percentage for o in options)
+            assert all(a.price > b.price for a, b in zip(options, options[1:]))
+            # 任意磨损的价格都不低于 "百分比不超过它的最便宜选项"
+            span = item['max_float'] - item['min_float']
+            for f in np.linspace(item['min_float'], item['max_float'], 400):
+                pct = (f - item['min_float']) / span
+                reachable = [o.price for o in options if o.percentage <= pct + 1e-9]
+                assert reachable and min(reachable) <= price_at(f).price + 1e-9
+
+
+def test_solve_recipe_floats_respects_output_thresholds():
+    raw_db = make_raw_db(3, seed=2)
+    sim = CS2TradeUpSimulator.from_raw_db(raw_db)
+    col = "Col0"
+    item = raw_db[col][3][0]
+    price_at = _price_at(sim.price_engine, col, item)
+    recipe = [price_at(item['max_float']) for _ in range(10)]
+    plans = solve_recipe_floats(recipe, raw_db, 3,
+                                lambda i: build_float_options(i.min_float, i.max_float, price_at))
+    thresholds = output_thresholds(raw_db, [col], 3)
+    assert plans and {p.threshold for p in plans} <= set(thresholds)
+    for plan in plans:
+        assert plan.avg_percentage <= plan.threshold + 1e-9
+        assert plan.total_cost == pytest.approx(sum(price_at(f).price for f in plan.floats))
@@ -0,0 +1,83 @@
+import os
+import time
+
+import pytest
+import requests
+
+from src.core.http_client import HttpClient
+from src.core.price_predictor import DataFetcher
+from conftest import etag_response
+
+
+class StubApi:
+    """返回 self.body，ETag 固定为 '"v1"'"""
+
+    def __init__(self):
+        self.body = b'{"success": true, "prices": [["Jan 02 2026 01: +0", 1.5, "3"]]}'
+
+    def __call__(self, path, headers):
+        return etag_response(headers, self.body, '"v1"')
+
+
+@pytest.fixture
+def stub(stub_server):
+    api = StubApi()
+    api.server = stub_server(api)
+    api.url = api.server.base_url + "/api/"
+    return api
+
+
+@pytest.fixture
+def client(tmp_path):
+    return HttpClient(cache_dir=tmp_path / "http_cache", ttls={})
+
+
+def test_fresh_hit_then_etag_revalidation(client, stub):
+    first = client.get(stub.url, ttl=60)
+    assert first.from_cache == "" and first.json()["success"]
+    assert client.get(stub.url, ttl=60).from_cache == "fresh"
+    assert len(stub.server.requests) == 1
+
+    # 过期后带 If-None-Match 请求，304 复用缓存正文
+    revalidated = client.get(stub.url, ttl=0)
+    assert revalidated.from_cache == "revalidated" and revalidated.content == first.content
+    assert stub.server.requests[-1][1]["If-None-Match"] == '"v1"'
+
+
+def test_cache_if_rejects_invalid_bodies(client, stub):
+    for body in (b"[]", b'{"success": false}', b'{"success": true, "prices": []}'):
+        stub.body = body
+        assert client.get(stub.url, ttl=60, cache_if=DataFetcher._cacheable_history).from_cache == ""
+    assert len(stub.server.requests) == 3
+    assert not any(name.endswith(".body") for _, _, files in os.walk(client.cache_dir) for name in files)
+
+    stub.body = b'{"success": true, "prices": [["Jan 02 2026 01: +0", 1.5, "3"]]}'
+    client.get(stub.url, ttl=60, cache_if=DataFetcher._cacheable_history)
+    assert client.get(stub.url, ttl=60, cache_if=DataFetcher._cacheable_history).from_cache == "fresh"
+
+
+def _entries(client):
+    return sorted(name for _, _, files in os.walk(client.cache_dir) for name in files if name.endswith(".json"))
+
+
+def test_prune_by_age_and_size(client):
+    now = time.time()
+    for i in range(4):
+        client._write_cache(f"https://example.com/{i}", None, {"stored_at": now}, b"x" * 1000)
+        meta_path, _ = client._cache_paths(f"https://example.com/{i}", None)
+        os.utime(meta_path, (now - i * 86400, now - i * 86400))
+
+    # 超过 2.5 天的条目 (i=3) 被删除
+    assert client.prune(max_age=2.5 * 86400, max_bytes=10 ** 9) == 1
+    assert len(_entries(client)) == 3
+
+    # 总大小限制在两个条目以内：保留最新的 i=0 / i=1
+    assert client.prune(max_age=10 ** 9, max_bytes=2500) == 1
+    kept = {os.path.basename(client._cache_paths(f"https://example.com/{i}", None)[0]) for i in (0, 1)}
+    assert set(_entries(client)) == kept
+    for i in (2, 3):
+        assert not any(os.path.exists(p) for p in client._cache_paths(f"https://example.com/{i}", None))
+
+
+def test_accept_encoding_is_requests_default(client):
+    assert client.session.headers["Accept-Encoding"] == requests.utils.default_headers()["Accept-Encoding"]
@@ -0,0 +1,60 @@
+import itertools
+
+import pytest
+
+import config
+from src.core.float_solver import build_float_options
+from src.core.optimizer import SmartOptimizer
+from src.core.simulator import CS2TradeUpSimulator
+from conftest import make_raw_db
+
+RARITY = 3
+
+
+def _optimizer(seed=7):
+    raw_db = make_raw_db(3, seed=seed, items_per_tier=(1, 1), float_ranges=[(0.065, 0.08), (0.0, 0.02), (0.1, 0.2)])
+    return SmartOptimizer(CS2TradeUpSimulator.from_raw_db(raw_db), use_network_guidance=False)
+
+
+def _brute_cheapest(opt, name, col, max_float, min_probability):
+    """全部 10 件输入 (任意收藏品、任意磨损断点) 中满足概率与磨损上限的最低成本"""
+    opt._load_candidates_for_rarity(RARITY)
+    slots = [(cand, o.float_value) for cands in opt._indexes[RARITY].by_collection.values() for cand in cands
+             for o in build_float_options(cand.data['min_float'], cand.data['max_float'],
+                                          lambda f, c=cand: opt._create_item(c, f))]
+    best = None
+    for combo in itertools.combinations_with_replacement(slots, 10):
+        recipe = [opt._create_item(cand, f) for cand, f in combo]
+        res = opt.sim.simulate(recipe, RARITY, config.BUFF_RATIO)
+        hits = [o for o in res.outcomes if o.name == name and o.collection == col]
+        if not hits or sum(o.probability for o in hits) + 1e-9 < min_probability: continue
+        if hits[0].float_value > max_float + 1e-9: continue
+        if best is None or res.total_cost < best: best = res.total_cost
+    return best
+
+
+@pytest.mark.parametrize("seed", [7, 11])
+def test_finder_matches_brute_force_with_mixed_fillers(seed):
+    opt = _optimizer(seed)
+    out = opt.sim.raw_db["Col0"][RARITY + 1][0]
+    max_float = out['min_float'] + 0.4 * (out['max_float'] - out['min_float'])
+    results = opt.find_recipes_for_output(out['name'], "Col0", max_float=max_float, min_probability=0.2)
+    expected = _brute_cheapest(opt, out['name'], "Col0", max_float, 0.2)
+    assert results and results[0].result.total_cost == pytest.approx(expected)
+    assert all(r.output_float <= max_float + 1e-9 and r.probability >= 0.2 - 1e-9 for r in results)
+
+
+def test_finder_cache_follows_price_changes():
+    opt = _optimizer()
+    out = opt.sim.raw_db["Col0"][RARITY + 1][0]
+    first = opt.find_recipes_for_output(out['name'], "Col0", min_probability=0.1)[0]
+    finder = opt._target_finder
+    item = first.recipe[0]
+    cheaper = {f"{i.name} ({i.condition})": i.base_price * 0.5 for i in first.recipe}
+    assert opt.sim.apply_price_changes(cheaper)
+
+    second = opt.find_recipes_for_output(out['name'], "Col0", min_probability=0.1)[0]
+    assert opt._target_finder is not finder
+    assert second.result.total_cost < first.result.total_cost
+    assert opt.sim.price_engine.get_base_price(item.name, item.float_value, item.collection)[0] == \
+        pytest.approx(item.base_price * 0.5)
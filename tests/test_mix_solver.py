@@ -0,0 +1,58 @@
+import itertools
+
+import pytest
+
+import config
+from src.core.float_solver import build_float_options
+from src.core.mix_solver import CollectionMixSolver
+from src.core.optimizer import SmartOptimizer
+from src.core.simulator import CS2TradeUpSimulator
+from conftest import make_raw_db
+
+RARITY = 3
+
+
+@pytest.fixture
+def optimizer():
+    # 每个收藏品一个输入物品，磨损范围窄，穷举规模可控
+    raw_db = make_raw_db(3, seed=7, items_per_tier=(1, 1), float_ranges=[(0.065, 0.08), (0.0, 0.02)])
+    opt = SmartOptimizer(CS2TradeUpSimulator.from_raw_db(raw_db), use_network_guidance=False)
+    opt._set_budget({})
+    opt._load_candidates_for_rarity(RARITY)
+    return opt
+
+
+def _brute_force(opt, max_cost=None):
+    """全部 1~2 收藏品配方 (每个名额取任意物品的任意磨损断点) 中的最高 ROI"""
+    index = opt._indexes[RARITY]
+    slots = {}
+    for col, cands in index.by_collection.items():
+        slots[col] = [(cand, o.float_value) for cand in cands
+                      for o in build_float_options(cand.data['min_float'], cand.data['max_float'],
+                                                   lambda f, c=cand: opt._create_item(c, f))]
+    mixes = [((a, 10),) for a in slots]
+    mixes += [((a, k), (b, 10 - k)) for a, b in itertools.combinations(slots, 2) for k in range(1, 10)]
+
+    best = None
+    for mix in mixes:
+        for combos in itertools.product(*(itertools.combinations_with_replacement(slots[c], k) for c, k in mix)):
+            recipe = [opt._create_item(cand, f) for combo in combos for cand, f in combo]
+            res = opt.sim.simulate(recipe, RARITY, config.BUFF_RATIO, summary_only=True)
+            if max_cost is not None and res.total_cost > max_cost: continue
+            if best is None or res.roi > best: best = res.roi
+    return best
+
+
+def test_solver_finds_brute_force_optimum(optimizer):
+    evaluated = CollectionMixSolver(optimizer, RARITY).solve()
+    assert max(res.roi for res, _ in evaluated) == pytest.approx(_brute_force(optimizer))
+
+
+def test_solver_optimum_under_cost_ceiling(optimizer):
+    unconstrained = CollectionMixSolver(optimizer, RARITY).solve()
+    costs = sorted(res.total_cost for res, _ in unconstrained)
+    max_cost = costs[len(costs) // 3]
+    optimizer._set_budget({'max_cost': max_cost})
+    evaluated = CollectionMixSolver(optimizer, RARITY).solve()
+    assert all(res.total_cost <= max_cost + 1e-9 for res, _ in evaluated)
+    assert max(res.roi for res, _ in evaluated) == pytest.approx(_brute_force(optimizer, max_cost))
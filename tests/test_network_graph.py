@@ -0,0 +1,177 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from src.core import network_graph
+from src.utils.path_manager import PathManager
+from conftest import make_raw_db
+
+
+@pytest.fixture(autouse=True)
+def fresh_analyzers(monkeypatch):
+    monkeypatch.setattr(network_graph, "_analyzers", {})
+
+
+def _cache_files(prefix):
+    return sorted((PathManager.get_data_dir() / "cache").glob(f"{prefix}_*.json"))
+
+
+def test_weights_follow_shared_analyzer_price_version(db_file):
+    path = str(db_file())
+    analyzer = network_graph._shared_analyzer(path, network_graph.db_fingerprint(path))
+    original = network_graph.load_optimization_weights(path)
+
+    node = max(analyzer.node_ids, key=lambda n: analyzer.metrics['pagerank'][n])
+    assert analyzer.update_prices({node: analyzer.node_values[analyzer.node_index[node]] * 50})
+    updated = network_graph.load_optimization_weights(path)
+    assert updated == network_graph._weights_from_pagerank(analyzer.metrics['pagerank'])
+    assert updated != original
+    # 显式指定原始版本时仍可读到改价前的缓存
+    assert network_graph.load_optimization_weights(path, price_version="") == original
+
+
+def test_simulator_price_updates_reach_shared_analyzer(db_file):
+    from src.core.simulator import CS2TradeUpSimulator
+    path = str(db_file())
+    sim = CS2TradeUpSimulator(path)
+    col, items = next(iter(sim.raw_db.items()))
+    item = items[3][0]
+    touched = {}
+    sim.apply_price_changes({f"{item['name']} (Field-Tested)": 500.0}, touched=touched)
+    assert list(touched) == [f"{item['name']} ({col})"]
+
+    original = network_graph.load_optimization_weights(path)
+    assert network_graph.apply_price_updates(path, touched)
+    analyzer = network_graph._analyzers[path]
+    assert analyzer.price_version != ""
+    assert analyzer.node_items[analyzer.node_index[f"{item['name']} ({col})"]]['price_dict']['Field-Tested'] == 500.0
+    assert network_graph.load_optimization_weights(path) != original
+
+
+def test_pagerank_power_matches_networkx(db_file):
+    analyzer = network_graph.NetworkAnalyzer(str(db_file(make_raw_db(8))))
+    expected = nx.pagerank(analyzer._to_networkx(), weight='weight')
+    expected = np.array([expected[n] for n in analyzer.node_ids])
+    assert (np.asarray(analyzer.A.sum(axis=1)).ravel() == 0).any()  # 含悬挂节点
+
+    pr, _ = network_graph.pagerank_power(analyzer.A)
+    assert np.abs(pr - expected).max() < 1e-12
+    # 热启动收敛到同一结果
+    warm, _ = network_graph.pagerank_power(analyzer.A, x0=np.random.default_rng(0).random(len(pr)))
+    assert np.abs(warm - expected).max() < 1e-6
+
+
+def test_cache_files_are_pruned(db_file, monkeypatch):
+    monkeypatch.setattr(network_graph.config, "CACHE_MAX_ENTRIES", 3, raising=False)
+    path = str(db_file())
+    analyzer = network_graph._shared_analyzer(path, network_graph.db_fingerprint(path))
+    analyzer.calculate_centrality()
+    node = analyzer.node_ids[0]
+    for i in range(6):
+        analyzer.update_prices({node: 1.0 + i})
+    assert len(_cache_files("centrality")) == 3
+    # 最近写入的版本保留在缓存中
+    assert network_graph._read_centrality_cache(analyzer.fingerprint, analyzer.price_version)
+
+
+def _vis_data(html):
+    import json
+    import re
+    nodes, edges = re.findall(r"new vis\.DataSet\((\[.*?\])\);", html, re.S)[:2]
+    return json.loads(nodes), json.loads(edges)
+
+
+@pytest.mark.parametrize("fixed_layout", [False, True])
+def test_interactive_html_keeps_node_and_edge_styles(db_file, tmp_path, fixed_layout):
+    analyzer = network_graph.NetworkAnalyzer(str(db_file()))
+    analyzer.calculate_centrality()
+    out = tmp_path / "out" / "graph.html"
+    analyzer.generate_interactive_html(str(out), top_n=30, theme_colors={'bg_main': '#ffffff'},
+                                       fixed_layout=fixed_layout)
+    nodes, edges = _vis_data(out.read_text(encoding="utf-8"))
+
+    selected = analyzer._select_nodes(None, 30)
+    assert sorted(n['id'] for n in nodes) == sorted(analyzer.node_ids[i] for i in selected)
+    assert all(n['font']['color'] == '#222222' and n['color']['background'].startswith('#') for n in nodes)
+    assert all(('x' in n) == fixed_layout for n in nodes)
+    ids = {n['id'] for n in nodes}
+    assert edges and all(e['from'] in ids and e['to'] in ids for e in edges)
+    assert all(e['arrows'] == {'to': {'enabled': False}} for e in edges)
+
+
+def test_condition_layer_roi_is_probability_weighted():
+    from conftest import make_raw_db
+    from src.core.condition_graph import ConditionGraph
+    raw_db = make_raw_db(3, seed=4)
+    graph = ConditionGraph(raw_db)
+    items = {f"{i['name']} ({c})": i for c, tiers in raw_db.items() for t in tiers.values() for i in t}
+
+    totals = {}
+    for u, v, roi, share in zip(graph.edge_src, graph.edge_dst, graph.edge_roi, graph.edge_share):
+        acc = totals.setdefault((u, graph.node_items[v]), [0.0, 0.0, 0.0])
+        acc[0] += roi
+        acc[1] += share
+        acc[2] += share * graph.node_prices[v]
+    assert totals
+    for (u, out_item), (roi, share, ev) in totals.items():
+        # 产物各等级的概率之和为 1，ROI 之和即为该产物的期望 ROI
+        assert share == pytest.approx(1.0)
+        assert roi == pytest.approx(ev / max(graph.node_prices[u], 0.1) - 1.0)
+        assert out_item in items
+
+
+def test_epsilon_is_cache_metadata(db_file, monkeypatch):
+    path = str(db_file())
+    analyzer = network_graph.NetworkAnalyzer(path)
+    metrics = analyzer.calculate_centrality(hub_centrality=True)
+    assert set(metrics) == {'pagerank', 'hubs', 'betweenness', 'closeness'}
+    assert analyzer.metrics_meta == {'approx_epsilon': network_graph._centrality_epsilon()}
+
+    weights = network_graph.load_optimization_weights(path, hub_centrality=True)
+    reloaded = network_graph.NetworkAnalyzer(path)
+    assert reloaded._load_cached_centrality() and 'betweenness' in reloaded.metrics
+    assert reloaded.metrics_meta == analyzer.metrics_meta
+    assert weights == reloaded.get_optimization_weights(hub_centrality=True)
+
+    # epsilon 变化后近似结果不再复用
+    monkeypatch.setattr(network_graph.config, "NETWORK_CENTRALITY_EPSILON", 0.2, raising=False)
+    stale = network_graph.NetworkAnalyzer(path)
+    assert stale._load_cached_centrality() and 'betweenness' not in stale.metrics
+
+
+def test_no_nested_pool_inside_worker_process(monkeypatch):
+    from src.core import approx_centrality
+    from conftest import make_raw_db
+    from src.core.condition_graph import ConditionGraph
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("nested process pool")
+
+    A = ConditionGraph(make_raw_db(3, seed=4)).A
+    monkeypatch.setattr(approx_centrality, "_PARALLEL_MIN_SOURCES", 1)
+    monkeypatch.setattr(approx_centrality, "ProcessPoolExecutor", no_pool)
+    monkeypatch.setattr(approx_centrality.multiprocessing, "parent_process", lambda: object())
+    bc, cl, k = approx_centrality.approximate_centralities(A, k=A.shape[0], workers=4, batch_size=8)
+    assert k == A.shape[0] and len(bc) == len(cl) == A.shape[0]
+
+
+def test_network_html_cache_follows_price_version(db_file, tmp_path):
+    path = str(db_file())
+    out_dir = str(tmp_path / "html")
+    first, meta = network_graph.cached_network_html(path, out_dir, top_n=20)
+    assert network_graph.cached_network_html(path, out_dir, top_n=20)[0] == first
+
+    analyzer = network_graph._analyzers[path]
+    analyzer.update_prices({meta['top_node']: 1e4})
+    second, _ = network_graph.cached_network_html(path, out_dir, top_n=20)
+    assert second != first
+
+
+def test_only_one_shared_analyzer_is_kept(db_file, tmp_path):
+    path = str(db_file())
+    other = str(tmp_path / "other_db.json")
+    with open(path, encoding="utf-8") as src, open(other, "w", encoding="utf-8") as dst:
+        dst.write(src.read() + "\n")
+    network_graph.cached_network_html(path, str(tmp_path / "html"), top_n=20)
+    network_graph.cached_network_html(other, str(tmp_path / "html"), top_n=20)
+    assert list(network_graph._analyzers) == [other]
@@ -0,0 +1,135 @@
+import pytest
+
+import config
+from src.core.candidate_index import CandidatePool
+from src.core import network_graph
+from src.core.optimizer import SmartOptimizer, run_optimizer_arm
+from src.core.simulator import CS2TradeUpSimulator
+from conftest import make_raw_db
+
+RARITY = 3
+
+
+@pytest.fixture
+def optimizer():
+    sim = CS2TradeUpSimulator.from_raw_db(make_raw_db(6, seed=3))
+    return SmartOptimizer(sim, use_network_guidance=False)
+
+
+def _cheapest_recipe_cost(opt):
+    pools = opt._load_candidates_for_rarity(RARITY)
+    return min(c.min_price for c in pools['all']) * 10 * config.BUFF_RATIO
+
+
+def test_budget_pools_fall_back_when_fillers_are_out_of_budget(optimizer):
+    pools = dict(optimizer._load_candidates_for_rarity(RARITY))
+    pools['fillers'] = CandidatePool([max(pools['all'], key=lambda c: c.min_price)])
+    optimizer._set_budget({'max_cost': _cheapest_recipe_cost(optimizer) * 1.2})
+    budgeted = optimizer._budget_pools(pools)
+    assert budgeted['fillers'] and budgeted['fillers'] == budgeted['all']
+
+    recipes = optimizer._sample_recipes(budgeted, 60)
+    assert recipes and all(len(r) == 10 and optimizer._in_budget(r) for r in recipes)
+
+
+def test_make_child_never_returns_an_over_budget_parent(optimizer):
+    pools = optimizer._load_candidates_for_rarity(RARITY)
+    recipes = optimizer._sample_recipes(pools, 40)
+    costly = max(recipes, key=lambda r: sum(i.price for i in r))
+    optimizer._set_budget({'max_cost': sum(i.price for i in costly) * config.BUFF_RATIO * 0.5})
+    parents = [(costly, 1.0, None)]
+    assert optimizer._make_child(parents, pools, mutation_rate=0.0) is None
+
+    cheap = min(recipes, key=lambda r: sum(i.price for i in r))
+    child = optimizer._make_child(parents + [(cheap, 0.5, None)] * 20, pools, mutation_rate=0.0)
+    assert child is not None and optimizer._in_budget(child)
+
+
+def test_scalar_run_keeps_population_in_budget(optimizer):
+    max_cost = _cheapest_recipe_cost(optimizer) * 1.5
+    _, tier_top, history = optimizer.run([RARITY], {'save_png': False, 'seed': 1, 'max_cost': max_cost,
+                                                    'pop_size': 30, 'generations': 4})
+    assert len(history) == 4
+    best = [res for tier in tier_top.values() for res, _ in tier]
+    assert best and all(res.total_cost <= max_cost + 1e-9 for res in best)
+
+
+def test_has_candidates_matches_index():
+    from src.core.candidate_index import CandidateIndex
+    raw_db = make_raw_db(3, seed=5)
+    for rarity in range(2, 7):
+        assert CandidateIndex.has_candidates(raw_db, rarity) == bool(CandidateIndex(raw_db, rarity, {}).pools['all'])
+    for tiers in raw_db.values():
+        for item in tiers[3]: item['price_dict'] = {c: 0 for c in item['price_dict']}
+    assert not CandidateIndex.has_candidates(raw_db, 3)
+
+
+def test_apply_price_changes_converts_to_optimizer_currency(optimizer):
+    item = optimizer.sim.raw_db["Col0"][RARITY][0]
+    full_name = f"{item['name']} (Field-Tested)"
+    before = optimizer.sim.price_version
+    assert optimizer.apply_price_changes({full_name: 2.5}) == 1
+    assert item['price_dict']['Field-Tested'] == pytest.approx(2.5 * config.EXCHANGE_RATE)
+    assert optimizer.sim.price_version == before + 1
+
+
+@pytest.mark.parametrize("adaptive", [False, True])
+@pytest.mark.parametrize("band", [(None, 1.2), (3.0, 3.15)])
+def test_nsga_run_under_tight_budget(optimizer, adaptive, band):
+    # 窄成本区间内交叉/变异几乎总是越界，子代退回父代副本 (曾导致 origin 缺少 'ops')
+    unit = _cheapest_recipe_cost(optimizer)
+    min_cost = band[0] and band[0] * unit
+    max_cost = band[1] * unit
+    _, tier_top, history = optimizer.run([RARITY], {'save_png': False, 'seed': 2, 'min_cost': min_cost,
+                                                    'max_cost': max_cost, 'selection': 'nsga2',
+                                                    'adaptive_operators': adaptive, 'pop_size': 30,
+                                                    'generations': 5})
+    assert len(history) == 5 and all('front_size' in h for h in history)
+    assert optimizer.pareto_front
+    assert all((min_cost or 0) - 1e-9 <= res.total_cost <= max_cost + 1e-9 for res, _ in optimizer.pareto_front)
+
+
+def _write_session(name, recipes):
+    import json
+    from src.utils import visualization
+    from src.utils.path_manager import PathManager
+    folder = PathManager.get_report_dir() / name
+    folder.mkdir(parents=True)
+    top = {"Micro": [{"roi": roi, "rarity": RARITY, "inputs": visualization._recipe_identity(rec)}
+                     for roi, rec in recipes]}
+    (folder / "session_data.json").write_text(json.dumps({"top_recipes": top}), encoding="utf-8")
+
+
+def test_warm_start_rescores_and_skips_baseline_sessions(optimizer):
+    optimizer._set_budget({})
+    pools = optimizer._load_candidates_for_rarity(RARITY)
+    recipes = optimizer._sample_recipes(pools, 40)
+    fitness = lambda rec: optimizer._fitness(optimizer.sim.simulate(rec, RARITY, config.BUFF_RATIO, summary_only=True))
+    ranked = sorted(recipes, key=fitness)
+    worst, best = ranked[0], ranked[-1]
+    # 保存时的 ROI 与当前价格下的排序相反；对照组会话中的配方更好但不应被读取
+    _write_session("2026-01-01_00-00-00", [(5.0, worst), (-0.5, best)])
+    _write_session("2026-01-02_00-00-00_baseline", [(9.0, ranked[-2])])
+
+    warm = optimizer.load_warm_start(RARITY, n_sessions=1, limit=1)
+    assert [(i.name, i.float_value) for i in warm[0]] == [(i.name, i.float_value) for i in best]
+    assert len(optimizer.load_warm_start(RARITY, n_sessions=5, limit=5)) == 2
+
+
+def test_compare_arm_uses_synced_network_weights(db_file, monkeypatch):
+    path = str(db_file())
+    monkeypatch.setattr(network_graph, "_analyzers", {})
+    sim = CS2TradeUpSimulator(path)
+    col, tiers = next(iter(sim.raw_db.items()))
+    touched = {}
+    sim.apply_price_changes({f"{tiers[RARITY][0]['name']} (Field-Tested)": 500.0}, touched=touched)
+    network_graph.apply_price_updates(path, touched)
+    parent = SmartOptimizer(sim).network_weights
+    version = network_graph.shared_price_version(path)
+    assert version
+
+    # 对比模式的子进程中没有共享分析器，权重只能按传入的价格版本读取
+    monkeypatch.setattr(network_graph, "_analyzers", {})
+    monkeypatch.setattr(SmartOptimizer, "run", lambda self, **kwargs: self.network_weights)
+    assert run_optimizer_arm('guided', sim.raw_db, path, RARITY, {}, True, None, version) == parent
+    assert run_optimizer_arm('guided', sim.raw_db, path, RARITY, {}, True) != parent
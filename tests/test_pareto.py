@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from src.core.pareto import fast_non_dominated_sort, nsga2_select
+
+
+def _dominates(a, b):
+    return all(x <= y for x, y in zip(a, b)) and any(x < y for x, y in zip(a, b))
+
+
+def _brute_fronts(obj):
+    """逐层剥离: 每层为剩余个体中不被任何剩余个体支配的那些"""
+    remaining, fronts = set(range(len(obj))), []
+    while remaining:
+        front = {i for i in remaining if not any(_dominates(obj[j], obj[i]) for j in remaining if j != i)}
+        fronts.append(front)
+        remaining -= front
+    return fronts
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_fast_non_dominated_sort_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    # 取值范围小，包含大量并列与重复个体
+    obj = rng.integers(0, 5, size=(rng.integers(1, 40), rng.integers(2, 4))).astype(float)
+    fronts = fast_non_dominated_sort(obj)
+    assert [set(f.tolist()) for f in fronts] == _brute_fronts(obj.tolist())
+
+
+def test_nsga2_select_fills_by_rank():
+    obj = np.random.default_rng(1).integers(0, 5, size=(30, 3)).astype(float)
+    fronts = _brute_fronts(obj.tolist())
+    size = len(fronts[0]) + 1
+    chosen, ranks, _ = nsga2_select(obj, size)
+    assert len(chosen) == size
+    assert fronts[0] <= set(np.asarray(chosen).tolist())
+    assert sorted(np.asarray(ranks).tolist()) == [0] * len(fronts[0]) + [1]
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from src.core.price_history_store import (QUEUE_DONE, QUEUE_FAILED, QUEUE_PENDING, QUEUE_RUNNING,
+                                          PriceHistoryStore)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceHistoryStore(tmp_path / "history.sqlite")
+
+
+def _daily(days, price=1.0):
+    return pd.DataFrame({'Date': pd.to_datetime(days), 'Price': [price] * len(days), 'Volume': [3] * len(days)})
+
+
+def test_today_data_goes_stale_after_refresh_interval(store):
+    name = "AK-47 | Slate (Field-Tested)"
+    assert store.is_stale(name)
+    now = datetime.now()
+    store.append(name, _daily([now.strftime("%Y-%m-%d")]))
+    assert not store.is_stale(name, now)
+    # 最新一天就是今天，也要按抓取时间过期 (当天数据在累积)
+    assert store.is_stale(name, now + timedelta(seconds=store.refresh_seconds + 1))
+
+
+def test_append_rewrites_latest_day_only(store):
+    name = "AK-47 | Slate (Field-Tested)"
+    assert store.append(name, _daily(["2026-01-01", "2026-01-02"])) == 2
+    # 早于最新一天的行被忽略，最新一天 (可能不完整) 被覆盖
+    assert store.append(name, _daily(["2026-01-01", "2026-01-02", "2026-01-03"], price=2.0)) == 2
+    df = store.load(name)
+    assert df['Price'].tolist() == [1.0, 2.0, 2.0]
+    assert store.latest_day(name) == datetime(2026, 1, 3)
+
+
+def test_queue_resume_and_retry(store):
+    assert store.enqueue(["a", "b", "c"]) == 3
+    assert store.enqueue(["a", "d"]) == 1
+    store.set_status("a", QUEUE_RUNNING)
+    store.set_status("b", QUEUE_FAILED, attempts=3, error="HTTP 500")
+    store.set_status("c", QUEUE_DONE)
+    assert store.queue_summary() == {QUEUE_RUNNING: 1, QUEUE_FAILED: 1, QUEUE_DONE: 1, QUEUE_PENDING: 1}
+
+    store.reset_queue()
+    assert sorted(store.pending()) == ["a", "d"]
+    assert store.item_status("b")['error'] == "HTTP 500"
+    store.reset_queue(retry_failed=True)
+    assert sorted(store.pending()) == ["a", "b", "d"]
+    assert store.item_status("b")['attempts'] == 0
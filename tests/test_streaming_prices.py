@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from src.core import utils
+from src.core.price_history_store import PriceHistoryStore
+from src.core.simulator import CS2TradeUpSimulator
+from src.core.utils import iter_json_array, sync_realtime_prices
+from conftest import etag_response, make_raw_db
+
+ITEMS = [{"market_hash_name": 'Say "hi" \\ ünï', "min_price": 12.5},
+         {"market_hash_name": "B", "min_price": 7},
+         {"market_hash_name": "C", "min_price": 1e-3, "nested": [1, {"x": "]"}]}]
+
+
+def _split(text, size):
+    data = text.encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 64])
+def test_iter_json_array_any_chunking(size):
+    # 分块边界落在字符串 (含转义与多字节字符) 与数字中间
+    text = " [ " + " ,\n".join(json.dumps(i, ensure_ascii=False) for i in ITEMS) + " ] "
+    assert list(iter_json_array(_split(text, size))) == ITEMS
+
+
+def test_iter_json_array_number_split_at_chunk_end():
+    # "7" 与 "50" 分在两块时不能先产出 7
+    assert list(iter_json_array(["[1", "7", "50", "]"])) == [1750]
+    assert list(iter_json_array(["[2.", "5e", "1]"])) == [25.0]
+
+
+@pytest.mark.parametrize("chunks", [["[]"], ["[", " ", "]"], [b"[\n]"]])
+def test_iter_json_array_empty(chunks):
+    assert list(iter_json_array(chunks)) == []
+
+
+@pytest.mark.parametrize("text", ['[{"a": 1}, {"b": ', '[1, 2', '[', ''])
+def test_iter_json_array_truncated(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(_split(text, 3)))
+
+
+def test_iter_json_array_rejects_non_array():
+    with pytest.raises(ValueError):
+        list(iter_json_array(['{"a": 1}']))
+
+
+class StubFeed:
+    """Skinport /v1/items: 返回最近发布的报价，ETag 为发布次数"""
+
+    def __init__(self):
+        self.items = []
+        self.version = 0
+
+    def __call__(self, path, headers):
+        return etag_response(headers, json.dumps(self.items).encode(), f'"{self.version}"')
+
+    def publish(self, prices):
+        self.items = [{"market_hash_name": n, "min_price": p} for n, p in prices.items()]
+        self.version += 1
+
+
+@pytest.fixture
+def feed(stub_server):
+    stub = StubFeed()
+    stub.server = stub_server(stub)
+    stub.url = stub.server.base_url + "/v1/items"
+    return stub
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceHistoryStore(tmp_path / "history.sqlite")
+
+
+def test_sync_tracks_changes_by_generation_and_etag(feed, store):
+    feed.publish({"A (Field-Tested)": 1.0, "B (Field-Tested)": 2.0})
+    assert sync_realtime_prices(feed.url, store) == 1
+    assert store.quotes_since(0) == ({"A (Field-Tested)": 1.0, "B (Field-Tested)": 2.0}, 1)
+
+    # 内容未变: 带 If-None-Match，304，代号不变
+    assert sync_realtime_prices(feed.url, store) == 1
+    assert feed.server.statuses == [200, 304]
+
+    feed.publish({"A (Field-Tested)": 1.0, "B (Field-Tested)": 2.5, "C (Field-Tested)": 3.0})
+    assert sync_realtime_prices(feed.url, store) == 2
+    assert store.quotes_since(1) == ({"B (Field-Tested)": 2.5, "C (Field-Tested)": 3.0}, 2)
+    assert store.quotes_since(2) == ({}, 2)
+
+
+def test_truncated_feed_rolls_back(tmp_path, store):
+    path = tmp_path / "items.json"
+    path.write_text('[{"market_hash_name": "A", "min_price": 1}]')
+    assert sync_realtime_prices(str(path), store) == 1
+    path.write_text('[{"market_hash_name": "A", "min_price": 2}, {"market_hash_name": "B", "min_')
+    assert sync_realtime_prices(str(path), store) is None
+    assert store.quotes_since(0) == ({"A": 1.0}, 1)
+
+
+def test_fresh_simulator_gets_full_map_within_ttl(feed, store, monkeypatch):
+    raw_db = make_raw_db(2, seed=3)
+    items = [i for tiers in raw_db.values() for i in tiers[3]]
+    names = [f"{i['name']} (Field-Tested)" for i in items]
+    monkeypatch.setattr(utils.get_client(), "ttls", {feed.url: 3600})
+
+    feed.publish({n: 1000.0 + k for k, n in enumerate(names)})
+    first = CS2TradeUpSimulator.from_raw_db(make_raw_db(2, seed=3))
+    touched = first.refresh_realtime_prices(feed.url, store)
+    assert len(touched) == len(items)
+
+    # 快照未过期 (不再请求)，新实例仍按自己的代号拿到全部报价
+    second = CS2TradeUpSimulator.from_raw_db(make_raw_db(2, seed=3))
+    assert len(second.refresh_realtime_prices(feed.url, store)) == len(items)
+    assert feed.server.statuses == [200]
+    for sim in (first, second):
+        for n, item in zip(names, [i for tiers in sim.raw_db.values() for i in tiers[3]]):
+            assert item['price_dict']['Field-Tested'] == 1000.0 + names.index(n)
+
+    # 已同步的实例再次同步没有新报价
+    assert first.refresh_realtime_prices(feed.url, store) == {}
+    assert first.price_version == 1